@@ -1,12 +1,213 @@
-from django.contrib import admin
+from decimal import Decimal, InvalidOperation
+
+from django import forms
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ChangeList
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import Paginator
+from django.db.models import F, Q
+from django.db.models.functions import Round
+from django.utils.functional import cached_property
+
+from . import busqueda, conteos, lotes, paginacion
+from .validacion import PRECIO_CENTAVOS, PRECIO_LIMITE, STOCK_MAXIMO
 from .models import Videojuego
 
 # Registra tus modelos aquí.
 
+# Admin del catálogo pensado para tablas de millones de filas:
+#
+# - el total sale de api.conteos (estimado o cacheado), sin COUNT(*) por carga;
+# - las páginas se piden por cursor (keyset) con el mismo código que la API,
+#   así que la página 5000 cuesta lo mismo que la primera;
+# - la búsqueda usa el índice de texto completo de api.busqueda, no ILIKE;
+# - las acciones de precio y stock son un único UPDATE sobre la selección;
+#   las filas cuyo resultado quedaría fuera del rango que acepta la API se
+#   dejan fuera del UPDATE y se informan.
+
+CURSOR_VAR = 'cursor'
+
+
+class PaginadorEstimado(Paginator):
+    """Paginator con el conteo de api.conteos"""
+
+    @cached_property
+    def _conteo(self):
+        return conteos.contar(self.object_list)
+
+    @property
+    def count(self):
+        return self._conteo[0]
+
+    @property
+    def estimado(self):
+        return self._conteo[1]
+
+
+class ChangeListCatalogo(ChangeList):
+    """
+    Lista paginada por cursor cuando el orden es de columnas del modelo; con
+    otros órdenes (o `?all`) se vuelve a la paginación por OFFSET de Django.
+    """
+
+    def __init__(self, request, *args, **kwargs):
+        self.cursor = request.GET.get(CURSOR_VAR) or None
+        self.siguiente = None
+        super().__init__(request, *args, **kwargs)
+        # Ordenar, filtrar o buscar vuelve a la primera página
+        self.params.pop(CURSOR_VAR, None)
+        self.filter_params.pop(CURSOR_VAR, None)
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_ordering(self, request, queryset):
+        ordering = super().get_ordering(request, queryset)
+        # Django desempata con -pk; en el mismo sentido que la primera columna
+        # el orden queda cubierto por los índices (columna, id) del modelo
+        if len(ordering) > 1 and ordering[-1] == '-pk' and isinstance(ordering[0], str):
+            ordering[-1] = '-id' if ordering[0].startswith('-') else 'id'
+        return ordering
+
+    def _orden_keyset(self):
+        orden = []
+        for nombre in self.queryset.query.order_by:
+            if not isinstance(nombre, str):
+                return None
+            if nombre.lstrip('-') == 'pk':
+                nombre = nombre.replace('pk', 'id')
+            try:
+                campo = self.model._meta.get_field(nombre.lstrip('-'))
+            except FieldDoesNotExist:
+                return None
+            if not campo.concrete or campo.is_relation:
+                return None
+            # ModelAdmin.get_queryset ya aplica `ordering` y Django lo vuelve a agregar
+            if campo.name not in paginacion.columnas(orden):
+                orden.append(nombre)
+        return tuple(orden) if orden and orden[-1].lstrip('-') == 'id' else None
+
+    def get_results(self, request):
+        orden = self._orden_keyset()
+        if orden is None or self.show_all:
+            return super().get_results(request)
+
+        queryset = paginacion.ordenar(self.queryset, orden)
+        if self.cursor:
+            try:
+                queryset = queryset.filter(paginacion.filtro_keyset(orden, paginacion.decodificar_cursor(self.cursor, orden)))
+            except paginacion.CursorInvalido:
+                raise IncorrectLookupParameters
+        filas = list(queryset[:self.list_per_page + 1])
+        if len(filas) > self.list_per_page:
+            filas = filas[:self.list_per_page]
+            self.siguiente = paginacion.codificar_cursor(
+                orden, [getattr(filas[-1], columna) for columna in paginacion.columnas(orden)]
+            )
+
+        paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        self.result_count = paginator.count
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.result_list = filas
+        self.can_show_all = False
+        self.multi_page = bool(self.cursor or self.siguiente)
+        self.paginator = paginator
+
+    @property
+    def url_siguiente(self):
+        return self.siguiente and self.get_query_string({CURSOR_VAR: self.siguiente})
+
+    @property
+    def url_primera(self):
+        return self.cursor and self.get_query_string()
+
+
+class AccionMasivaForm(ActionForm):
+    valor = forms.DecimalField(
+        required=False, label='Valor:',
+        help_text='Porcentaje para "Ajustar precio" (-10 = 10 % menos) o unidades para "Reponer stock"',
+    )
+
+
 @admin.register(Videojuego)
 class VideojuegoAdmin(admin.ModelAdmin):
     list_display = ('id', 'titulo', 'plataforma', 'genero', 'precio', 'stock', 'desarrollador', 'fecha_lanzamiento')
-    list_filter = ('plataforma', 'genero', 'created_at', 'updated_at')
+    # Sin updated_at ni date_hierarchy: filtrar por una columna sin índice o
+    # listar las fechas distintas recorre la tabla entera
+    list_filter = ('plataforma', 'genero', 'created_at')
     search_fields = ('titulo', 'desarrollador', 'descripcion')
-    ordering = ('-created_at',)
-    date_hierarchy = 'fecha_lanzamiento'
+    search_help_text = 'Busca en título, desarrollador y descripción con el índice de texto completo'
+    # Solo se ordena por columnas con índice (columna, id)
+    sortable_by = ('id', 'titulo', 'precio', 'fecha_lanzamiento')
+    ordering = ('-created_at', 'id')
+    paginator = PaginadorEstimado
+    show_full_result_count = False
+    action_form = AccionMasivaForm
+    actions = ('ajustar_precio', 'reponer_stock')
+
+    def get_changelist(self, request, **kwargs):
+        return ChangeListCatalogo
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        ids = busqueda.buscar_ids(search_term, settings.API_ADMIN_BUSQUEDA_LIMITE)
+        return queryset.filter(id__in=ids), False
+
+    def _valor(self, request):
+        try:
+            valor = Decimal(request.POST.get('valor', ''))
+        except InvalidOperation:
+            return None
+        return valor if valor.is_finite() else None
+
+    def _actualizar_en_rango(self, request, queryset, fuera, motivo, **valores):
+        """
+        Un UPDATE sobre la selección menos las filas de `fuera`, que se cuentan
+        antes de escribir: después el valor nuevo de una fila actualizada
+        puede caer en `fuera`. Devuelve la cantidad actualizada.
+        """
+        omitidos = queryset.filter(fuera).count()
+        cantidad = lotes.actualizar_en_bloque(queryset.exclude(fuera), **valores)
+        if omitidos:
+            self.message_user(request, f'{omitidos} videojuegos sin cambios: {motivo}', messages.WARNING)
+        return cantidad
+
+    @admin.action(description='Ajustar precio de los seleccionados (%% en "Valor")')
+    def ajustar_precio(self, request, queryset):
+        porcentaje = self._valor(request)
+        if porcentaje is None or porcentaje <= -100:
+            self.message_user(request, 'Falta en "Valor" un porcentaje mayor que -100', messages.ERROR)
+            return
+        factor = 1 + porcentaje / 100
+        # Round(precio * factor, 2) debe quedar en [0.01, PRECIO_LIMITE): un
+        # precio que bajaría a 0.00 o que no entra en la columna no se toca
+        mitad = PRECIO_CENTAVOS / 2
+        fuera = Q(precio__gte=(PRECIO_LIMITE - mitad) / factor) | Q(precio__gt=0, precio__lt=mitad / factor)
+        cantidad = self._actualizar_en_rango(
+            request, queryset, fuera, f'el precio quedaría en 0.00 o llegaría a {PRECIO_LIMITE}',
+            precio=Round(F('precio') * factor, 2),
+        )
+        self.message_user(request, f'Precio ajustado un {porcentaje} % en {cantidad} videojuegos', messages.SUCCESS)
+
+    @admin.action(description='Reponer stock de los seleccionados (unidades en "Valor")')
+    def reponer_stock(self, request, queryset):
+        unidades = self._valor(request)
+        if unidades is None or unidades <= 0 or unidades != int(unidades) or unidades > STOCK_MAXIMO:
+            self.message_user(
+                request, f'Falta en "Valor" una cantidad entera de unidades entre 1 y {STOCK_MAXIMO}', messages.ERROR,
+            )
+            return
+        unidades = int(unidades)
+        fuera = Q(stock__gt=STOCK_MAXIMO - unidades)
+        cantidad = self._actualizar_en_rango(
+            request, queryset, fuera, f'el stock superaría {STOCK_MAXIMO}', stock=F('stock') + unidades,
+        )
+        self.message_user(request, f'{unidades} unidades repuestas en {cantidad} videojuegos', messages.SUCCESS)
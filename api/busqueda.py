@@ -0,0 +1,234 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Videojuego
+
+# Búsqueda de texto completo sobre titulo, desarrollador y descripcion.
+#
+# PostgreSQL: columna `busqueda` (tsvector generado y almacenado) con índice
+# GIN, y un índice de trigramas (pg_trgm) sobre el título para tolerar errores
+# de tipeo.
+# SQLite: tabla FTS5 `api_videojuego_fts` (palabras, con índices de prefijo)
+# y `api_videojuego_trgm` (trigramas del título), ambas de contenido externo y
+# sincronizadas con triggers sobre api_videojuego.
+#
+# Las sentencias viven acá y no en la migración porque en SQLite Django
+# reconstruye la tabla al alterar ciertas columnas, lo que borra los triggers;
+# esas migraciones llaman a `reinstalar_triggers`.
+
+POSTGRESQL = [
+    (
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        None,
+    ),
+    (
+        """
+        ALTER TABLE api_videojuego ADD COLUMN busqueda tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('spanish', coalesce(titulo, '')), 'A') ||
+            setweight(to_tsvector('spanish', coalesce(desarrollador, '')), 'B') ||
+            setweight(to_tsvector('spanish', coalesce(descripcion, '')), 'C')
+        ) STORED
+        """,
+        "ALTER TABLE api_videojuego DROP COLUMN busqueda",
+    ),
+    (
+        "CREATE INDEX videojuego_busqueda_gin ON api_videojuego USING GIN (busqueda)",
+        "DROP INDEX IF EXISTS videojuego_busqueda_gin",
+    ),
+    (
+        "CREATE INDEX videojuego_titulo_trgm ON api_videojuego USING GIN (titulo gin_trgm_ops)",
+        "DROP INDEX IF EXISTS videojuego_titulo_trgm",
+    ),
+]
+
+SQLITE_TABLAS = [
+    (
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS api_videojuego_fts USING fts5(
+            titulo, desarrollador, descripcion,
+            content='api_videojuego', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+        """,
+        "DROP TABLE IF EXISTS api_videojuego_fts",
+    ),
+    (
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS api_videojuego_trgm USING fts5(
+            titulo, content='api_videojuego', content_rowid='id', tokenize='trigram'
+        )
+        """,
+        "DROP TABLE IF EXISTS api_videojuego_trgm",
+    ),
+]
+
+SQLITE_TRIGGERS = [
+    (
+        """
+        CREATE TRIGGER IF NOT EXISTS api_videojuego_fts_ai AFTER INSERT ON api_videojuego BEGIN
+            INSERT INTO api_videojuego_fts(rowid, titulo, desarrollador, descripcion)
+                VALUES (new.id, new.titulo, new.desarrollador, new.descripcion);
+            INSERT INTO api_videojuego_trgm(rowid, titulo) VALUES (new.id, new.titulo);
+        END
+        """,
+        "DROP TRIGGER IF EXISTS api_videojuego_fts_ai",
+    ),
+    (
+        """
+        CREATE TRIGGER IF NOT EXISTS api_videojuego_fts_ad AFTER DELETE ON api_videojuego BEGIN
+            INSERT INTO api_videojuego_fts(api_videojuego_fts, rowid, titulo, desarrollador, descripcion)
+                VALUES ('delete', old.id, old.titulo, old.desarrollador, old.descripcion);
+            INSERT INTO api_videojuego_trgm(api_videojuego_trgm, rowid, titulo)
+                VALUES ('delete', old.id, old.titulo);
+        END
+        """,
+        "DROP TRIGGER IF EXISTS api_videojuego_fts_ad",
+    ),
+    (
+        # Solo se reindexa cuando cambia alguna columna de texto, así las
+        # actualizaciones de stock o precio no tocan el índice.
+        """
+        CREATE TRIGGER IF NOT EXISTS api_videojuego_fts_au
+        AFTER UPDATE OF titulo, desarrollador, descripcion ON api_videojuego BEGIN
+            INSERT INTO api_videojuego_fts(api_videojuego_fts, rowid, titulo, desarrollador, descripcion)
+                VALUES ('delete', old.id, old.titulo, old.desarrollador, old.descripcion);
+            INSERT INTO api_videojuego_fts(rowid, titulo, desarrollador, descripcion)
+                VALUES (new.id, new.titulo, new.desarrollador, new.descripcion);
+            INSERT INTO api_videojuego_trgm(api_videojuego_trgm, rowid, titulo)
+                VALUES ('delete', old.id, old.titulo);
+            INSERT INTO api_videojuego_trgm(rowid, titulo) VALUES (new.id, new.titulo);
+        END
+        """,
+        "DROP TRIGGER IF EXISTS api_videojuego_fts_au",
+    ),
+]
+
+SQLITE_RECONSTRUIR = [
+    "INSERT INTO api_videojuego_fts(api_videojuego_fts) VALUES ('rebuild')",
+    "INSERT INTO api_videojuego_trgm(api_videojuego_trgm) VALUES ('rebuild')",
+]
+
+
+def crear_indices(schema_editor):
+    """Crea los índices de texto completo del motor en uso"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for sql, _ in POSTGRESQL:
+            schema_editor.execute(sql)
+    elif vendor == 'sqlite':
+        for sql, _ in SQLITE_TABLAS + SQLITE_TRIGGERS:
+            schema_editor.execute(sql)
+        for sql in SQLITE_RECONSTRUIR:
+            schema_editor.execute(sql)
+
+
+def eliminar_indices(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        sentencias = POSTGRESQL
+    elif vendor == 'sqlite':
+        sentencias = SQLITE_TABLAS + SQLITE_TRIGGERS
+    else:
+        return
+    for _, sql in reversed(sentencias):
+        if sql:
+            schema_editor.execute(sql)
+
+
+def reinstalar_triggers(schema_editor):
+    """Vuelve a crear los triggers FTS5 tras una reconstrucción de tabla en SQLite"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql, _ in SQLITE_TRIGGERS:
+        schema_editor.execute(sql)
+    for sql in SQLITE_RECONSTRUIR:
+        schema_editor.execute(sql)
+
+
+def _palabras(texto):
+    return re.findall(r'\w+', texto.lower())
+
+
+def _consulta_fts5(palabras):
+    # Cada palabra va entre comillas para que FTS5 no la interprete como
+    # operador; la última se busca como prefijo (búsqueda mientras se escribe).
+    terminos = [f'"{palabra}"' for palabra in palabras]
+    terminos[-1] += '*'
+    return ' '.join(terminos)
+
+
+def _consulta_trigramas(palabras):
+    trigramas = {
+        palabra[i:i + 3]
+        for palabra in palabras
+        for i in range(len(palabra) - 2)
+    }
+    return ' OR '.join(f'"{trigrama}"' for trigrama in sorted(trigramas))
+
+
+def _buscar_sqlite(palabras, limite):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT rowid FROM api_videojuego_fts WHERE api_videojuego_fts MATCH %s "
+            "ORDER BY bm25(api_videojuego_fts, 10.0, 5.0, 1.0) LIMIT %s",
+            [_consulta_fts5(palabras), limite],
+        )
+        ids = [fila[0] for fila in cursor.fetchall()]
+        if ids:
+            return ids
+        # Sin coincidencias exactas: se tolera el error de tipeo ordenando por
+        # la cantidad de trigramas del título que coinciden con la consulta.
+        consulta = _consulta_trigramas(palabras)
+        if not consulta:
+            return []
+        cursor.execute(
+            "SELECT rowid FROM api_videojuego_trgm WHERE api_videojuego_trgm MATCH %s "
+            "ORDER BY bm25(api_videojuego_trgm) LIMIT %s",
+            [consulta, limite],
+        )
+        return [fila[0] for fila in cursor.fetchall()]
+
+
+def _buscar_postgresql(palabras, limite):
+    consulta = ' & '.join(palabras) + ':*'
+    texto = ' '.join(palabras)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT id FROM api_videojuego, to_tsquery('spanish', %s) consulta "
+            "WHERE busqueda @@ consulta ORDER BY ts_rank(busqueda, consulta) DESC, id LIMIT %s",
+            [consulta, limite],
+        )
+        ids = [fila[0] for fila in cursor.fetchall()]
+        if ids:
+            return ids
+        cursor.execute(
+            "SELECT id FROM api_videojuego WHERE titulo %% %s "
+            "ORDER BY similarity(titulo, %s) DESC, id LIMIT %s",
+            [texto, texto, limite],
+        )
+        return [fila[0] for fila in cursor.fetchall()]
+
+
+def _buscar_generico(palabras, limite):
+    condicion = Q()
+    for palabra in palabras:
+        condicion &= (
+            Q(titulo__icontains=palabra)
+            | Q(desarrollador__icontains=palabra)
+            | Q(descripcion__icontains=palabra)
+        )
+    return list(Videojuego.objects.filter(condicion).values_list('id', flat=True)[:limite])
+
+
+def buscar_ids(texto, limite):
+    """Devuelve los ids de los videojuegos que coinciden con `texto`, del más relevante al menos"""
+    palabras = _palabras(texto)
+    if not palabras:
+        return []
+    if connection.vendor == 'postgresql':
+        return _buscar_postgresql(palabras, limite)
+    if connection.vendor == 'sqlite':
+        return _buscar_sqlite(palabras, limite)
+    return _buscar_generico(palabras, limite)
@@ -0,0 +1,191 @@
+import hashlib
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+from . import metricas, replicas
+
+# Cache de lectura del catálogo.
+#
+# - Las páginas del listado se guardan ya serializadas bajo una clave que
+#   incluye la versión del catálogo; al cambiar cualquier videojuego se
+#   incrementa la versión y todas las páginas viejas quedan inalcanzables
+#   (el LRU del backend las termina desalojando). El fragmento HTML con la
+#   primera página que renderiza la página principal sigue la misma regla.
+# - El detalle de cada videojuego se guarda por id y se borra puntualmente
+#   cuando ese videojuego cambia.
+
+ALIAS = 'catalogo'
+CLAVE_VERSION = 'catalogo:version'
+CLAVE_ULTIMO_CAMBIO = 'catalogo:ultimo_cambio'
+
+_contadores = {'hits': 0, 'misses': 0}
+_lock = threading.Lock()
+
+
+def _cache():
+    return caches[ALIAS]
+
+
+def _contar(hit):
+    with _lock:
+        _contadores['hits' if hit else 'misses'] += 1
+    metricas.contar_cache(aciertos=int(hit), fallos=int(not hit))
+
+
+def estadisticas():
+    """Devuelve los contadores de aciertos y fallos de este proceso"""
+    with _lock:
+        return dict(_contadores)
+
+
+def reiniciar_estadisticas():
+    with _lock:
+        _contadores['hits'] = 0
+        _contadores['misses'] = 0
+
+
+def _version_inicial():
+    # Si la clave de versión se pierde (reinicio o desalojo) se parte de un
+    # valor basado en el reloj para no reutilizar versiones ya vistas.
+    return int(time.time() * 1000)
+
+
+def version_catalogo():
+    """Versión actual del catálogo; cambia con cada alta, modificación o baja"""
+    cache = _cache()
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        cache.add(CLAVE_VERSION, _version_inicial(), timeout=None)
+        version = cache.get(CLAVE_VERSION)
+    return version
+
+
+def _incrementar_version():
+    cache = _cache()
+    try:
+        cache.incr(CLAVE_VERSION)
+    except ValueError:
+        cache.set(CLAVE_VERSION, _version_inicial(), timeout=None)
+
+
+async def aversion_catalogo():
+    cache = _cache()
+    version = await cache.aget(CLAVE_VERSION)
+    if version is None:
+        await cache.aadd(CLAVE_VERSION, _version_inicial(), timeout=None)
+        version = await cache.aget(CLAVE_VERSION)
+    return version
+
+
+def ultimo_cambio():
+    """Momento del último cambio del catálogo visto por el cache, o None"""
+    return _cache().get(CLAVE_ULTIMO_CAMBIO)
+
+
+async def aultimo_cambio():
+    return await _cache().aget(CLAVE_ULTIMO_CAMBIO)
+
+
+def _clave_lista(version, params):
+    consulta = '&'.join(f'{clave}={valor}' for clave, valor in sorted(params.lists()))
+    resumen = hashlib.sha1(consulta.encode()).hexdigest()
+    return f'catalogo:{version}:lista:{resumen}'
+
+
+def clave_lista(params):
+    """Clave de una página del listado para la versión actual del catálogo"""
+    return _clave_lista(version_catalogo(), params)
+
+
+async def aclave_lista(params):
+    return _clave_lista(await aversion_catalogo(), params)
+
+
+async def aclave_inicio():
+    """Clave del fragmento HTML de la página principal para la versión actual"""
+    return f'catalogo:{await aversion_catalogo()}:inicio'
+
+
+def clave_conteo(consulta):
+    """Clave del COUNT(*) de una consulta (SQL con parámetros) para la versión actual"""
+    resumen = hashlib.sha1(consulta.encode()).hexdigest()
+    return f'catalogo:{version_catalogo()}:conteo:{resumen}'
+
+
+def clave_detalle(id):
+    return f'catalogo:detalle:{id}'
+
+
+def obtener(clave):
+    """Lee una entrada contando el acierto o el fallo"""
+    valor = _cache().get(clave)
+    _contar(valor is not None)
+    return valor
+
+
+async def aobtener(clave):
+    valor = await _cache().aget(clave)
+    _contar(valor is not None)
+    return valor
+
+
+def _posiblemente_atrasado(ultimo):
+    # Una réplica puede no haber recibido todavía un cambio reciente; lo que
+    # se leyó de ella en esa ventana no se guarda, porque quedaría en cache
+    # hasta el próximo cambio.
+    ventana = timedelta(seconds=settings.API_REPLICA_FIJACION_SEGUNDOS)
+    return ultimo is not None and timezone.now() - ultimo < ventana
+
+
+def guardar(clave, valor):
+    if replicas.leyendo_de_replica() and _posiblemente_atrasado(ultimo_cambio()):
+        return
+    _cache().set(clave, valor)
+
+
+async def aguardar(clave, valor):
+    if replicas.leyendo_de_replica() and _posiblemente_atrasado(await aultimo_cambio()):
+        return
+    await _cache().aset(clave, valor)
+
+
+def obtener_detalles(ids):
+    """Devuelve {id: payload} con los detalles que estén en cache"""
+    claves = {clave_detalle(id): id for id in ids}
+    encontrados = _cache().get_many(list(claves))
+    with _lock:
+        _contadores['hits'] += len(encontrados)
+        _contadores['misses'] += len(claves) - len(encontrados)
+    metricas.contar_cache(aciertos=len(encontrados), fallos=len(claves) - len(encontrados))
+    return {claves[clave]: valor for clave, valor in encontrados.items()}
+
+
+def guardar_detalles(detalles):
+    """Guarda de una vez varios detalles ({id: payload})"""
+    if not detalles:
+        return
+    if replicas.leyendo_de_replica() and _posiblemente_atrasado(ultimo_cambio()):
+        return
+    _cache().set_many({clave_detalle(id): data for id, data in detalles.items()})
+
+
+def _invalidar(ids):
+    _incrementar_version()
+    _cache().set(CLAVE_ULTIMO_CAMBIO, timezone.now(), timeout=None)
+    if ids:
+        _cache().delete_many([clave_detalle(id) for id in ids])
+
+
+def invalidar(ids=()):
+    """Invalida el listado y el detalle de los ids indicados"""
+    ids = list(ids)
+    _invalidar(ids)
+    # Se repite al confirmar la transacción: una lectura concurrente pudo
+    # volver a cachear el estado anterior entre el cambio y el commit.
+    transaction.on_commit(lambda: _invalidar(ids))
@@ -0,0 +1,115 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, Max, OuterRef
+from django.utils import timezone
+
+from .models import CambioVideojuego, CompactacionCambios
+
+# Feed de cambios del catálogo.
+#
+# Cada alta, modificación o baja agrega una fila a CambioVideojuego (lo hacen
+# las señales, también para las escrituras masivas) y el id de esa fila es el
+# token: un cliente que guardó el token `t` pide los cambios con id > t y
+# recibe cada videojuego afectado una sola vez, con su estado actual o como
+# baja. El costo depende de cuántos cambios hubo, no del tamaño del catálogo.
+#
+# La compactación borra los cambios superados por otro posterior del mismo
+# videojuego (no afecta a ningún token) y las bajas viejas; los tokens
+# anteriores a la última baja descartada quedan vencidos y esos clientes
+# tienen que volver a descargar el catálogo.
+
+
+class TokenVencido(Exception):
+    """El token es anterior a bajas que la compactación ya descartó"""
+
+
+def parse_token(valor):
+    """Valida el parámetro `since`; None si no se envió"""
+    if valor in (None, ''):
+        return None
+    try:
+        token = int(valor)
+    except (ValueError, TypeError):
+        raise ValueError('El parámetro since debe ser un token devuelto por la API')
+    if token < 0:
+        raise ValueError('El parámetro since debe ser un token devuelto por la API')
+    return token
+
+
+def registrar(ids, eliminado=False):
+    """
+    Agrega al registro un cambio (o una baja) por cada id.
+    Devuelve [(token, videojuego_id, eliminado)].
+    """
+    if len(ids) == 1:
+        # bulk_create abre una transacción propia: para un solo cambio sobra
+        registrados = [CambioVideojuego.objects.create(videojuego_id=ids[0], eliminado=eliminado)]
+    else:
+        registrados = CambioVideojuego.objects.bulk_create(
+            [CambioVideojuego(videojuego_id=id, eliminado=eliminado) for id in ids],
+            batch_size=settings.API_BULK_BATCH_SIZE,
+        )
+    return [(cambio.pk, cambio.videojuego_id, eliminado) for cambio in registrados]
+
+
+def _vencimiento():
+    return CompactacionCambios.objects.values_list('hasta', flat=True).first() or 0
+
+
+def token_actual():
+    """Token a partir del cual pedir cambios después de descargar el catálogo completo"""
+    ultimo = CambioVideojuego.objects.aggregate(ultimo=Max('id'))['ultimo']
+    return max(ultimo or 0, _vencimiento())
+
+
+def leer(desde, limite):
+    """
+    Cambios con token mayor que `desde`, de a `limite` filas del registro.
+    Devuelve (ids creados o modificados, ids eliminados, siguiente token, hay_mas).
+    """
+    if desde < _vencimiento():
+        raise TokenVencido
+    registro = CambioVideojuego.objects.filter(id__gt=desde)
+    margen = settings.API_CAMBIOS_MARGEN_SEGUNDOS
+    if margen:
+        # En PostgreSQL los ids se asignan al insertar pero las transacciones
+        # confirman en otro orden: los cambios muy recientes se dejan para la
+        # próxima consulta, por si una transacción anterior aún no confirmó.
+        registro = registro.filter(creado__lte=timezone.now() - timedelta(seconds=margen))
+    filas = list(registro.order_by('id').values_list('id', 'videojuego_id', 'eliminado')[:limite + 1])
+    hay_mas = len(filas) > limite
+    filas = filas[:limite]
+
+    # Por videojuego solo importa el último cambio
+    eliminados = {}
+    for _, videojuego_id, eliminado in filas:
+        eliminados[videojuego_id] = eliminado
+    siguiente = filas[-1][0] if filas else desde
+    return (
+        sorted(id for id, eliminado in eliminados.items() if not eliminado),
+        sorted(id for id, eliminado in eliminados.items() if eliminado),
+        siguiente,
+        hay_mas,
+    )
+
+
+def compactar(dias):
+    """
+    Descarta los cambios de más de `dias` días que ya no aportan nada: los
+    superados por otro cambio del mismo videojuego y las bajas. Devuelve la
+    CompactacionCambios registrada.
+    """
+    limite = timezone.now() - timedelta(days=dias)
+    corte = CambioVideojuego.objects.filter(creado__lt=limite).aggregate(corte=Max('id'))['corte'] or 0
+    with transaction.atomic():
+        posteriores = CambioVideojuego.objects.filter(videojuego_id=OuterRef('videojuego_id'), id__gt=OuterRef('id'))
+        superados, _ = CambioVideojuego.objects.filter(id__lte=corte).filter(Exists(posteriores)).delete()
+        bajas = CambioVideojuego.objects.filter(id__lte=corte, eliminado=True)
+        ultima_baja = bajas.aggregate(ultima=Max('id'))['ultima'] or 0
+        descartadas, _ = bajas.delete()
+        return CompactacionCambios.objects.create(
+            hasta=max(ultima_baja, _vencimiento()),
+            eliminados=superados + descartadas,
+        )
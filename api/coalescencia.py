@@ -0,0 +1,47 @@
+import asyncio
+import threading
+
+from . import replicas
+
+# Coalescencia de lecturas ("single flight") para las vistas async.
+#
+# Si llegan varias peticiones idénticas mientras la primera todavía está
+# consultando, las demás esperan ese mismo resultado en vez de lanzar su
+# propia consulta. Solo se agrupan las que coinciden en el tiempo: no es un
+# cache, la tarea se olvida apenas termina. Una petición que llega justo
+# después de un cambio puede recibir el resultado de una consulta que empezó
+# antes del commit (como mucho, la duración de esa consulta).
+
+_en_curso = {}
+_contadores = {'ejecutadas': 0, 'compartidas': 0}
+_lock = threading.Lock()
+
+
+def estadisticas():
+    """Cuántas lecturas se ejecutaron y cuántas reutilizaron una en curso"""
+    with _lock:
+        return dict(_contadores)
+
+
+def reiniciar_estadisticas():
+    with _lock:
+        _contadores['ejecutadas'] = 0
+        _contadores['compartidas'] = 0
+
+
+async def ejecutar(clave, funcion):
+    """Ejecuta la corrutina `funcion()` una sola vez entre las llamadas concurrentes con la misma clave"""
+    # Bajo WSGI cada petición async corre en su propio event loop y una tarea
+    # no puede esperarse desde otro loop: se agrupa solo dentro del mismo. Las
+    # lecturas fijadas a la primaria tampoco esperan a una hecha en réplica.
+    clave = (id(asyncio.get_running_loop()), replicas.usar_primaria(), clave)
+    tarea = _en_curso.get(clave)
+    with _lock:
+        _contadores['compartidas' if tarea else 'ejecutadas'] += 1
+    if tarea is None:
+        tarea = asyncio.ensure_future(funcion())
+        _en_curso[clave] = tarea
+        tarea.add_done_callback(lambda _: _en_curso.pop(clave, None))
+    # shield: si el cliente que lanzó la consulta se desconecta, la tarea
+    # sigue corriendo para los que la están esperando.
+    return await asyncio.shield(tarea)
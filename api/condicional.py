@@ -0,0 +1,144 @@
+import hashlib
+from datetime import datetime, timezone as dt_timezone
+from functools import wraps
+
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, parse_etags
+from django.utils.http import http_date, quote_etag
+
+from . import cache, coalescencia, filtros
+from .models import Videojuego
+
+# ETag y Last-Modified de las lecturas de la API, calculados sin traer filas
+# ni serializar el cuerpo: el listado usa max(updated_at) y la cantidad de
+# filas del conjunto filtrado (un solo aggregate, cacheado por versión del
+# catálogo) y el detalle usa el updated_at de la fila.
+
+
+def _etag(*partes):
+    return '"%s"' % hashlib.sha1('|'.join(str(parte) for parte in partes).encode()).hexdigest()
+
+
+async def clave_lista(request):
+    """Clave de cache de la página pedida, memorizada en la petición"""
+    if not hasattr(request, '_clave_lista'):
+        request._clave_lista = await cache.aclave_lista(request.GET)
+    return request._clave_lista
+
+
+async def _calcular_meta_lista(clave, queryset):
+    resumen = await queryset.aaggregate(ultimo=Max('updated_at'), total=Count('id'))
+    meta = (resumen['ultimo'], resumen['total'])
+    await cache.aguardar(clave, meta)
+    return meta
+
+
+async def _meta_lista(request):
+    """(etag, last_modified) del listado, memorizado en la petición"""
+    if not hasattr(request, '_meta_lista'):
+        clave = await clave_lista(request) + ':meta'
+        meta = await cache.aobtener(clave)
+        if meta is None:
+            try:
+                queryset = filtros.filtrar_videojuegos(Videojuego.objects.all(), request.GET)
+            except ValueError:
+                # Parámetros inválidos: la vista responde el 400
+                request._meta_lista = (None, None)
+                return request._meta_lista
+            meta = await coalescencia.ejecutar(clave, lambda: _calcular_meta_lista(clave, queryset))
+        ultimo, total = meta
+        consulta = '&'.join(f'{k}={v}' for k, v in sorted(request.GET.lists()))
+        last_modified = ultimo
+        # Las bajas no mueven max(updated_at): se usa también la hora del
+        # último cambio conocido del catálogo.
+        ultimo_cambio = await cache.aultimo_cambio()
+        if ultimo_cambio and (last_modified is None or ultimo_cambio > last_modified):
+            last_modified = ultimo_cambio
+        request._meta_lista = (_etag('lista', consulta, ultimo and ultimo.isoformat(), total), last_modified)
+    return request._meta_lista
+
+
+async def etag_lista(request):
+    return (await _meta_lista(request))[0]
+
+
+async def last_modified_lista(request):
+    return (await _meta_lista(request))[1]
+
+
+async def _updated_at_detalle(request, id):
+    """updated_at del videojuego (del cache de detalle si está), memorizado en la petición"""
+    if not hasattr(request, '_updated_at_detalle'):
+        data = await cache.aobtener(cache.clave_detalle(id))
+        if data is not None:
+            updated_at = datetime.fromisoformat(data['updated_at'])
+        else:
+            updated_at = await coalescencia.ejecutar(
+                cache.clave_detalle(id) + ':updated_at',
+                lambda: Videojuego.objects.filter(id=id).values_list('updated_at', flat=True).afirst(),
+            )
+        request._updated_at_detalle = updated_at
+    return request._updated_at_detalle
+
+
+def etag_videojuego(id, updated_at):
+    return _etag('detalle', id, updated_at.isoformat())
+
+
+async def etag_detalle(request, id):
+    updated_at = await _updated_at_detalle(request, id)
+    if not updated_at:
+        return None
+    campos = request.GET.get('fields')
+    if campos:
+        # Cada proyección es una representación distinta del recurso
+        return _etag('detalle', id, updated_at.isoformat(), campos)
+    return etag_videojuego(id, updated_at)
+
+
+async def last_modified_detalle(request, id):
+    return await _updated_at_detalle(request, id)
+
+
+def condicion(etag_func=None, last_modified_func=None):
+    """
+    Equivalente de django.views.decorators.http.condition para vistas async.
+    El de Django llama a las funciones de ETag y Last-Modified de forma
+    síncrona dentro del event loop, donde no se puede usar el ORM; aquí son
+    corrutinas y se esperan.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        async def envoltura(request, *args, **kwargs):
+            last_modified = None
+            if last_modified_func:
+                if fecha := await last_modified_func(request, *args, **kwargs):
+                    if not timezone.is_aware(fecha):
+                        fecha = timezone.make_aware(fecha, dt_timezone.utc)
+                    last_modified = int(fecha.timestamp())
+            etag = await etag_func(request, *args, **kwargs) if etag_func else None
+            etag = quote_etag(etag) if etag is not None else None
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = await vista(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD'):
+                if last_modified and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(last_modified)
+                if etag:
+                    response.headers.setdefault('ETag', etag)
+            return response
+        return envoltura
+    return decorador
+
+
+def cumple_if_match(request, etag_actual):
+    """Evalúa la cabecera If-Match contra el ETag actual del recurso"""
+    cabecera = request.headers.get('If-Match')
+    if not cabecera:
+        return True
+    # Comparación débil: ComprimirRespuestas convierte en W/"..." el ETag de
+    # las respuestas que comprime, y el cliente devuelve el que recibió.
+    etags = [etag.removeprefix('W/') for etag in parse_etags(cabecera)]
+    return '*' in etags or etag_actual in etags
@@ -0,0 +1,43 @@
+import json
+
+from django.conf import settings
+from django.db import connections
+
+from . import cache
+
+# Conteos para el admin sobre catálogos grandes.
+#
+# Un COUNT(*) exacto recorre toda la tabla (o todo el índice) en cada carga
+# de la lista. En PostgreSQL se usa la estimación de filas del planificador
+# (EXPLAIN, que sale de las estadísticas de ANALYZE y no lee la tabla) y solo
+# se cuenta de verdad cuando la estimación es chica. En el resto de las bases
+# el conteo exacto se guarda en el cache del catálogo bajo su versión: se
+# recalcula una vez por cambio del catálogo, no en cada carga.
+
+
+def estimar(queryset):
+    """Filas que el planificador de PostgreSQL espera para el queryset"""
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def contar(queryset):
+    """Devuelve (conteo, es_estimado) del queryset"""
+    if connections[queryset.db].vendor == 'postgresql':
+        estimado = estimar(queryset)
+        if estimado >= settings.API_ADMIN_CONTEO_EXACTO_HASTA:
+            return estimado, True
+        return queryset.count(), False
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    clave = cache.clave_conteo(f'{queryset.db}:{sql}:{params!r}')
+    conteo = cache.obtener(clave)
+    if conteo is None:
+        conteo = queryset.count()
+        cache.guardar(clave, conteo)
+    return conteo, False
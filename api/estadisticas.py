@@ -0,0 +1,176 @@
+from decimal import Decimal
+
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+
+from .models import EstadisticaInventario, Videojuego
+
+# Estadísticas de inventario por plataforma y género.
+#
+# La tabla EstadisticaInventario guarda un total por combinación y se mantiene
+# con deltas: cada escritura de un videojuego resta su aporte anterior y suma
+# el nuevo con UPDATE ... SET x = x + delta, dentro de la misma transacción.
+# Así el endpoint lee a lo sumo plataformas×géneros filas, sin recorrer el
+# catálogo. `recalcular()` rehace la tabla desde cero para reconciliar.
+
+# Columnas de un videojuego que afectan las estadísticas
+COLUMNAS = ('plataforma', 'genero', 'precio', 'stock')
+
+METRICAS = ('cantidad', 'unidades', 'valor', 'stock_bajo')
+
+CENTAVOS = Decimal('0.01')
+
+
+def fila(videojuego):
+    """Tupla (plataforma, genero, precio, stock) de una instancia"""
+    return tuple(getattr(videojuego, columna) for columna in COLUMNAS)
+
+
+def filas(queryset):
+    """Tuplas (plataforma, genero, precio, stock) de un queryset"""
+    return list(queryset.values_list(*COLUMNAS))
+
+
+def acumular(deltas, filas, signo):
+    """Suma (signo=1) o resta (signo=-1) el aporte de `filas` en `deltas`"""
+    umbral = settings.API_UMBRAL_STOCK_BAJO
+    for plataforma, genero, precio, stock in filas:
+        # crear_videojuego asigna el precio como float; se normaliza a Decimal
+        precio = Decimal(str(precio)).quantize(CENTAVOS)
+        total = deltas.setdefault((plataforma, genero), [0, 0, Decimal('0.00'), 0])
+        total[0] += signo
+        total[1] += signo * stock
+        total[2] += signo * precio * stock
+        total[3] += signo * (stock <= umbral)
+    return deltas
+
+
+def aplicar(deltas):
+    """Aplica los deltas {(plataforma, genero): [cantidad, unidades, valor, stock_bajo]}"""
+    # Orden fijo de claves: dos transacciones nunca se bloquean en orden inverso
+    for (plataforma, genero), valores in sorted(deltas.items()):
+        if not any(valores):
+            continue
+        cambios = {metrica: F(metrica) + valor for metrica, valor in zip(METRICAS, valores)}
+        grupo = EstadisticaInventario.objects.filter(plataforma=plataforma, genero=genero)
+        if grupo.update(**cambios):
+            continue
+        try:
+            # Primera vez que aparece la combinación; si otra transacción la
+            # crea en paralelo, el INSERT falla y se vuelve al UPDATE.
+            with transaction.atomic():
+                EstadisticaInventario.objects.create(
+                    plataforma=plataforma, genero=genero, **dict(zip(METRICAS, valores))
+                )
+        except IntegrityError:
+            grupo.update(**cambios)
+
+
+def registrar(previas, actuales):
+    """Aplica la diferencia entre las filas previas y las actuales de un cambio"""
+    deltas = acumular({}, previas, -1)
+    aplicar(acumular(deltas, actuales, 1))
+
+
+def previa(videojuego):
+    """Filas con las que el videojuego figura hoy en la base (ninguna si es nuevo)"""
+    cargados = getattr(videojuego, '_valores_cargados', {})
+    if all(columna in cargados for columna in COLUMNAS):
+        return [tuple(cargados[columna] for columna in COLUMNAS)]
+    if videojuego.pk is None:
+        return []
+    return filas(Videojuego.objects.filter(pk=videojuego.pk))
+
+
+def antes_de_guardar(videojuego, update_fields):
+    if update_fields is not None and not set(COLUMNAS) & set(update_fields):
+        videojuego._estadistica_previa = None
+    else:
+        videojuego._estadistica_previa = previa(videojuego)
+
+
+def despues_de_guardar(videojuego, update_fields):
+    previas = videojuego.__dict__.pop('_estadistica_previa', None)
+    if previas is None:
+        return
+    actual = fila(videojuego)
+    if update_fields is not None and previas:
+        # Las columnas que no se escribieron conservan el valor de la base
+        actual = tuple(
+            valor if columna in update_fields else anterior
+            for columna, valor, anterior in zip(COLUMNAS, actual, previas[0])
+        )
+    registrar(previas, [actual])
+    videojuego._valores_cargados = {**getattr(videojuego, '_valores_cargados', {}), **dict(zip(COLUMNAS, actual))}
+
+
+def antes_de_eliminar(videojuego):
+    registrar(previa(videojuego), [])
+
+
+def recalcular(apps=django_apps):
+    """
+    Rehace la tabla completa a partir del catálogo. Devuelve la cantidad de
+    grupos que no coincidían con lo guardado (0 si las estadísticas estaban al día).
+    `apps` permite usarla desde una migración con los modelos históricos.
+    """
+    Videojuego = apps.get_model('api', 'Videojuego')
+    Estadistica = apps.get_model('api', 'EstadisticaInventario')
+
+    valor = ExpressionWrapper(F('precio') * F('stock'), output_field=DecimalField(max_digits=28, decimal_places=2))
+    with transaction.atomic():
+        guardadas = {
+            (e.plataforma, e.genero): (e.cantidad, e.unidades, e.valor, e.stock_bajo)
+            for e in Estadistica.objects.select_for_update()
+            if e.cantidad
+        }
+        calculadas = {
+            (grupo['plataforma'], grupo['genero']): (
+                grupo['cantidad'], grupo['unidades'] or 0,
+                (grupo['valor'] or Decimal('0')).quantize(CENTAVOS), grupo['stock_bajo'],
+            )
+            for grupo in Videojuego.objects.order_by().values('plataforma', 'genero').annotate(
+                cantidad=Count('id'),
+                unidades=Sum('stock'),
+                valor=Sum(valor),
+                stock_bajo=Count('id', filter=Q(stock__lte=settings.API_UMBRAL_STOCK_BAJO)),
+            )
+        }
+        Estadistica.objects.all().delete()
+        Estadistica.objects.bulk_create([
+            Estadistica(plataforma=plataforma, genero=genero, **dict(zip(METRICAS, valores)))
+            for (plataforma, genero), valores in calculadas.items()
+        ])
+    return sum(1 for clave in calculadas.keys() | guardadas.keys() if calculadas.get(clave) != guardadas.get(clave))
+
+
+def resumen():
+    """Totales por grupo, por plataforma, por género y generales, listos para JSON"""
+    grupos = list(
+        EstadisticaInventario.objects.filter(cantidad__gt=0)
+        .values_list('plataforma', 'genero', *METRICAS)
+    )
+
+    def totales(clave):
+        acumulado = {}
+        for grupo in grupos:
+            total = acumulado.setdefault(clave(grupo), [0, 0, Decimal('0.00'), 0])
+            for i, valor in enumerate(grupo[2:]):
+                total[i] += valor
+        return acumulado
+
+    def payload(valores, **extra):
+        data = dict(extra, **dict(zip(METRICAS, valores)))
+        data['valor'] = str(data['valor'])
+        return data
+
+    total = totales(lambda grupo: None).get(None, [0, 0, Decimal('0.00'), 0])
+    return {
+        'umbral_stock_bajo': settings.API_UMBRAL_STOCK_BAJO,
+        'total': payload(total),
+        'por_plataforma': [payload(v, plataforma=k) for k, v in sorted(totales(lambda g: g[0]).items())],
+        'por_genero': [payload(v, genero=k) for k, v in sorted(totales(lambda g: g[1]).items())],
+        'por_grupo': [payload(g[2:], plataforma=g[0], genero=g[1]) for g in grupos],
+    }
@@ -0,0 +1,124 @@
+import gzip
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils._os import safe_join
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional; sin él solo se generan los .gz
+    brotli = None
+
+# Estáticos con huella y precomprimidos.
+#
+# `manage.py build_estaticos` corre collectstatic (con ESTATICOS_CON_HUELLA,
+# cada archivo se copia además como nombre.<hash>.ext y el template los
+# referencia por ese nombre) y deja junto a cada archivo de texto sus
+# variantes .br y .gz. Con ESTATICOS_SERVIR, la vista servir_estatico entrega
+# la mejor variante que acepte el cliente y marca como inmutables los
+# archivos con huella: si el contenido cambia, cambia el nombre.
+
+EXTENSIONES_TEXTO = ('.css', '.js', '.mjs', '.map', '.svg', '.html', '.json', '.txt', '.xml')
+
+# Por debajo de esto el ahorro no compensa una petición con Content-Encoding
+MINIMO_COMPRIMIR = 256
+
+# Variantes en orden de preferencia del servidor: (codificación, extensión)
+CODIFICACIONES = (('br', '.br'), ('gzip', '.gz'))
+
+CACHE_INMUTABLE = 'public, max-age=31536000, immutable'
+CACHE_REVALIDAR = 'public, max-age=0, must-revalidate'
+
+# nombre.<12 hex>.ext, como los genera ManifestStaticFilesStorage
+HUELLA = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+
+
+class AlmacenEstaticos(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage que no falla por url() a archivos inexistentes"""
+
+    def hashed_name(self, name, content=None, filename=None):
+        try:
+            return super().hashed_name(name, content, filename)
+        except ValueError:
+            if content is not None:
+                raise
+            # Un CSS referencia una imagen que no está en el proyecto (por
+            # ejemplo /static/images/hero-bg.jpg): se deja la URL como estaba.
+            return name
+
+
+def comprimible(nombre):
+    return nombre.endswith(EXTENSIONES_TEXTO)
+
+
+def precomprimir(ruta):
+    """
+    Escribe ruta.br y ruta.gz si achican el archivo y no están al día.
+    Devuelve {extensión: bytes} de las variantes que quedaron junto al archivo.
+    """
+    estado = os.stat(ruta)
+    if estado.st_size < MINIMO_COMPRIMIR:
+        return {}
+    with open(ruta, 'rb') as archivo:
+        datos = archivo.read()
+
+    compresores = {'.gz': lambda: gzip.compress(datos, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        compresores['.br'] = lambda: brotli.compress(datos, quality=11)
+
+    tamanos = {}
+    for extension, comprimir in compresores.items():
+        destino = ruta + extension
+        if os.path.exists(destino) and os.stat(destino).st_mtime >= estado.st_mtime:
+            tamanos[extension] = os.stat(destino).st_size
+            continue
+        comprimido = comprimir()
+        if len(comprimido) >= estado.st_size:
+            continue
+        with open(destino, 'wb') as archivo:
+            archivo.write(comprimido)
+        tamanos[extension] = len(comprimido)
+    return tamanos
+
+
+def tiene_huella(ruta):
+    return bool(HUELLA.search(ruta))
+
+
+def _codificaciones_aceptadas(cabecera):
+    aceptadas = set()
+    for parte in cabecera.lower().split(','):
+        codificacion, _, parametros = parte.partition(';')
+        calidad = parametros.strip()
+        if calidad.startswith('q='):
+            try:
+                if float(calidad[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        aceptadas.add(codificacion.strip())
+    return aceptadas
+
+
+def resolver(ruta, accept_encoding):
+    """
+    Devuelve (archivo a enviar, codificación o None, archivo original) para
+    una ruta de STATIC_ROOT. Lanza FileNotFoundError si no existe o si la
+    ruta sale de STATIC_ROOT.
+    """
+    try:
+        original = safe_join(settings.STATIC_ROOT, ruta)
+    except SuspiciousFileOperation:
+        raise FileNotFoundError(ruta)
+    if not os.path.isfile(original) or original.endswith(tuple(ext for _, ext in CODIFICACIONES)):
+        raise FileNotFoundError(ruta)
+
+    if comprimible(original):
+        aceptadas = _codificaciones_aceptadas(accept_encoding)
+        for codificacion, extension in CODIFICACIONES:
+            if (codificacion in aceptadas or '*' in aceptadas) and os.path.isfile(original + extension):
+                return original + extension, codificacion, original
+    return original, None, original
@@ -0,0 +1,369 @@
+import asyncio
+import json
+import threading
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection, connections, transaction
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+from . import cambios, serializadores
+from .models import Videojuego
+
+# Eventos en vivo del catálogo (Server-Sent Events, GET /api/eventos/).
+#
+# Las señales registran cada cambio en el feed de cambios y, al confirmarse
+# la transacción, publican un evento por videojuego (`videojuego` con el
+# payload completo, `stock` con el stock nuevo o `baja`) cuyo id SSE es el
+# token del feed. El Hub reparte cada evento, codificado una sola vez, a las
+# suscripciones de este proceso; el backend (API_EVENTOS_BACKEND) decide cómo
+# llega de un proceso a otro.
+#
+# Cada cliente tiene una cola acotada (API_EVENTOS_COLA). Si un cliente lento
+# la llena, se descarta lo pendiente y se le envía un único evento
+# `sincronizar` con el último token que recibió: se pone al día con
+# /api/videojuegos/cambios/?since=... y la memoria no crece. Un cliente
+# inactivo solo ocupa su suscripción y la cola vacía.
+#
+# Bajo ASGI, Django reserva para cada petición un hilo y una conexión a la
+# base mientras dure; en una conexión SSE eso es para siempre. Por eso
+# backend/asgi.py atiende /api/eventos/ con con_eventos(), antes de Django y
+# sin middlewares: cada cliente cuesta una tarea, su generador y su cola. La
+# vista eventos_catalogo queda para cuando la aplicación se usa sin envolver.
+
+
+class DemasiadosClientes(Exception):
+    """Se alcanzó API_EVENTOS_MAX_CLIENTES en este proceso"""
+
+
+def codificar(eventos):
+    """[(token, tipo, datos)] -> [(token, bytes SSE)]"""
+    return [
+        (token, b'id: %d\nevent: %s\ndata: %s\n\n' % (token, tipo.encode(), serializadores.a_json(datos)))
+        for token, tipo, datos in eventos
+    ]
+
+
+def _sincronizar(token):
+    return b'event: sincronizar\ndata: %s\n\n' % serializadores.a_json({'since': str(token)})
+
+
+class Suscripcion:
+    """
+    Mensajes pendientes de un cliente. Una lista y un future en vez de
+    asyncio.Queue: con miles de clientes inactivos, los cuatro deques de cada
+    Queue pesan más que todo lo demás.
+    """
+    __slots__ = ('loop', 'tamano', 'pendientes', 'espera', 'ultimo_token', 'desbordada')
+
+    def __init__(self, loop, tamano):
+        self.loop = loop
+        self.tamano = tamano
+        self.pendientes = []
+        self.espera = None
+        self.ultimo_token = 0
+        self.desbordada = False
+
+    def poner(self, mensajes):
+        """Encola mensajes [(token, bytes)]; corre en el loop de la suscripción"""
+        if self.desbordada:
+            # Ya se pidió sincronizar: el feed cubre todo lo posterior
+            return
+        if len(self.pendientes) + len(mensajes) > self.tamano:
+            self.desbordada = True
+            self.pendientes = [(None, _sincronizar(self.ultimo_token))]
+        else:
+            self.pendientes.extend(mensajes)
+        if self.espera is not None and not self.espera.done():
+            self.espera.set_result(None)
+
+    async def tomar(self, segundos):
+        """Todos los mensajes pendientes; [] si pasan `segundos` sin ninguno"""
+        if not self.pendientes:
+            self.espera = self.loop.create_future()
+            try:
+                await asyncio.wait_for(self.espera, segundos)
+            except asyncio.TimeoutError:
+                return []
+            finally:
+                self.espera = None
+        mensajes, self.pendientes = self.pendientes, []
+        return mensajes
+
+
+def _repartir(suscripciones, mensajes):
+    for suscripcion in suscripciones:
+        suscripcion.poner(mensajes)
+
+
+class Hub:
+    """Suscripciones de este proceso y reparto de los eventos entre ellas"""
+
+    def __init__(self):
+        self._suscripciones = set()
+        self._lock = threading.Lock()
+        self._backend = None
+
+    def backend(self):
+        with self._lock:
+            if self._backend is None:
+                self._backend = import_string(settings.API_EVENTOS_BACKEND)(self)
+            return self._backend
+
+    def clientes(self):
+        return len(self._suscripciones)
+
+    def suscribir(self):
+        backend = self.backend()
+        suscripcion = Suscripcion(asyncio.get_running_loop(), settings.API_EVENTOS_COLA)
+        with self._lock:
+            if len(self._suscripciones) >= settings.API_EVENTOS_MAX_CLIENTES:
+                raise DemasiadosClientes
+            self._suscripciones.add(suscripcion)
+        backend.iniciar()
+        return suscripcion
+
+    def desuscribir(self, suscripcion):
+        with self._lock:
+            self._suscripciones.discard(suscripcion)
+
+    def activo(self):
+        """Si vale la pena armar eventos (alguien, en algún proceso, puede recibirlos)"""
+        return self.backend().activo()
+
+    def publicar(self, eventos):
+        self.backend().publicar(eventos)
+
+    def entregar(self, mensajes):
+        """Reparte mensajes [(token, bytes)] a las suscripciones locales; se llama desde cualquier hilo"""
+        with self._lock:
+            por_loop = {}
+            for suscripcion in self._suscripciones:
+                por_loop.setdefault(suscripcion.loop, []).append(suscripcion)
+        # Una sola llamada (un solo despertar) por loop, no una por cliente
+        for loop, suscripciones in por_loop.items():
+            try:
+                loop.call_soon_threadsafe(_repartir, suscripciones, mensajes)
+            except RuntimeError:
+                # El loop ya se cerró: esas suscripciones no van a leer más
+                for suscripcion in suscripciones:
+                    self.desuscribir(suscripcion)
+
+
+class BackendLocal:
+    """Reparte los eventos solo entre los clientes conectados a este proceso"""
+
+    def __init__(self, hub):
+        self.hub = hub
+
+    def iniciar(self):
+        pass
+
+    def activo(self):
+        return self.hub.clientes() > 0
+
+    def publicar(self, eventos):
+        self.hub.entregar(codificar(eventos))
+
+
+class BackendPostgres:
+    """
+    Comparte los eventos entre procesos con LISTEN/NOTIFY de PostgreSQL: cada
+    proceso con clientes escucha el canal en un hilo con su propia conexión.
+    """
+    CANAL = 'api_eventos'
+    # NOTIFY admite hasta 8000 bytes; los payloads más grandes viajan sin
+    # datos y el cliente los pide a la API
+    MAXIMO_BYTES = 7900
+
+    def __init__(self, hub):
+        self.hub = hub
+        self._hilo = None
+        self._lock = threading.Lock()
+
+    def iniciar(self):
+        with self._lock:
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._escuchar, name='api-eventos', daemon=True)
+                self._hilo.start()
+
+    def activo(self):
+        # Otros procesos pueden tener clientes
+        return True
+
+    def publicar(self, eventos):
+        payloads = []
+        for token, tipo, datos in eventos:
+            payload = json.dumps([token, tipo, datos], ensure_ascii=False, separators=(',', ':'))
+            if len(payload.encode()) > self.MAXIMO_BYTES:
+                payload = json.dumps([token, tipo, {'id': datos['id']}])
+            payloads.append(payload)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, payload) FROM unnest(%s::text[]) AS payload', [self.CANAL, payloads])
+
+    def _escuchar(self):
+        import psycopg
+
+        while True:
+            try:
+                with psycopg.connect(**connections['default'].get_connection_params(), autocommit=True) as conexion:
+                    conexion.execute(f'LISTEN {self.CANAL}')
+                    for aviso in conexion.notifies():
+                        self.hub.entregar(codificar([json.loads(aviso.payload)]))
+            except psycopg.Error:
+                # Se cayó la conexión: se reintenta; lo perdido mientras
+                # tanto lo recuperan los clientes con el feed de cambios
+                threading.Event().wait(1)
+
+
+hub = Hub()
+
+
+def _eventos(registrados, stocks):
+    """Arma los eventos de cambios ya confirmados: [(token, videojuego_id, eliminado)]"""
+    stocks = stocks or {}
+    guardados = {id for _, id, eliminado in registrados if not eliminado and id not in stocks}
+    payloads = {}
+    if guardados:
+        filas = Videojuego.objects.filter(id__in=guardados).values_list(*serializadores.COMPLETO.columnas)
+        payloads = {data['id']: data for data in serializadores.COMPLETO.filas(filas)}
+    eventos = []
+    for token, id, eliminado in registrados:
+        if eliminado:
+            eventos.append((token, 'baja', {'id': id}))
+        elif id in stocks:
+            eventos.append((token, 'stock', {'id': id, 'stock': stocks[id]}))
+        elif id in payloads:
+            # Si ya no está, su baja llega en otro evento
+            eventos.append((token, 'videojuego', payloads[id]))
+    return eventos
+
+
+def notificar(registrados, stocks=None):
+    """Publica los cambios registrados cuando se confirme la transacción en curso"""
+    if not registrados or not hub.activo():
+        return
+
+    def publicar():
+        eventos = _eventos(registrados, stocks)
+        if eventos:
+            hub.publicar(eventos)
+
+    transaction.on_commit(publicar)
+
+
+async def _flujo(suscripcion, desde):
+    try:
+        # Si el cliente se reconecta, el navegador manda el último id recibido
+        actual = await sync_to_async(cambios.token_actual)()
+        suscripcion.ultimo_token = actual if desde is None else desde
+        yield b'retry: 5000\n\n'
+        if desde is not None and actual > desde:
+            yield _sincronizar(desde)
+        while True:
+            mensajes = await suscripcion.tomar(settings.API_EVENTOS_LATIDO_SEGUNDOS)
+            if not mensajes:
+                # Comentario SSE: mantiene viva la conexión a través de proxies
+                yield b': latido\n\n'
+                continue
+            for token, _ in mensajes:
+                if token is None:
+                    suscripcion.desbordada = False
+                else:
+                    suscripcion.ultimo_token = token
+            # Lo acumulado sale en un solo envío
+            yield b''.join(mensaje for _, mensaje in mensajes)
+    finally:
+        hub.desuscribir(suscripcion)
+
+
+class Transmision:
+    """
+    Cuerpo de la respuesta SSE de una suscripción. La suscripción se da de baja
+    cuando Django cierra la respuesta o se cancela el envío (el cliente se fue).
+    """
+
+    def __init__(self, suscripcion, desde=None):
+        self.suscripcion = suscripcion
+        self.desde = desde
+
+    def __aiter__(self):
+        return _flujo(self.suscripcion, self.desde)
+
+    def close(self):
+        hub.desuscribir(self.suscripcion)
+
+
+CABECERAS = [
+    (b'content-type', b'text/event-stream'),
+    (b'cache-control', b'no-cache'),
+    # Que nginx no acumule los eventos en su buffer
+    (b'x-accel-buffering', b'no'),
+]
+
+
+async def _responder_error(send, status, mensaje):
+    cuerpo = serializadores.a_json({'error': mensaje})
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', b'%d' % len(cuerpo))],
+    })
+    await send({'type': 'http.response.body', 'body': cuerpo})
+
+
+async def _atender(scope, receive, send):
+    cabeceras = dict(scope['headers'])
+    since = parse_qs(scope['query_string'].decode('latin-1')).get('since', [None])[0]
+    try:
+        desde = cambios.parse_token(cabeceras.get(b'last-event-id', b'').decode('latin-1') or since)
+    except ValueError as e:
+        await _responder_error(send, 400, str(e))
+        return
+    try:
+        suscripcion = hub.suscribir()
+    except DemasiadosClientes:
+        await _responder_error(send, 503, 'Demasiados clientes conectados; reintentar más tarde')
+        return
+
+    tarea = asyncio.current_task()
+
+    async def vigilar():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        tarea.cancel()
+
+    vigilante = asyncio.create_task(vigilar())
+    try:
+        # Fuera del ciclo de peticiones de Django nadie revisa la conexión del
+        # hilo de sync_to_async: se hace acá, como al empezar una petición
+        await sync_to_async(close_old_connections)()
+        await send({'type': 'http.response.start', 'status': 200, 'headers': CABECERAS})
+        async for parte in _flujo(suscripcion, desde):
+            await send({'type': 'http.response.body', 'body': parte, 'more_body': True})
+    except asyncio.CancelledError:
+        # Solo se absorbe la cancelación propia (el cliente se desconectó)
+        if not vigilante.done():
+            raise
+    finally:
+        vigilante.cancel()
+        hub.desuscribir(suscripcion)
+
+
+def con_eventos(aplicacion):
+    """Envuelve una aplicación ASGI para atender GET /api/eventos/ sin pasar por Django"""
+    ruta = None
+
+    async def application(scope, receive, send):
+        nonlocal ruta
+        if scope['type'] == 'http' and scope['method'] == 'GET':
+            if ruta is None:
+                ruta = reverse('eventos_catalogo')
+            if scope['path'] == ruta:
+                await _atender(scope, receive, send)
+                return
+        await aplicacion(scope, receive, send)
+
+    return application
@@ -0,0 +1,319 @@
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from decimal import ROUND_CEILING, ROUND_FLOOR
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import BigIntegerField, F
+from django.db.models.functions import Cast, Round
+
+from . import cache, cambios
+from .models import Videojuego
+
+# Índice de facetas en memoria, uno por proceso.
+#
+# Guarda por columnas (arrays) los datos que usan los filtros de la barra
+# lateral: plataforma y género como códigos chicos según el orden de las
+# opciones del modelo, precio en centavos y si hay stock. Cada posición es una
+# fila y cada valor de plataforma y género, "en stock" y "vivo" tienen un
+# bitmap (un int de Python, un bit por posición). Contar una combinación de filtros es
+# hacer AND de unos pocos bitmaps y bit_count(), sin consultar la base.
+#
+# Las filas se ordenan por precio al construir el índice, así un rango de
+# precios es un tramo contiguo de bits. Lo que cambia de precio o se agrega
+# después va a una cola al final (sin ordenar) y su posición anterior se marca
+# como no viva; cuando la cola o las posiciones muertas pasan de
+# API_FACETAS_MAXIMO_INCREMENTAL, el índice se reconstruye.
+#
+# Los cambios de este proceso llegan por las señales al confirmar la
+# transacción. Si la versión del catálogo no coincide con la del índice (otro
+# proceso escribió), antes de contar se leen los cambios pendientes del feed;
+# si el token venció o son demasiados, se reconstruye todo.
+
+PLATAFORMAS = tuple(codigo for codigo, _ in Videojuego.PLATAFORMAS)
+GENEROS = tuple(codigo for codigo, _ in Videojuego.GENEROS)
+_CODIGOS_PLATAFORMA = {codigo: i for i, codigo in enumerate(PLATAFORMAS)}
+_CODIGOS_GENERO = {codigo: i for i, codigo in enumerate(GENEROS)}
+
+# El precio llega ya en centavos desde la base, sin pasar por Decimal
+CENTAVOS = Cast(Round(F('precio') * 100), BigIntegerField())
+
+# Combinaciones de filtros memorizadas por índice
+MAXIMO_CONTEOS = 256
+
+_lock = threading.Lock()
+_indice = None
+
+
+def _filas(queryset):
+    """(id, plataforma, genero, centavos, stock) de los videojuegos del queryset"""
+    return queryset.values_list('id', 'plataforma', 'genero', CENTAVOS, 'stock')
+
+
+def _leer(queryset):
+    """
+    Bloques de filas del queryset leídos con un cursor de servidor (como
+    iterator()) pero sin los conversores por fila del ORM: las columnas ya
+    llegan con sus tipos.
+    """
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].chunked_cursor() as cursor:
+        cursor.execute(sql, params)
+        while bloque := cursor.fetchmany(settings.API_STREAM_CHUNK_SIZE):
+            yield bloque
+
+
+# Por cada código, la tabla de bytes.translate que lo lleva a b'1' y todo lo demás a b'0'
+_UNOS = [
+    bytes(ord('1') if byte == codigo else ord('0') for byte in range(256))
+    for codigo in range(max(len(PLATAFORMAS), len(GENEROS), 2))
+]
+
+
+def _bitmap(columna, codigo, desde):
+    """Bitmap de las posiciones desde `desde` de una columna array('b') que valen `codigo`"""
+    # translate y int(..., 2) recorren la columna en C, sin un bucle por fila
+    bits = columna[desde:].tobytes().translate(_UNOS[codigo])[::-1]
+    return int(bits, 2) << desde if bits else 0
+
+
+def _mascara(posiciones, largo):
+    """Bitmap con los bits de `posiciones` encendidos"""
+    buffer = bytearray((largo + 7) // 8)
+    for posicion in posiciones:
+        buffer[posicion >> 3] |= 1 << (posicion & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def _tramo(desde, hasta):
+    """Bitmap con las posiciones desde..hasta-1 encendidas"""
+    return ((1 << hasta) - 1) ^ ((1 << desde) - 1) if hasta > desde else 0
+
+
+class Indice:
+    def __init__(self, version, token):
+        self.version = version
+        self.token = token
+        self.ids = array('q')
+        self.plataforma = array('b')
+        self.genero = array('b')
+        self.precio = array('q')
+        self.con_stock = array('b')
+        # Posiciones vivas ordenadas por id, para ubicar una fila sin un dict
+        self.por_id = array('q')
+        # Las posiciones [0, ordenadas) están ordenadas por precio
+        self.ordenadas = 0
+        self.bitmaps = {'vivos': 0, 'en_stock': 0}
+        self.bitmaps.update({('plataforma', codigo): 0 for codigo in PLATAFORMAS})
+        self.bitmaps.update({('genero', codigo): 0 for codigo in GENEROS})
+        # Resultados de contar() por combinación de filtros; se vacía con cada cambio
+        self._conteos = {}
+
+    @classmethod
+    def construir(cls, version):
+        # El token se toma antes de leer: lo que cambie mientras tanto se
+        # vuelve a aplicar desde el feed y el resultado es el mismo.
+        indice = cls(version, cambios.token_actual())
+        indice._agregar(_leer(_filas(Videojuego.objects.order_by('precio', 'id'))), ordenar=False)
+        indice.por_id = array('q', sorted(range(len(indice.ids)), key=indice.ids.__getitem__))
+        indice.ordenadas = len(indice.ids)
+        return indice
+
+    @property
+    def vigente(self):
+        limite = settings.API_FACETAS_MAXIMO_INCREMENTAL
+        muertas = len(self.ids) - len(self.por_id)
+        return len(self.ids) - self.ordenadas <= limite and muertas <= limite
+
+    def _buscar(self, id):
+        """(índice en por_id, posición de la fila o None)"""
+        i = bisect_left(self.por_id, id, key=self.ids.__getitem__)
+        if i < len(self.por_id) and self.ids[self.por_id[i]] == id:
+            return i, self.por_id[i]
+        return i, None
+
+    def _agregar(self, bloques, ordenar=True):
+        """Agrega bloques de filas al final; con `ordenar` las registra también en por_id"""
+        codigo_plataforma, codigo_genero = _CODIGOS_PLATAFORMA.get, _CODIGOS_GENERO.get
+        self._conteos.clear()
+        inicio = len(self.ids)
+        for bloque in bloques:
+            ids, plataformas, generos, centavos, stocks = zip(*bloque)
+            posicion = len(self.ids)
+            self.ids.extend(ids)
+            # Un valor que ya no está entre las opciones no cae en ningún bitmap
+            self.plataforma.extend([codigo_plataforma(valor, -1) for valor in plataformas])
+            self.genero.extend([codigo_genero(valor, -1) for valor in generos])
+            self.precio.extend(centavos)
+            self.con_stock.extend([stock > 0 for stock in stocks])
+            if ordenar:
+                for posicion, id in enumerate(ids, start=posicion):
+                    i, anterior = self._buscar(id)
+                    if anterior is None:
+                        self.por_id.insert(i, posicion)
+                    else:
+                        self.por_id[i] = posicion
+
+        self.bitmaps['vivos'] |= _tramo(inicio, len(self.ids))
+        self.bitmaps['en_stock'] |= _bitmap(self.con_stock, 1, inicio)
+        for nombre, opciones, columna in (('plataforma', PLATAFORMAS, self.plataforma), ('genero', GENEROS, self.genero)):
+            for codigo, valor in enumerate(opciones):
+                self.bitmaps[(nombre, valor)] |= _bitmap(columna, codigo, inicio)
+
+    def aplicar(self, filas, eliminados):
+        """Aplica filas nuevas o modificadas (tuplas de _filas) y bajas"""
+        self._conteos.clear()
+        largo = len(self.ids)
+        encender, apagar, agregadas = {}, {}, []
+        for fila in filas:
+            id, plataforma, genero, centavos, stock = fila
+            _, posicion = self._buscar(id)
+            if posicion is None or self.precio[posicion] != centavos:
+                # Cambia de lugar en el orden por precio: va a la cola
+                if posicion is not None:
+                    apagar.setdefault('vivos', []).append(posicion)
+                agregadas.append(fila)
+                continue
+            for nombre, opciones, codigos, columna, valor in (
+                ('plataforma', PLATAFORMAS, _CODIGOS_PLATAFORMA, self.plataforma, plataforma),
+                ('genero', GENEROS, _CODIGOS_GENERO, self.genero, genero),
+            ):
+                anterior, nuevo = columna[posicion], codigos.get(valor, -1)
+                if anterior == nuevo:
+                    continue
+                if anterior >= 0:
+                    apagar.setdefault((nombre, opciones[anterior]), []).append(posicion)
+                if nuevo >= 0:
+                    encender.setdefault((nombre, valor), []).append(posicion)
+                columna[posicion] = nuevo
+            if self.con_stock[posicion] != (stock > 0):
+                (encender if stock > 0 else apagar).setdefault('en_stock', []).append(posicion)
+                self.con_stock[posicion] = stock > 0
+
+        for id in eliminados:
+            i, posicion = self._buscar(id)
+            if posicion is not None:
+                del self.por_id[i]
+                apagar.setdefault('vivos', []).append(posicion)
+
+        for clave, posiciones in apagar.items():
+            self.bitmaps[clave] &= ~_mascara(posiciones, largo)
+        for clave, posiciones in encender.items():
+            self.bitmaps[clave] |= _mascara(posiciones, largo)
+        if agregadas:
+            self._agregar([agregadas])
+
+    def _rango_precio(self, minimo, maximo):
+        desde = 0 if minimo is None else bisect_left(self.precio, minimo, 0, self.ordenadas)
+        hasta = self.ordenadas if maximo is None else bisect_right(self.precio, maximo, 0, self.ordenadas)
+        cola = [
+            posicion for posicion in range(self.ordenadas, len(self.ids))
+            if (minimo is None or self.precio[posicion] >= minimo) and (maximo is None or self.precio[posicion] <= maximo)
+        ]
+        return _tramo(desde, hasta) | _mascara(cola, len(self.ids))
+
+    def contar(self, plataformas=(), generos=(), en_stock=False, precio_min=None, precio_max=None):
+        """
+        Total con todos los filtros y conteo de cada faceta. Cada faceta se
+        cuenta con los filtros de las demás pero no con el suyo, así se ve
+        cuánto suma elegir otra opción del mismo grupo.
+        """
+        clave = (frozenset(plataformas), frozenset(generos), bool(en_stock), precio_min, precio_max)
+        conteo = self._conteos.get(clave)
+        if conteo is None:
+            # La barra lateral repite pocas combinaciones: con millones de filas
+            # cada una cuesta milisegundos y memorizarla, microsegundos
+            if len(self._conteos) >= MAXIMO_CONTEOS:
+                self._conteos.clear()
+            conteo = self._conteos[clave] = self._contar(plataformas, generos, en_stock, precio_min, precio_max)
+        return conteo
+
+    def _contar(self, plataformas=(), generos=(), en_stock=False, precio_min=None, precio_max=None):
+        bitmaps = self.bitmaps
+        base = bitmaps['vivos']
+        if precio_min is not None or precio_max is not None:
+            base &= self._rango_precio(
+                None if precio_min is None else int(precio_min.scaleb(2).to_integral_value(ROUND_CEILING)),
+                None if precio_max is None else int(precio_max.scaleb(2).to_integral_value(ROUND_FLOOR)),
+            )
+
+        def union(nombre, codigos):
+            mascara = 0
+            for codigo in codigos:
+                mascara |= bitmaps[(nombre, codigo)]
+            return mascara
+
+        filtros = {
+            'plataforma': union('plataforma', plataformas) if plataformas else None,
+            'genero': union('genero', generos) if generos else None,
+            'en_stock': bitmaps['en_stock'] if en_stock else None,
+        }
+
+        def sin(faceta):
+            mascara = base
+            for nombre, filtro in filtros.items():
+                if nombre != faceta and filtro is not None:
+                    mascara &= filtro
+            return mascara
+
+        sin_plataforma, sin_genero, sin_stock = sin('plataforma'), sin('genero'), sin('en_stock')
+        return {
+            'total': (sin_stock & filtros['en_stock'] if en_stock else sin_stock).bit_count(),
+            'plataforma': {codigo: (sin_plataforma & bitmaps[('plataforma', codigo)]).bit_count() for codigo in PLATAFORMAS},
+            'genero': {codigo: (sin_genero & bitmaps[('genero', codigo)]).bit_count() for codigo in GENEROS},
+            'en_stock': (sin_stock & bitmaps['en_stock']).bit_count(),
+        }
+
+
+def _sincronizar(version):
+    """Aplica los cambios del feed posteriores al índice; False si hay que reconstruir"""
+    try:
+        guardados, eliminados, siguiente, hay_mas = cambios.leer(_indice.token, settings.API_FACETAS_MAXIMO_INCREMENTAL)
+    except cambios.TokenVencido:
+        return False
+    if hay_mas:
+        return False
+    _indice.aplicar(_filas(Videojuego.objects.filter(id__in=guardados)), eliminados)
+    _indice.token = siguiente
+    # Con margen en el feed pueden quedar cambios sin leer: la versión no se
+    # da por alcanzada y la próxima consulta vuelve a sincronizar.
+    if siguiente >= cambios.token_actual():
+        _indice.version = version
+    return _indice.vigente
+
+
+def contar(**filtros):
+    """Conteos de Indice.contar sobre el índice de este proceso, al día con la base"""
+    global _indice
+    version = cache.version_catalogo()
+    with _lock:
+        if _indice is None or (_indice.version != version and not _sincronizar(version)):
+            _indice = Indice.construir(version)
+        return _indice.contar(**filtros)
+
+
+def _aplicar_registrados(registrados):
+    with _lock:
+        tokens = sorted(token for token, _, _ in registrados)
+        # Si hay un hueco (otro proceso escribió en el medio) se deja para el feed
+        if _indice is None or tokens[0] != _indice.token + 1 or tokens[-1] - tokens[0] + 1 != len(tokens):
+            return
+        _indice.aplicar(
+            _filas(Videojuego.objects.filter(id__in=[id for _, id, eliminado in registrados if not eliminado])),
+            [id for _, id, eliminado in registrados if eliminado],
+        )
+        _indice.token = tokens[-1]
+
+
+def notificar(registrados):
+    """Lo llaman las señales con lo que devolvió cambios.registrar"""
+    if registrados and _indice is not None:
+        transaction.on_commit(lambda: _aplicar_registrados(registrados))
+
+
+def reiniciar():
+    """Descarta el índice de este proceso (se reconstruye en la próxima consulta)"""
+    global _indice
+    with _lock:
+        _indice = None
@@ -0,0 +1,107 @@
+from django.core.exceptions import ValidationError
+
+from .models import Videojuego
+from .paginacion import ORDEN_POR_DEFECTO
+
+# Filtros y orden del listado, resueltos en la base de datos.
+#
+# Cada orden permitido termina en `id` para que la paginación por cursor tenga
+# un desempate único, y cada uno está respaldado por un índice del modelo.
+ORDENES = {
+    '-created_at': ORDEN_POR_DEFECTO,
+    'created_at': ('created_at', '-id'),
+    'precio': ('precio', 'id'),
+    '-precio': ('-precio', '-id'),
+    'fecha_lanzamiento': ('fecha_lanzamiento', 'id'),
+    '-fecha_lanzamiento': ('-fecha_lanzamiento', '-id'),
+    'titulo': ('titulo', 'id'),
+    '-titulo': ('-titulo', '-id'),
+}
+
+PLATAFORMAS_VALIDAS = frozenset(codigo for codigo, _ in Videojuego.PLATAFORMAS)
+GENEROS_VALIDOS = frozenset(codigo for codigo, _ in Videojuego.GENEROS)
+
+VALORES_VERDADEROS = ('1', 'true', 'si', 'sí')
+
+
+def parse_orden(valor):
+    """Devuelve la tupla de columnas para el parámetro `ordering`"""
+    if not valor:
+        return ORDEN_POR_DEFECTO
+    if valor not in ORDENES:
+        raise ValueError(f'Orden inválido. Opciones válidas: {", ".join(ORDENES)}')
+    return ORDENES[valor]
+
+
+def _parse_opciones(valor, validas, mensaje):
+    opciones = [opcion for opcion in valor.split(',') if opcion]
+    invalidas = [opcion for opcion in opciones if opcion not in validas]
+    if invalidas:
+        raise ValueError(f'{mensaje}. Opciones válidas: {", ".join(sorted(validas))}')
+    return opciones
+
+
+def _parse_campo(nombre, valor, mensaje):
+    """Convierte un parámetro al tipo del campo del modelo"""
+    try:
+        convertido = Videojuego._meta.get_field(nombre).to_python(valor)
+    except ValidationError:
+        raise ValueError(mensaje)
+    if convertido is None:
+        raise ValueError(mensaje)
+    return convertido
+
+
+def filtrar_videojuegos(queryset, params):
+    """Aplica los filtros de la query string; lanza ValueError si alguno es inválido"""
+    filtros = {}
+
+    if params.get('plataforma'):
+        plataformas = _parse_opciones(params['plataforma'], PLATAFORMAS_VALIDAS, 'Plataforma inválida')
+        if len(plataformas) == 1:
+            filtros['plataforma'] = plataformas[0]
+        else:
+            filtros['plataforma__in'] = plataformas
+
+    if params.get('genero'):
+        generos = _parse_opciones(params['genero'], GENEROS_VALIDOS, 'Género inválido')
+        if len(generos) == 1:
+            filtros['genero'] = generos[0]
+        else:
+            filtros['genero__in'] = generos
+
+    if params.get('desarrollador'):
+        filtros['desarrollador'] = params['desarrollador']
+
+    if params.get('precio_min'):
+        filtros['precio__gte'] = _parse_campo('precio', params['precio_min'], 'El precio_min debe ser un número válido')
+    if params.get('precio_max'):
+        filtros['precio__lte'] = _parse_campo('precio', params['precio_max'], 'El precio_max debe ser un número válido')
+
+    if params.get('en_stock', '').lower() in VALORES_VERDADEROS:
+        filtros['stock__gt'] = 0
+
+    mensaje_fecha = 'Formato de fecha inválido. Use YYYY-MM-DD'
+    if params.get('fecha_desde'):
+        filtros['fecha_lanzamiento__gte'] = _parse_campo('fecha_lanzamiento', params['fecha_desde'], mensaje_fecha)
+    if params.get('fecha_hasta'):
+        filtros['fecha_lanzamiento__lte'] = _parse_campo('fecha_lanzamiento', params['fecha_hasta'], mensaje_fecha)
+
+    return queryset.filter(**filtros)
+
+
+def parse_filtros_facetas(params):
+    """Filtros del listado que resuelve el índice de facetas (api.facetas)"""
+    no_admitidos = [nombre for nombre in ('desarrollador', 'fecha_desde', 'fecha_hasta') if params.get(nombre)]
+    if no_admitidos:
+        raise ValueError(f'Las facetas no admiten los filtros: {", ".join(no_admitidos)}')
+    filtros = {'en_stock': params.get('en_stock', '').lower() in VALORES_VERDADEROS}
+    if params.get('plataforma'):
+        filtros['plataformas'] = _parse_opciones(params['plataforma'], PLATAFORMAS_VALIDAS, 'Plataforma inválida')
+    if params.get('genero'):
+        filtros['generos'] = _parse_opciones(params['genero'], GENEROS_VALIDOS, 'Género inválido')
+    if params.get('precio_min'):
+        filtros['precio_min'] = _parse_campo('precio', params['precio_min'], 'El precio_min debe ser un número válido')
+    if params.get('precio_max'):
+        filtros['precio_max'] = _parse_campo('precio', params['precio_max'], 'El precio_max debe ser un número válido')
+    return filtros
@@ -0,0 +1,76 @@
+import hashlib
+import io
+
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+# Procesamiento de portadas con Pillow.
+#
+# Este módulo corre dentro de los procesos del pool de api.portadas: no usa
+# Django (los procesos se crean con spawn y no lo configuran) y solo trabaja
+# con bytes, que es lo que viaja entre procesos.
+
+# Formatos de las variantes, del más eficiente al más compatible
+FORMATOS = ('avif', 'webp')
+
+OPCIONES = {
+    'avif': {'format': 'AVIF', 'quality': 55, 'speed': 8},
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+}
+
+EXTENSIONES = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp', 'GIF': 'gif', 'AVIF': 'avif'}
+
+
+def formatos_disponibles():
+    """Formatos de FORMATOS que esta instalación de Pillow sabe codificar"""
+    return tuple(formato for formato in FORMATOS if features.check(formato))
+
+
+def anchos_para(ancho_original, anchos):
+    """
+    Anchos a generar: los configurados menores que el original y, si el
+    original no llega al mayor, el propio ancho original (nunca se agranda).
+    """
+    elegidos = [ancho for ancho in sorted(set(anchos)) if ancho < ancho_original]
+    if not anchos or ancho_original <= max(anchos):
+        elegidos.append(ancho_original)
+    return elegidos
+
+
+def procesar(datos, anchos, formatos):
+    """
+    Valida la imagen y genera sus variantes. Devuelve un dict con el sha256
+    del original, su extensión y tamaño, y {formato: [(ancho, bytes), ...]}.
+    Lanza ValueError si los bytes no son una imagen válida.
+    """
+    try:
+        with Image.open(io.BytesIO(datos)) as imagen:
+            formato = imagen.format
+            imagen.load()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise ValueError(f'El archivo no es una imagen válida: {e}')
+    if formato not in EXTENSIONES:
+        raise ValueError(f'Formato de imagen no soportado: {formato}')
+
+    # Respeta la orientación de la cámara y normaliza el modo de color
+    imagen = ImageOps.exif_transpose(imagen)
+    imagen = imagen.convert('RGBA' if imagen.mode in ('RGBA', 'LA', 'P') else 'RGB')
+    ancho_original, alto_original = imagen.size
+
+    variantes = {formato_variante: [] for formato_variante in formatos}
+    for ancho in anchos_para(ancho_original, anchos):
+        alto = max(1, round(alto_original * ancho / ancho_original))
+        reducida = imagen if ancho == ancho_original else imagen.resize(
+            (ancho, alto), Image.Resampling.LANCZOS, reducing_gap=3.0
+        )
+        for formato_variante in formatos:
+            salida = io.BytesIO()
+            reducida.save(salida, **OPCIONES[formato_variante])
+            variantes[formato_variante].append((ancho, salida.getvalue()))
+
+    return {
+        'hash': hashlib.sha256(datos).hexdigest(),
+        'extension': EXTENSIONES[formato],
+        'ancho': ancho_original,
+        'alto': alto_original,
+        'variantes': variantes,
+    }
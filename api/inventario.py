@@ -0,0 +1,89 @@
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import estadisticas, validacion
+from .models import Videojuego
+from .signals import cambio_masivo
+
+# Movimientos de stock atómicos.
+#
+# Cada movimiento es un único UPDATE "stock = stock + delta" condicionado a
+# que el resultado no quede negativo, así dos ventas concurrentes no pueden
+# pisarse ni vender de más. Los lotes (carritos) actualizan las filas en
+# orden de id para que dos transacciones nunca se esperen mutuamente. Una
+# suma tampoco puede pasar el máximo de la columna (validacion.STOCK_MAXIMO).
+
+
+class StockInsuficiente(Exception):
+    """Uno o más videojuegos no tienen stock suficiente; `ids` indica cuáles"""
+
+    def __init__(self, ids):
+        super().__init__('Stock insuficiente')
+        self.ids = ids
+
+
+class StockExcedido(Exception):
+    """El stock resultante de uno o más videojuegos supera el máximo de la columna"""
+
+    def __init__(self, ids):
+        super().__init__('Stock excedido')
+        self.ids = ids
+
+
+def _mover(id, delta, ahora):
+    """Aplica el UPDATE condicional; devuelve True si se modificó la fila"""
+    queryset = Videojuego.objects.filter(id=id)
+    if delta < 0:
+        queryset = queryset.filter(stock__gte=-delta)
+    else:
+        queryset = queryset.filter(stock__lte=validacion.STOCK_MAXIMO - delta)
+    return queryset.update(stock=F('stock') + delta, updated_at=ahora) == 1
+
+
+def ajustar_stock(id, delta):
+    """Suma `delta` (positivo o negativo) al stock y devuelve el stock resultante"""
+    with transaction.atomic():
+        if not _mover(id, delta, timezone.now()):
+            if not Videojuego.objects.filter(id=id).exists():
+                raise Videojuego.DoesNotExist
+            raise StockExcedido([id]) if delta > 0 else StockInsuficiente([id])
+        stock = _notificar({id: delta})[id]
+    return stock
+
+
+def ajustar_stock_lote(movimientos):
+    """
+    Aplica varios movimientos {id: delta} todo-o-nada y devuelve {id: stock}.
+
+    Si algún videojuego no existe, no alcanza el stock o lo superaría al
+    máximo, no se aplica ninguno.
+    """
+    ids = sorted(movimientos)
+    ahora = timezone.now()
+    with transaction.atomic():
+        fallidos = [id for id in ids if not _mover(id, movimientos[id], ahora)]
+        if fallidos:
+            existentes = set(Videojuego.objects.filter(id__in=fallidos).values_list('id', flat=True))
+            faltantes = [id for id in fallidos if id not in existentes]
+            if faltantes:
+                raise Videojuego.DoesNotExist(faltantes)
+            excedidos = [id for id in fallidos if movimientos[id] > 0]
+            if excedidos:
+                raise StockExcedido(excedidos)
+            raise StockInsuficiente(fallidos)
+        stocks = _notificar(movimientos)
+    return stocks
+
+
+def _notificar(movimientos):
+    """
+    Lee el stock resultante de los videojuegos movidos, envía cambio_masivo
+    (el estado previo se deduce restando cada delta) y devuelve {id: stock}.
+    """
+    stocks, previas = {}, []
+    for id, *fila in Videojuego.objects.filter(id__in=list(movimientos)).values_list('id', *estadisticas.COLUMNAS):
+        stocks[id] = fila[-1]
+        previas.append((*fila[:-1], fila[-1] - movimientos[id]))
+    cambio_masivo.send(sender=Videojuego, ids=list(movimientos), previas=previas, stocks=stocks)
+    return stocks
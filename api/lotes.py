@@ -0,0 +1,210 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import estadisticas, validacion
+from .models import Videojuego
+from .signals import cambio_masivo
+
+# Altas, modificaciones y bajas de muchos videojuegos en una sola petición.
+#
+# Todo el lote se valida en una pasada antes de escribir (si un ítem falla no
+# se escribe ninguno) y luego se escribe con bulk_create/bulk_update dentro de
+# una única transacción. Como bulk_create/bulk_update no disparan post_save,
+# al terminar se envía `cambio_masivo` con los ids afectados.
+
+CAMPOS_EDITABLES = validacion.CAMPOS
+
+
+class ErrorLote(Exception):
+    """El lote tiene ítems inválidos; `errores` indica cuáles y por qué"""
+
+    def __init__(self, errores):
+        super().__init__('Lote inválido')
+        self.errores = errores
+
+
+def _validar(items, es_actualizacion):
+    if not isinstance(items, list) or not items:
+        raise ErrorLote([{'indice': None, 'errores': ['Se esperaba una lista de videojuegos no vacía']}])
+    if len(items) > settings.API_BULK_MAX_ITEMS:
+        raise ErrorLote([{
+            'indice': None,
+            'errores': [f'El lote admite como máximo {settings.API_BULK_MAX_ITEMS} ítems'],
+        }])
+
+    errores, validados = [], []
+    vistos = {'id': set(), 'codigo_externo': set()}
+    for indice, item in enumerate(items):
+        if not isinstance(item, dict):
+            errores.append({'indice': indice, 'errores': ['Cada ítem debe ser un objeto JSON']})
+            continue
+        valores, errores_item = validacion.validar(item, es_actualizacion=es_actualizacion)
+        if es_actualizacion and (isinstance(item.get('id'), bool) or not isinstance(item.get('id'), int)):
+            errores_item['id'] = 'El id es requerido'
+        for clave in ('id', 'codigo_externo'):
+            valor = item.get(clave)
+            if valor is None or clave in errores_item or not isinstance(valor, (int, str)):
+                continue
+            if valor in vistos[clave]:
+                errores_item[clave] = f'{clave} repetido en el lote: {valor}'
+            vistos[clave].add(valor)
+        if errores_item:
+            errores.append({'indice': indice, 'errores': list(errores_item.values()), 'campos': errores_item})
+        validados.append(valores)
+    if errores:
+        raise ErrorLote(errores)
+    return validados
+
+
+def escribir_altas(items, batch_size=None):
+    """
+    Inserta ítems ya convertidos por validacion.validar. Los que traen
+    `codigo_externo` se insertan o, si ese código ya existe, actualizan en el
+    videojuego existente solo los campos que trae el ítem.
+    Devuelve (creados, actualizados, ids); debe llamarse dentro de una transacción.
+    """
+    batch_size = batch_size or settings.API_BULK_BATCH_SIZE
+
+    # Los valores por defecto solo completan las filas nuevas: en un upsert,
+    # los campos que el ítem no trae conservan lo que tenía el existente
+    nuevos, con_codigo, por_campos = [], [], {}
+    for item in items:
+        videojuego = Videojuego(**{**validacion.VALORES_POR_DEFECTO, **item})
+        if videojuego.codigo_externo:
+            con_codigo.append(videojuego)
+            por_campos.setdefault(frozenset(item), []).append(videojuego)
+        else:
+            nuevos.append(videojuego)
+
+    existentes, previas = set(), []
+    if con_codigo:
+        for codigo, *previa in (
+            Videojuego.objects.filter(codigo_externo__in=[v.codigo_externo for v in con_codigo])
+            .values_list('codigo_externo', *estadisticas.COLUMNAS)
+        ):
+            existentes.add(codigo)
+            previas.append(tuple(previa))
+        # Un bulk_create por cada combinación de campos enviados
+        for campos, grupo in por_campos.items():
+            Videojuego.objects.bulk_create(
+                grupo,
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=['codigo_externo'],
+                update_fields=[
+                    campo for campo in CAMPOS_EDITABLES if campo in campos and campo != 'codigo_externo'
+                ] + ['updated_at'],
+            )
+    if nuevos:
+        Videojuego.objects.bulk_create(nuevos, batch_size=batch_size)
+
+    ids = [v.pk for v in nuevos + con_codigo]
+    cambio_masivo.send(sender=Videojuego, ids=ids, previas=previas)
+    return len(items) - len(existentes), len(existentes), ids
+
+
+def crear(items, batch_size=None):
+    """Valida el lote completo y lo inserta (con upsert por `codigo_externo`)"""
+    validados = _validar(items, es_actualizacion=False)
+    with transaction.atomic():
+        creados, actualizados, ids = escribir_altas(validados, batch_size)
+    return {'creados': creados, 'actualizados': actualizados, 'ids': ids}
+
+
+def _validar_codigos(items, validados):
+    """
+    Un codigo_externo que ya tiene otro videojuego haría fallar el UPDATE por
+    la restricción única: se informa como error del ítem. Solo se admite si
+    ese otro videojuego también cambia su código en el mismo lote.
+    """
+    pedidos = {
+        valores['codigo_externo']: (indice, item['id'])
+        for indice, (item, valores) in enumerate(zip(items, validados))
+        if valores.get('codigo_externo')
+    }
+    if not pedidos:
+        return
+    cambian = {item['id'] for item, valores in zip(items, validados) if 'codigo_externo' in valores}
+    errores = []
+    for codigo, dueno in Videojuego.objects.filter(codigo_externo__in=pedidos).values_list('codigo_externo', 'id'):
+        indice, id = pedidos[codigo]
+        if dueno != id and dueno not in cambian:
+            mensaje = f'codigo_externo ya usado por el videojuego {dueno}: {codigo}'
+            errores.append({'indice': indice, 'errores': [mensaje], 'campos': {'codigo_externo': mensaje}})
+    if errores:
+        raise ErrorLote(sorted(errores, key=lambda error: error['indice']))
+
+
+def actualizar(items, batch_size=None):
+    """Actualiza por id los campos presentes en cada ítem"""
+    validados = _validar(items, es_actualizacion=True)
+    batch_size = batch_size or settings.API_BULK_BATCH_SIZE
+
+    with transaction.atomic():
+        videojuegos = Videojuego.objects.select_for_update().in_bulk([item['id'] for item in items])
+        faltantes = [
+            {'indice': indice, 'errores': [f'Videojuego no encontrado: {item["id"]}']}
+            for indice, item in enumerate(items)
+            if item['id'] not in videojuegos
+        ]
+        if faltantes:
+            raise ErrorLote(faltantes)
+        _validar_codigos(items, validados)
+
+        previas = [estadisticas.fila(videojuego) for videojuego in videojuegos.values()]
+        ahora = timezone.now()
+        campos = set()
+        for item, valores in zip(items, validados):
+            videojuego = videojuegos[item['id']]
+            for campo, valor in valores.items():
+                setattr(videojuego, campo, valor)
+                campos.add(campo)
+            # bulk_update no pasa por pre_save, así que auto_now no se aplica solo
+            videojuego.updated_at = ahora
+
+        Videojuego.objects.bulk_update(
+            list(videojuegos.values()),
+            [campo for campo in CAMPOS_EDITABLES if campo in campos] + ['updated_at'],
+            batch_size=batch_size,
+        )
+        cambio_masivo.send(sender=Videojuego, ids=list(videojuegos), previas=previas)
+
+    return {'actualizados': len(videojuegos), 'ids': list(videojuegos)}
+
+
+def eliminar(ids):
+    """Elimina los videojuegos con los ids indicados; los inexistentes se ignoran"""
+    # bool es subclase de int: True no es el id 1
+    if not isinstance(ids, list) or not ids or not all(isinstance(id, int) and not isinstance(id, bool) for id in ids):
+        raise ErrorLote([{'indice': None, 'errores': ['Se esperaba una lista de ids enteros no vacía']}])
+    if len(ids) > settings.API_BULK_MAX_ITEMS:
+        raise ErrorLote([{
+            'indice': None,
+            'errores': [f'El lote admite como máximo {settings.API_BULK_MAX_ITEMS} ítems'],
+        }])
+
+    with transaction.atomic():
+        existentes = list(Videojuego.objects.filter(id__in=ids).values_list('id', flat=True))
+        # delete() sí emite post_delete por cada fila, no hace falta cambio_masivo
+        Videojuego.objects.filter(id__in=existentes).delete()
+
+    return {'eliminados': len(existentes), 'ids': existentes}
+
+
+def actualizar_en_bloque(queryset, **valores):
+    """
+    Aplica `valores` (admite expresiones F) a todos los videojuegos del
+    queryset con un solo UPDATE. Las señales se envían por tandas de
+    API_BULK_BATCH_SIZE ids. Devuelve la cantidad de videojuegos actualizados.
+    """
+    batch_size = settings.API_BULK_BATCH_SIZE
+    with transaction.atomic():
+        previas = list(queryset.select_for_update().order_by('id').values_list('id', *estadisticas.COLUMNAS))
+        if not previas:
+            return 0
+        queryset.update(**valores, updated_at=timezone.now())
+        for inicio in range(0, len(previas), batch_size):
+            tanda = previas[inicio:inicio + batch_size]
+            cambio_masivo.send(sender=Videojuego, ids=[fila[0] for fila in tanda], previas=[fila[1:] for fila in tanda])
+    return len(previas)
@@ -0,0 +1,76 @@
+import csv
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from api import portadas
+from api.models import Videojuego
+
+
+def _desde_mapa(ruta_mapa):
+    """(videojuego, bytes) por cada fila id,archivo del CSV; las rutas relativas parten del CSV"""
+    carpeta = os.path.dirname(os.path.abspath(ruta_mapa))
+    with open(ruta_mapa, newline='', encoding='utf-8') as archivo:
+        filas = list(csv.DictReader(archivo))
+    if filas and not {'id', 'archivo'} <= set(filas[0]):
+        raise CommandError('El mapa debe tener las columnas id y archivo')
+    videojuegos = Videojuego.objects.in_bulk([int(fila['id']) for fila in filas])
+    for numero, fila in enumerate(filas, start=2):
+        videojuego = videojuegos.get(int(fila['id']))
+        if videojuego is None:
+            raise CommandError(f'Línea {numero}: no existe el videojuego {fila["id"]}')
+        with open(os.path.join(carpeta, fila['archivo']), 'rb') as imagen:
+            yield videojuego, imagen.read()
+
+
+def _pendientes(todas):
+    """(videojuego, bytes del original) de las portadas a las que les faltan variantes"""
+    for videojuego in Videojuego.objects.exclude(portada='').exclude(portada=None).order_by('id').iterator():
+        if todas or portadas.pendiente(videojuego):
+            with default_storage.open(videojuego.portada.name) as original:
+                yield videojuego, original.read()
+
+
+class Command(BaseCommand):
+    help = 'Genera en paralelo las variantes de las portadas existentes o asigna portadas desde un mapa CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mapa', help='CSV con columnas id,archivo para asignar portadas desde archivos')
+        parser.add_argument('--todas', action='store_true',
+                            help='Regenera todas las portadas, no solo las que no coinciden con la configuración')
+
+    def handle(self, *args, **options):
+        if not portadas.disponible():
+            raise CommandError('Pillow no está instalado')
+
+        trabajos = _desde_mapa(options['mapa']) if options['mapa'] else _pendientes(options['todas'])
+        # Ventana acotada de trabajos en vuelo: las imágenes no se cargan todas en memoria
+        ventana = portadas.procesos() * 2
+        en_vuelo, procesadas, errores = {}, 0, 0
+        inicio = time.perf_counter()
+
+        def recoger(listos):
+            nonlocal procesadas, errores
+            for futuro in listos:
+                videojuego, datos = en_vuelo.pop(futuro)
+                try:
+                    portadas.asignar(videojuego, futuro.result(), datos)
+                    procesadas += 1
+                except ValueError as e:
+                    errores += 1
+                    self.stderr.write(f'Videojuego {videojuego.pk}: {e}')
+
+        for videojuego, datos in trabajos:
+            en_vuelo[portadas.procesar(datos)] = (videojuego, datos)
+            if len(en_vuelo) >= ventana:
+                recoger(wait(en_vuelo, return_when=FIRST_COMPLETED).done)
+        recoger(wait(en_vuelo).done)
+
+        duracion = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f'{procesadas} portadas procesadas en {duracion:.1f} s con {portadas.procesos()} procesos'
+            + (f' ({errores} con errores)' if errores else '')
+        ))
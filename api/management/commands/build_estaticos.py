@@ -0,0 +1,44 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from api import estaticos
+
+
+class Command(BaseCommand):
+    help = 'Junta los estáticos (con huella si ESTATICOS_CON_HUELLA) y precomprime los de texto a gzip y brotli'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limpiar', action='store_true',
+                            help='Borra STATIC_ROOT antes de copiar (descarta versiones viejas)')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        call_command('collectstatic', interactive=False, clear=options['limpiar'], verbosity=0)
+
+        archivos, original, comprimido = 0, 0, {'.gz': 0, '.br': 0}
+        for carpeta, _, nombres in os.walk(settings.STATIC_ROOT):
+            for nombre in nombres:
+                if not estaticos.comprimible(nombre):
+                    continue
+                ruta = os.path.join(carpeta, nombre)
+                tamanos = estaticos.precomprimir(ruta)
+                if not tamanos:
+                    continue
+                archivos += 1
+                original += os.stat(ruta).st_size
+                for extension, tamano in tamanos.items():
+                    comprimido[extension] += tamano
+
+        if estaticos.brotli is None:
+            self.stdout.write(self.style.WARNING('brotli no está instalado: solo se generaron variantes .gz'))
+        resumen = f'gzip {comprimido[".gz"] / 1024:,.1f} KB'
+        if comprimido['.br']:
+            resumen += f', brotli {comprimido[".br"] / 1024:,.1f} KB'
+        self.stdout.write(self.style.SUCCESS(
+            f'{archivos} archivos precomprimidos en {settings.STATIC_ROOT} '
+            f'({original / 1024:,.1f} KB → {resumen}) en {time.perf_counter() - inicio:.1f} s'
+        ))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import replicas, similares
+
+
+class Command(BaseCommand):
+    help = 'Calcula los videojuegos similares de cada uno (incremental desde la última pasada)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--completo', action='store_true',
+                            help='Recalcula todo el catálogo aunque se pueda actualizar de forma incremental')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        try:
+            # Lee el feed y las listas guardadas: tiene que ver sus propias escrituras
+            with replicas.primaria():
+                if options['completo']:
+                    cantidad, completa = similares.construir(), True
+                else:
+                    cantidad, completa = similares.actualizar()
+        except similares.NumpyNoDisponible as e:
+            raise CommandError(str(e))
+        duracion = time.perf_counter() - inicio
+        tipo = 'completo' if completa else 'incremental'
+        self.stdout.write(self.style.SUCCESS(
+            f'Similares de {cantidad} videojuegos recalculados en {duracion:.2f} s ({tipo})'
+        ))
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api import cambios
+
+
+class Command(BaseCommand):
+    help = 'Compacta el registro del feed de cambios (cambios superados y bajas viejas)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=settings.API_CAMBIOS_RETENCION_DIAS,
+                            help='Se conservan completos los cambios de los últimos N días')
+
+    def handle(self, *args, **options):
+        if options['dias'] < 0:
+            raise CommandError('--dias no puede ser negativo')
+        compactacion = cambios.compactar(options['dias'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{compactacion.eliminados} cambios eliminados; los tokens anteriores a '
+            f'{compactacion.hasta} quedan vencidos'
+        ))
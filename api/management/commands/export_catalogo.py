@@ -0,0 +1,65 @@
+import csv
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api import serializadores
+from api.models import Videojuego
+
+
+class Command(BaseCommand):
+    help = 'Exporta el catálogo de videojuegos a CSV o NDJSON en streaming'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--salida', help='Archivo de destino (por defecto, la salida estándar)')
+        parser.add_argument('--formato', choices=['csv', 'ndjson'],
+                            help='Formato de salida (por defecto se deduce de la extensión; si no, csv)')
+        parser.add_argument('--chunk-size', type=int, default=settings.API_STREAM_CHUNK_SIZE,
+                            help='Filas que se traen de la base por vez')
+
+    def handle(self, *args, **options):
+        salida = options['salida']
+        formato = options['formato'] or ('ndjson' if salida and salida.endswith(('.ndjson', '.jsonl')) else 'csv')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size debe ser mayor que 0')
+
+        # Las variantes de la portada son un objeto: en CSV basta con la URL del original
+        campos = serializadores.CAMPOS if formato == 'ndjson' else tuple(
+            campo for campo in serializadores.CAMPOS if campo != 'portada_srcset'
+        )
+        serializador = serializadores.Serializador(campos)
+        # iterator() usa un cursor del lado del servidor en PostgreSQL, así
+        # que el catálogo nunca se carga completo en memoria.
+        filas = (
+            Videojuego.objects.order_by('id')
+            .values_list(*serializador.columnas)
+            .iterator(chunk_size=options['chunk_size'])
+        )
+
+        archivo = open(salida, 'w', encoding='utf-8', newline='') if salida else sys.stdout
+        inicio = time.perf_counter()
+        total = 0
+        try:
+            if formato == 'csv':
+                escritor = csv.writer(archivo)
+                escritor.writerow(serializador.campos)
+                for fila in filas:
+                    data = serializador.fila(fila)
+                    escritor.writerow(['' if valor is None else valor for valor in data.values()])
+                    total += 1
+            else:
+                for fila in filas:
+                    archivo.write(serializadores.a_json(serializador.fila(fila)).decode())
+                    archivo.write('\n')
+                    total += 1
+        finally:
+            if salida:
+                archivo.close()
+
+        duracion = time.perf_counter() - inicio
+        self.stderr.write(
+            f'{total} videojuegos exportados en {duracion:.2f} s '
+            f'({total / duracion if duracion else 0:,.0f} filas/s)'
+        )
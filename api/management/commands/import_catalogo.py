@@ -0,0 +1,138 @@
+import csv
+import json
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api import lotes, validacion
+
+# Columnas que se aceptan del archivo; id y fechas de auditoría de una
+# exportación se ignoran porque las asigna la base al insertar.
+COLUMNAS = lotes.CAMPOS_EDITABLES
+
+
+def _leer_csv(archivo):
+    for numero, fila in enumerate(csv.DictReader(archivo), start=1):
+        # En CSV no hay nulos: una celda vacía equivale a "sin valor"
+        yield numero, {columna: (fila[columna] or None) for columna in COLUMNAS if columna in fila}
+
+
+def _leer_ndjson(archivo):
+    for numero, linea in enumerate(archivo, start=1):
+        linea = linea.strip()
+        if not linea:
+            continue
+        try:
+            data = json.loads(linea)
+        except json.JSONDecodeError:
+            yield numero, None
+            continue
+        if not isinstance(data, dict):
+            yield numero, None
+            continue
+        yield numero, {columna: data[columna] for columna in COLUMNAS if columna in data}
+
+
+def _lotes(filas, tamano):
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= tamano:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+class Command(BaseCommand):
+    help = 'Importa videojuegos desde CSV o NDJSON en streaming, por lotes y con punto de control'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Archivo CSV o NDJSON a importar')
+        parser.add_argument('--formato', choices=['csv', 'ndjson'],
+                            help='Formato de entrada (por defecto se deduce de la extensión; si no, csv)')
+        parser.add_argument('--batch-size', type=int, default=settings.API_BULK_BATCH_SIZE,
+                            help='Filas por transacción')
+        parser.add_argument('--rechazados', help='Archivo NDJSON de filas rechazadas (por defecto <archivo>.rechazados.ndjson)')
+        parser.add_argument('--checkpoint', help='Archivo de punto de control (por defecto <archivo>.checkpoint)')
+        parser.add_argument('--reanudar', action='store_true',
+                            help='Continúa después de la última fila confirmada en el punto de control')
+
+    def handle(self, *args, **options):
+        ruta = options['archivo']
+        if not os.path.exists(ruta):
+            raise CommandError(f'No existe el archivo {ruta}')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size debe ser mayor que 0')
+        formato = options['formato'] or ('ndjson' if ruta.endswith(('.ndjson', '.jsonl')) else 'csv')
+        ruta_rechazados = options['rechazados'] or f'{ruta}.rechazados.ndjson'
+        ruta_checkpoint = options['checkpoint'] or f'{ruta}.checkpoint'
+
+        desde = 0
+        if options['reanudar'] and os.path.exists(ruta_checkpoint):
+            with open(ruta_checkpoint, encoding='utf-8') as f:
+                desde = json.load(f)['ultima_fila']
+            self.stderr.write(f'Reanudando después de la fila {desde}')
+
+        inicio = time.perf_counter()
+        # combinados: filas cuyo codigo_externo vuelve a aparecer más adelante en
+        # el mismo lote y que se escriben junto con esa fila
+        totales = {'creados': 0, 'actualizados': 0, 'rechazados': 0, 'combinados': 0}
+        with open(ruta, encoding='utf-8', newline='') as archivo, \
+                open(ruta_rechazados, 'a' if desde else 'w', encoding='utf-8') as rechazados:
+            lector = _leer_ndjson(archivo) if formato == 'ndjson' else _leer_csv(archivo)
+            pendientes = ((numero, item) for numero, item in lector if numero > desde)
+
+            for lote in _lotes(pendientes, options['batch_size']):
+                validos = {}
+                for numero, item in lote:
+                    if item is None:
+                        errores = ['Fila mal formada']
+                    else:
+                        valores, por_campo = validacion.validar(item)
+                        errores = list(por_campo.values())
+                    if errores:
+                        totales['rechazados'] += 1
+                        rechazados.write(json.dumps({'fila': numero, 'errores': errores, 'datos': item},
+                                                    ensure_ascii=False, default=str) + '\n')
+                        continue
+                    # Dentro de un lote, las apariciones de un mismo codigo_externo se
+                    # combinan en orden (la última gana en cada campo), igual que si
+                    # se hubieran aplicado una tras otra
+                    clave = valores.get('codigo_externo') or ('fila', numero)
+                    anterior = validos.pop(clave, None)
+                    if anterior is not None:
+                        totales['combinados'] += 1
+                        valores = {**anterior, **valores}
+                    validos[clave] = valores
+
+                if validos:
+                    with transaction.atomic():
+                        creados, actualizados, _ = lotes.escribir_altas(list(validos.values()), options['batch_size'])
+                    totales['creados'] += creados
+                    totales['actualizados'] += actualizados
+                rechazados.flush()
+
+                # El punto de control se escribe después del commit: si el
+                # proceso se corta, --reanudar repite a lo sumo este lote.
+                ultima_fila = lote[-1][0]
+                with open(ruta_checkpoint, 'w', encoding='utf-8') as f:
+                    json.dump({'ultima_fila': ultima_fila}, f)
+
+                procesadas = sum(totales.values())
+                duracion = time.perf_counter() - inicio
+                self.stderr.write(f'Fila {ultima_fila}: {procesadas / duracion:,.0f} filas/s')
+
+        duracion = time.perf_counter() - inicio
+        procesadas = sum(totales.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'{totales["creados"]} creados, {totales["actualizados"]} actualizados, '
+            f'{totales["rechazados"]} rechazados, {totales["combinados"]} combinados con una fila posterior '
+            f'del mismo codigo_externo en {duracion:.2f} s '
+            f'({procesadas / duracion if duracion else 0:,.0f} filas/s)'
+        ))
+        if totales['rechazados']:
+            self.stdout.write(f'Filas rechazadas en {ruta_rechazados}')
@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api import estadisticas
+
+
+class Command(BaseCommand):
+    help = 'Recalcula desde cero las estadísticas de inventario y reporta los grupos que no coincidían'
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        diferencias = estadisticas.recalcular()
+        duracion = time.perf_counter() - inicio
+        if diferencias:
+            self.stdout.write(self.style.WARNING(f'{diferencias} grupos estaban desactualizados y se corrigieron'))
+        self.stdout.write(self.style.SUCCESS(f'Estadísticas recalculadas en {duracion:.2f} s'))
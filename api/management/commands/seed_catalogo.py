@@ -0,0 +1,126 @@
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.models import Videojuego
+from api.signals import cambio_masivo
+
+# Catálogo sintético con distribuciones parecidas a las de una tienda real:
+# pocas plataformas y géneros concentran la mayoría de los juegos, los
+# desarrolladores siguen una ley de Zipf (unos pocos estudios publican mucho),
+# los precios se agrupan en los valores típicos y las descripciones van de
+# vacías a varios párrafos. Con la misma semilla se generan los mismos datos.
+
+PESOS_PLATAFORMA = {
+    'PC': 30, 'PS5': 18, 'SWITCH': 15, 'PS4': 12, 'MULTI': 10, 'XBOX_SERIES': 10, 'XBOX_ONE': 5,
+}
+PESOS_GENERO = {
+    'ACCION': 22, 'AVENTURA': 16, 'RPG': 14, 'SHOOTER': 12, 'DEPORTES': 9,
+    'ESTRATEGIA': 8, 'SIMULACION': 7, 'CARRERAS': 5, 'TERROR': 4, 'PUZZLE': 3,
+}
+PESOS_PRECIO = {
+    '69.99': 12, '59.99': 18, '49.99': 10, '39.99': 10, '29.99': 14,
+    '19.99': 16, '14.99': 8, '9.99': 7, '4.99': 3, '0.00': 2,
+}
+
+PALABRAS_TITULO = (
+    'Leyenda', 'Reino', 'Sombras', 'Estrella', 'Guerra', 'Dragón', 'Ciudad', 'Última', 'Noche',
+    'Fuego', 'Hielo', 'Imperio', 'Galaxia', 'Torneo', 'Misterio', 'Bosque', 'Tormenta', 'Eco',
+    'Abismo', 'Legión', 'Circuito', 'Fortaleza', 'Horizonte', 'Cazador', 'Ruinas', 'Titán',
+)
+SUFIJOS_TITULO = ('', '', '', ' II', ' III', ' Remastered', ' Deluxe', ': Origins', ' 2077', ' Online')
+FRASES_DESCRIPCION = (
+    'Explora un mundo abierto lleno de secretos.',
+    'Combates rápidos y un sistema de progresión profundo.',
+    'Incluye modo cooperativo local y en línea.',
+    'Una historia ramificada con múltiples finales.',
+    'Construye, gestiona y expande tu propio imperio.',
+    'Compite contra jugadores de todo el mundo en partidas clasificatorias.',
+    'Gráficos renovados y contenido adicional descargable.',
+    'Resuelve acertijos que ponen a prueba tu ingenio.',
+    'Sobrevive a la noche con recursos limitados.',
+    'Personaliza tu equipo y elige tu estilo de juego.',
+)
+ESTUDIOS = 500
+
+# Filas por transacción: lotes grandes reparten mejor el costo de actualizar
+# las estadísticas (un UPDATE por plataforma y género en cada lote)
+LOTE = 5000
+
+
+def _pesos(tabla):
+    return list(tabla), list(accumulate(tabla.values()))
+
+
+def generar(cantidad, semilla=0, inicio=0):
+    """Genera `cantidad` videojuegos (sin guardar); `inicio` numera los títulos"""
+    rng = random.Random(f'{semilla}-{inicio}')
+    plataformas, pesos_plataforma = _pesos(PESOS_PLATAFORMA)
+    generos, pesos_genero = _pesos(PESOS_GENERO)
+    precios, pesos_precio = _pesos(PESOS_PRECIO)
+    precios = [Decimal(precio) for precio in precios]
+    # Zipf sobre los estudios: el i-ésimo publica ~1/i de lo que publica el primero
+    estudios = [f'Estudio {rango}' for rango in range(1, ESTUDIOS + 1)]
+    pesos_estudio = list(accumulate(1 / rango for rango in range(1, ESTUDIOS + 1)))
+    hoy = date.today()
+
+    for numero in range(inicio, inicio + cantidad):
+        frases = min(int(rng.expovariate(1 / 3)), 30)
+        lanzamiento = None
+        if rng.random() > 0.05:
+            # Más lanzamientos recientes que antiguos
+            lanzamiento = hoy - timedelta(days=int(rng.expovariate(1 / 1500)) % 11000)
+        yield Videojuego(
+            titulo=f'{rng.choice(PALABRAS_TITULO)} {rng.choice(PALABRAS_TITULO).lower()}'
+                   f'{rng.choice(SUFIJOS_TITULO)} #{numero}',
+            descripcion=' '.join(rng.choices(FRASES_DESCRIPCION, k=frases)),
+            precio=rng.choices(precios, cum_weights=pesos_precio)[0],
+            # Un 10 % agotado; el resto con pocas unidades y alguna tirada grande
+            stock=0 if rng.random() < 0.1 else min(int(rng.paretovariate(1.2) * 3), 5000),
+            plataforma=rng.choices(plataformas, cum_weights=pesos_plataforma)[0],
+            genero=rng.choices(generos, cum_weights=pesos_genero)[0],
+            desarrollador=rng.choices(estudios, cum_weights=pesos_estudio)[0],
+            fecha_lanzamiento=lanzamiento,
+        )
+
+
+def sembrar(filas, semilla=0, batch_size=LOTE):
+    """Inserta `filas` videojuegos sintéticos en lotes; devuelve los insertados"""
+    inicio = Videojuego.objects.count()
+    generador = generar(filas, semilla, inicio)
+    insertados = 0
+    while insertados < filas:
+        lote = [next(generador) for _ in range(min(batch_size, filas - insertados))]
+        with transaction.atomic():
+            Videojuego.objects.bulk_create(lote, batch_size=batch_size)
+            cambio_masivo.send(sender=Videojuego, ids=[v.pk for v in lote], previas=[])
+        insertados += len(lote)
+    return insertados
+
+
+class Command(BaseCommand):
+    help = 'Genera un catálogo sintético de videojuegos con distribuciones realistas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, required=True, help='Cantidad de videojuegos a agregar')
+        parser.add_argument('--semilla', type=int, default=0,
+                            help='Semilla del generador (los mismos argumentos dan los mismos datos)')
+        parser.add_argument('--batch-size', type=int, default=LOTE, help='Filas por transacción')
+
+    def handle(self, *args, **options):
+        if options['rows'] < 1:
+            raise CommandError('--rows debe ser mayor que cero')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size debe ser mayor que cero')
+
+        inicio = time.perf_counter()
+        insertados = sembrar(options['rows'], options['semilla'], options['batch_size'])
+        duracion = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f'{insertados} videojuegos generados en {duracion:.1f} s ({insertados / duracion:,.0f} filas/s)'
+        ))
@@ -0,0 +1,169 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# Métricas de las peticiones de este proceso.
+#
+# El middleware api.middleware.medir_peticiones crea una Medicion por
+# petición y la deja en un ContextVar; el wrapper de SQL (instalado en cada
+# conexión nueva) y el cache suman en ella. Los ContextVar pasan a los hilos
+# de sync_to_async, así que también se cuentan las consultas de las vistas
+# async. Al terminar, la medición se acumula por vista y método y se expone
+# en formato de texto de Prometheus (cada proceso del servidor tiene las suyas).
+
+# Límites (segundos) de los buckets del histograma de latencia
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Sentencias SQL que se guardan por petición para el log de lentas
+MAX_SQL = 50
+
+
+class Medicion:
+    __slots__ = ('consultas', 'tiempo_db', 'sql', 'aciertos', 'fallos')
+
+    def __init__(self):
+        self.consultas = 0
+        self.tiempo_db = 0.0
+        self.sql = []
+        self.aciertos = 0
+        self.fallos = 0
+
+
+_actual = ContextVar('medicion', default=None)
+_lock = threading.Lock()
+# (vista, metodo) -> [conteo por bucket..., +Inf, suma, consultas, tiempo_db, bytes, aciertos, fallos]
+_vistas = {}
+# (vista, metodo, estado) -> peticiones
+_estados = {}
+
+_SUMA, _CONSULTAS, _TIEMPO_DB, _BYTES, _ACIERTOS, _FALLOS = range(len(BUCKETS) + 1, len(BUCKETS) + 7)
+
+
+def iniciar():
+    """Empieza a medir la petición actual; devuelve (medicion, token)"""
+    medicion = Medicion()
+    return medicion, _actual.set(medicion)
+
+
+def terminar(token):
+    _actual.reset(token)
+
+
+def medir_sql(execute, sql, params, many, context):
+    """execute_wrapper que suma consultas y tiempo de base a la petición actual"""
+    medicion = _actual.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duracion = time.perf_counter() - inicio
+        medicion.consultas += 1
+        medicion.tiempo_db += duracion
+        if len(medicion.sql) < MAX_SQL:
+            medicion.sql.append((sql, duracion))
+
+
+@receiver(connection_created)
+def instrumentar_conexion(sender, connection, **kwargs):
+    # connection_created se emite en cada reconexión del mismo wrapper
+    if medir_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(medir_sql)
+
+
+def contar_cache(aciertos=0, fallos=0):
+    medicion = _actual.get()
+    if medicion is not None:
+        medicion.aciertos += aciertos
+        medicion.fallos += fallos
+
+
+def registrar(vista, metodo, estado, duracion, medicion, tamano):
+    """Acumula una petición terminada en las métricas de su vista"""
+    clave = (vista, metodo)
+    with _lock:
+        valores = _vistas.get(clave)
+        if valores is None:
+            valores = _vistas[clave] = [0] * (len(BUCKETS) + 1) + [0.0, 0, 0.0, 0, 0, 0]
+        valores[bisect_left(BUCKETS, duracion)] += 1
+        valores[_SUMA] += duracion
+        valores[_CONSULTAS] += medicion.consultas
+        valores[_TIEMPO_DB] += medicion.tiempo_db
+        valores[_BYTES] += tamano
+        valores[_ACIERTOS] += medicion.aciertos
+        valores[_FALLOS] += medicion.fallos
+        clave_estado = (vista, metodo, estado)
+        _estados[clave_estado] = _estados.get(clave_estado, 0) + 1
+
+
+def reiniciar():
+    with _lock:
+        _vistas.clear()
+        _estados.clear()
+
+
+def _etiquetas(**etiquetas):
+    partes = []
+    for nombre, valor in etiquetas.items():
+        valor = str(valor).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+        partes.append(f'{nombre}="{valor}"')
+    return '{' + ','.join(partes) + '}'
+
+
+def exportar():
+    """Todas las métricas en formato de texto de Prometheus"""
+    from . import cache, coalescencia
+
+    with _lock:
+        vistas = {clave: list(valores) for clave, valores in sorted(_vistas.items())}
+        estados = dict(sorted(_estados.items()))
+
+    lineas = [
+        '# HELP api_peticion_segundos Latencia de las peticiones por vista.',
+        '# TYPE api_peticion_segundos histogram',
+    ]
+    for (vista, metodo), valores in vistas.items():
+        acumulado = 0
+        for limite, conteo in zip(BUCKETS + ('+Inf',), valores):
+            acumulado += conteo
+            lineas.append(f'api_peticion_segundos_bucket{_etiquetas(vista=vista, metodo=metodo, le=limite)} {acumulado}')
+        etiquetas = _etiquetas(vista=vista, metodo=metodo)
+        lineas.append(f'api_peticion_segundos_sum{etiquetas} {valores[_SUMA]:.6f}')
+        lineas.append(f'api_peticion_segundos_count{etiquetas} {acumulado}')
+
+    lineas += ['# HELP api_peticiones_total Peticiones por vista y código de estado.',
+               '# TYPE api_peticiones_total counter']
+    for (vista, metodo, estado), conteo in estados.items():
+        lineas.append(f'api_peticiones_total{_etiquetas(vista=vista, metodo=metodo, estado=estado)} {conteo}')
+
+    for nombre, posicion, ayuda in (
+        ('api_db_consultas_total', _CONSULTAS, 'Consultas SQL ejecutadas.'),
+        ('api_db_segundos_total', _TIEMPO_DB, 'Tiempo total en la base de datos.'),
+        ('api_respuesta_bytes_total', _BYTES, 'Bytes de respuesta (sin contar streaming).'),
+        ('api_cache_aciertos_total', _ACIERTOS, 'Lecturas del cache del catálogo con acierto.'),
+        ('api_cache_fallos_total', _FALLOS, 'Lecturas del cache del catálogo sin acierto.'),
+    ):
+        lineas += [f'# HELP {nombre} {ayuda}', f'# TYPE {nombre} counter']
+        for (vista, metodo), valores in vistas.items():
+            valor = valores[posicion]
+            valor = f'{valor:.6f}' if isinstance(valor, float) else valor
+            lineas.append(f'{nombre}{_etiquetas(vista=vista, metodo=metodo)} {valor}')
+
+    totales_cache = cache.estadisticas()
+    totales_coalescencia = coalescencia.estadisticas()
+    lineas += [
+        '# HELP api_cache_proceso_total Aciertos y fallos del cache del catálogo en este proceso.',
+        '# TYPE api_cache_proceso_total counter',
+        f'api_cache_proceso_total{{resultado="acierto"}} {totales_cache["hits"]}',
+        f'api_cache_proceso_total{{resultado="fallo"}} {totales_cache["misses"]}',
+        '# HELP api_coalescencia_total Lecturas ejecutadas y compartidas por coalescencia.',
+        '# TYPE api_coalescencia_total counter',
+        f'api_coalescencia_total{{resultado="ejecutada"}} {totales_coalescencia["ejecutadas"]}',
+        f'api_coalescencia_total{{resultado="compartida"}} {totales_coalescencia["compartidas"]}',
+    ]
+    return '\n'.join(lineas) + '\n'
@@ -0,0 +1,119 @@
+import logging
+import time
+from contextlib import nullcontext
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.decorators import sync_and_async_middleware
+
+from . import metricas, replicas
+
+logger = logging.getLogger('api.lentas')
+
+# Lee-tus-escrituras con réplicas: después de una escritura exitosa el
+# cliente recibe una cookie que dura API_REPLICA_FIJACION_SEGUNDOS; mientras
+# la tenga, sus lecturas van a la primaria y no ve datos que la réplica
+# todavía no recibió (por ejemplo, el listado que recarga app.js tras crear).
+
+COOKIE_PRIMARIA = 'api_primaria'
+
+METODOS_SEGUROS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+def _fijar(request):
+    return request.method not in METODOS_SEGUROS or COOKIE_PRIMARIA in request.COOKIES
+
+
+def _marcar(request, response):
+    if request.method not in METODOS_SEGUROS and response.status_code < 400:
+        response.set_cookie(
+            COOKIE_PRIMARIA, '1',
+            max_age=settings.API_REPLICA_FIJACION_SEGUNDOS,
+            httponly=True,
+            samesite='Lax',
+        )
+    return response
+
+
+@sync_and_async_middleware
+def fijar_primaria(get_response):
+    """Fija a la primaria las escrituras y las lecturas de quien acaba de escribir"""
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            with replicas.primaria() if _fijar(request) else nullcontext():
+                response = await get_response(request)
+            return _marcar(request, response)
+    else:
+        def middleware(request):
+            with replicas.primaria() if _fijar(request) else nullcontext():
+                response = get_response(request)
+            return _marcar(request, response)
+    return middleware
+
+
+def _cerrar_medicion(request, response, inicio, medicion):
+    duracion = time.perf_counter() - inicio
+    coincidencia = request.resolver_match
+    vista = coincidencia.view_name if coincidencia else 'sin_ruta'
+    tamano = 0 if response.streaming else len(response.content)
+    metricas.registrar(vista, request.method, response.status_code, duracion, medicion, tamano)
+
+    server_timing = f'total;dur={duracion * 1000:.1f}, db;dur={medicion.tiempo_db * 1000:.1f};desc="{medicion.consultas} consultas"'
+    if medicion.aciertos or medicion.fallos:
+        server_timing += f', cache;desc="{medicion.aciertos} aciertos, {medicion.fallos} fallos"'
+    response['Server-Timing'] = server_timing
+
+    if duracion * 1000 >= settings.API_UMBRAL_LENTA_MS:
+        sentencias = '\n'.join(f'  {segundos * 1000:8.1f} ms  {sql[:500]}' for sql, segundos in medicion.sql)
+        logger.warning(
+            'Petición lenta: %s %s (%s) %.0f ms, %d consultas en %.0f ms\n%s',
+            request.method, request.get_full_path(), vista, duracion * 1000,
+            medicion.consultas, medicion.tiempo_db * 1000, sentencias,
+        )
+    return response
+
+
+@sync_and_async_middleware
+def medir_peticiones(get_response):
+    """Mide latencia, consultas SQL, bytes y cache por vista; agrega Server-Timing"""
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            inicio = time.perf_counter()
+            medicion, token = metricas.iniciar()
+            try:
+                response = await get_response(request)
+            finally:
+                metricas.terminar(token)
+            return _cerrar_medicion(request, response, inicio, medicion)
+    else:
+        def middleware(request):
+            inicio = time.perf_counter()
+            medicion, token = metricas.iniciar()
+            try:
+                response = get_response(request)
+            finally:
+                metricas.terminar(token)
+            return _cerrar_medicion(request, response, inicio, medicion)
+    return middleware
+
+
+TIPOS_COMPRIMIBLES = ('text/', 'application/json', 'application/x-ndjson', 'application/javascript',
+                      'application/xml', 'image/svg+xml')
+
+
+class ComprimirRespuestas(GZipMiddleware):
+    """
+    GZip solo para respuestas de texto: las de streaming (listado con
+    ?stream=) se comprimen a medida que se generan y las demás solo desde
+    API_GZIP_MINIMO_BYTES. Imágenes y estáticos precomprimidos pasan tal cual.
+    """
+
+    def process_response(self, request, response):
+        content_type = response.get('Content-Type', '')
+        # Los eventos SSE tienen que llegar apenas se generan, sin buffer de gzip
+        if not content_type.startswith(TIPOS_COMPRIMIBLES) or content_type.startswith('text/event-stream'):
+            return response
+        if not response.streaming and len(response.content) < settings.API_GZIP_MINIMO_BYTES:
+            return response
+        return super().process_response(request, response)
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='videojuego',
+            options={'ordering': ['-created_at', 'id'], 'verbose_name': 'Videojuego', 'verbose_name_plural': 'Videojuegos'},
+        ),
+        migrations.AddIndex(
+            model_name='videojuego',
+            index=models.Index(fields=['-created_at', 'id'], name='videojuego_creado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='videojuego',
+            index=models.Index(fields=['plataforma', 'genero', '-created_at'], name='videojuego_plat_gen_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='videojuego',
+            index=models.Index(fields=['genero', '-created_at'], name='videojuego_genero_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='videojuego',
+            index=models.Index(fields=['desarrollador'], name='videojuego_desarrollador_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='videojuego',
+            index=models.Index(fields=['precio', 'id'], name='videojuego_precio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='videojuego',
+            index=models.Index(fields=['fecha_lanzamiento', 'id'], name='videojuego_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='videojuego',
+            index=models.Index(fields=['titulo', 'id'], name='videojuego_titulo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='videojuego',
+            index=models.Index(condition=models.Q(('stock__gt', 0)), fields=['-created_at', 'id'], name='videojuego_en_stock_idx'),
+        ),
+    ]
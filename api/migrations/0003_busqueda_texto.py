@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from api import busqueda
+
+
+def crear_indices(apps, schema_editor):
+    busqueda.crear_indices(schema_editor)
+
+
+def eliminar_indices(apps, schema_editor):
+    busqueda.eliminar_indices(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_indices_catalogo'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, eliminar_indices),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:11
+
+from django.db import migrations, models
+
+from api import busqueda
+
+
+def reinstalar_triggers(apps, schema_editor):
+    # Agregar una columna única obliga a SQLite a reconstruir la tabla, lo que
+    # elimina los triggers de búsqueda creados en 0003.
+    busqueda.reinstalar_triggers(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_busqueda_texto'),
+    ]
+
+    operations = [
+        # Al revertir, quitar la columna también reconstruye la tabla
+        migrations.RunPython(migrations.RunPython.noop, reinstalar_triggers),
+        migrations.AddField(
+            model_name='videojuego',
+            name='codigo_externo',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True, verbose_name='Código externo'),
+        ),
+        migrations.RunPython(reinstalar_triggers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:18
+
+from django.db import migrations, models
+
+from api import estadisticas
+
+
+def calcular_estadisticas(apps, schema_editor):
+    # Punto de partida para los deltas: los totales del catálogo existente
+    estadisticas.recalcular(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_codigo_externo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadisticaInventario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('plataforma', models.CharField(choices=[('PC', 'PC'), ('PS5', 'PlayStation 5'), ('PS4', 'PlayStation 4'), ('XBOX_SERIES', 'Xbox Series X/S'), ('XBOX_ONE', 'Xbox One'), ('SWITCH', 'Nintendo Switch'), ('MULTI', 'Multiplataforma')], max_length=20, verbose_name='Plataforma')),
+                ('genero', models.CharField(choices=[('ACCION', 'Acción'), ('AVENTURA', 'Aventura'), ('RPG', 'RPG'), ('DEPORTES', 'Deportes'), ('ESTRATEGIA', 'Estrategia'), ('SIMULACION', 'Simulación'), ('CARRERAS', 'Carreras'), ('SHOOTER', 'Shooter'), ('TERROR', 'Terror'), ('PUZZLE', 'Puzzle')], max_length=20, verbose_name='Género')),
+                ('cantidad', models.IntegerField(default=0, verbose_name='Videojuegos')),
+                ('unidades', models.IntegerField(default=0, verbose_name='Unidades en stock')),
+                ('valor', models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='Valor del inventario')),
+                ('stock_bajo', models.IntegerField(default=0, verbose_name='Videojuegos con stock bajo')),
+            ],
+            options={
+                'verbose_name': 'Estadística de inventario',
+                'verbose_name_plural': 'Estadísticas de inventario',
+                'ordering': ['plataforma', 'genero'],
+                'constraints': [models.UniqueConstraint(fields=('plataforma', 'genero'), name='estadistica_plat_gen_unica')],
+            },
+        ),
+        migrations.RunPython(calcular_estadisticas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:25
+
+from django.db import migrations, models
+
+from api import busqueda
+
+
+def reinstalar_triggers(apps, schema_editor):
+    # El default de JSONField obliga a SQLite a reconstruir la tabla, lo que
+    # elimina los triggers de búsqueda.
+    busqueda.reinstalar_triggers(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_estadisticas_inventario'),
+    ]
+
+    operations = [
+        # Al revertir, quitar las columnas también reconstruye la tabla
+        migrations.RunPython(migrations.RunPython.noop, reinstalar_triggers),
+        migrations.AddField(
+            model_name='videojuego',
+            name='portada',
+            field=models.FileField(blank=True, max_length=200, null=True, upload_to='portadas/', verbose_name='Portada'),
+        ),
+        migrations.AddField(
+            model_name='videojuego',
+            name='portada_srcset',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Variantes de la portada'),
+        ),
+        migrations.RunPython(reinstalar_triggers, migrations.RunPython.noop),
+    ]
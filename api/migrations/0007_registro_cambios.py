@@ -0,0 +1,55 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:32
+
+from itertools import islice
+
+from django.db import migrations, models
+
+
+def registrar_catalogo(apps, schema_editor):
+    # El registro arranca con un cambio por videojuego existente, así un
+    # cliente nuevo puede sincronizar todo el catálogo desde since=0.
+    Videojuego = apps.get_model('api', 'Videojuego')
+    CambioVideojuego = apps.get_model('api', 'CambioVideojuego')
+    ids = Videojuego.objects.order_by('id').values_list('id', flat=True).iterator(chunk_size=5000)
+    while lote := list(islice(ids, 5000)):
+        CambioVideojuego.objects.bulk_create([CambioVideojuego(videojuego_id=id) for id in lote])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_portadas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompactacionCambios',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hasta', models.BigIntegerField(default=0, verbose_name='Bajas descartadas hasta el token')),
+                ('eliminados', models.IntegerField(default=0, verbose_name='Cambios eliminados')),
+                ('fecha', models.DateTimeField(auto_now_add=True, verbose_name='Fecha')),
+            ],
+            options={
+                'verbose_name': 'Compactación de cambios',
+                'verbose_name_plural': 'Compactaciones de cambios',
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CambioVideojuego',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('videojuego_id', models.BigIntegerField(verbose_name='Videojuego')),
+                ('eliminado', models.BooleanField(default=False, verbose_name='Eliminado')),
+                ('creado', models.DateTimeField(auto_now_add=True, verbose_name='Fecha del cambio')),
+            ],
+            options={
+                'verbose_name': 'Cambio de videojuego',
+                'verbose_name_plural': 'Cambios de videojuegos',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['videojuego_id', 'id'], name='cambio_videojuego_idx')],
+            },
+        ),
+        migrations.RunPython(registrar_catalogo, migrations.RunPython.noop),
+    ]
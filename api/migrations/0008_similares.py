@@ -0,0 +1,45 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_registro_cambios'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConstruccionSimilares',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.BigIntegerField(default=0, verbose_name='Token del feed')),
+                ('idf', models.JSONField(default=dict, verbose_name='IDF por palabra')),
+                ('creada', models.DateTimeField(auto_now_add=True, verbose_name='Construcción completa')),
+                ('actualizada', models.DateTimeField(auto_now=True, verbose_name='Última actualización')),
+            ],
+            options={
+                'verbose_name': 'Construcción de similares',
+                'verbose_name_plural': 'Construcciones de similares',
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='VideojuegoSimilar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posicion', models.PositiveSmallIntegerField(verbose_name='Posición')),
+                ('puntaje', models.FloatField(verbose_name='Puntaje')),
+                ('similar', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='api.videojuego', verbose_name='Similar')),
+                ('videojuego', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='similares', to='api.videojuego', verbose_name='Videojuego')),
+            ],
+            options={
+                'verbose_name': 'Videojuego similar',
+                'verbose_name_plural': 'Videojuegos similares',
+                'ordering': ['videojuego', 'posicion'],
+                'constraints': [models.UniqueConstraint(fields=('videojuego', 'posicion'), name='similar_videojuego_posicion_unica')],
+            },
+        ),
+    ]
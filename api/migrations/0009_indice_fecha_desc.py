@@ -0,0 +1,32 @@
+from django.db import migrations
+
+# -fecha_lanzamiento se pagina con DESC NULLS LAST. En PostgreSQL recorrer al
+# revés videojuego_fecha_idx da DESC NULLS FIRST, así que ese orden necesita un
+# índice propio; SQLite pone los NULL primero en ASC y el recorrido inverso ya
+# coincide (y su CREATE INDEX no admite NULLS LAST).
+CREAR = (
+    'CREATE INDEX IF NOT EXISTS videojuego_fecha_desc_idx '
+    'ON api_videojuego (fecha_lanzamiento DESC NULLS LAST, id DESC)'
+)
+ELIMINAR = 'DROP INDEX IF EXISTS videojuego_fecha_desc_idx'
+
+
+def crear_indice(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREAR)
+
+
+def eliminar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(ELIMINAR)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_similares'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, eliminar_indice),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_indice_fecha_desc'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='estadisticainventario',
+            name='unidades',
+            field=models.BigIntegerField(default=0, verbose_name='Unidades en stock'),
+        ),
+        migrations.AlterField(
+            model_name='estadisticainventario',
+            name='valor',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=28, verbose_name='Valor del inventario'),
+        ),
+    ]
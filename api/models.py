@@ -34,13 +34,152 @@ class Videojuego(models.Model):
     genero = models.CharField(max_length=20, choices=GENEROS, default='ACCION', verbose_name='Género')
     desarrollador = models.CharField(max_length=200, blank=True, null=True, verbose_name='Desarrollador')
     fecha_lanzamiento = models.DateField(blank=True, null=True, verbose_name='Fecha de Lanzamiento')
+    codigo_externo = models.CharField(max_length=64, unique=True, blank=True, null=True, verbose_name='Código externo')
+    # Original de la portada y sus variantes redimensionadas, generadas por
+    # api.portadas: {formato: [[ancho, nombre en el storage], ...], 'original': [ancho, alto]}
+    portada = models.FileField(upload_to='portadas/', max_length=200, blank=True, null=True, verbose_name='Portada')
+    portada_srcset = models.JSONField(default=dict, blank=True, verbose_name='Variantes de la portada')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Fecha de actualización')
 
     class Meta:
         verbose_name = 'Videojuego'
         verbose_name_plural = 'Videojuegos'
-        ordering = ['-created_at']
+        ordering = ['-created_at', 'id']
+        # Índices para el orden por defecto, los filtros del listado y los
+        # órdenes permitidos en api.filtros (todos con `id` como desempate).
+        indexes = [
+            models.Index(fields=['-created_at', 'id'], name='videojuego_creado_idx'),
+            models.Index(fields=['plataforma', 'genero', '-created_at'], name='videojuego_plat_gen_idx'),
+            models.Index(fields=['genero', '-created_at'], name='videojuego_genero_idx'),
+            models.Index(fields=['desarrollador'], name='videojuego_desarrollador_idx'),
+            models.Index(fields=['precio', 'id'], name='videojuego_precio_idx'),
+            # En PostgreSQL el orden descendente (NULLS LAST) usa además
+            # videojuego_fecha_desc_idx, creado en la migración 0009
+            models.Index(fields=['fecha_lanzamiento', 'id'], name='videojuego_fecha_idx'),
+            models.Index(fields=['titulo', 'id'], name='videojuego_titulo_idx'),
+            models.Index(
+                fields=['-created_at', 'id'],
+                name='videojuego_en_stock_idx',
+                condition=models.Q(stock__gt=0),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.titulo} ({self.plataforma})"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Se recuerdan los valores leídos para que las señales puedan calcular
+        # qué cambió al guardar sin volver a consultar la fila.
+        instancia = super().from_db(db, field_names, values)
+        instancia._valores_cargados = dict(zip(field_names, values))
+        return instancia
+
+
+class EstadisticaInventario(models.Model):
+    """Totales de inventario por plataforma y género, mantenidos por señales"""
+    plataforma = models.CharField(max_length=20, choices=Videojuego.PLATAFORMAS, verbose_name='Plataforma')
+    genero = models.CharField(max_length=20, choices=Videojuego.GENEROS, verbose_name='Género')
+    cantidad = models.IntegerField(default=0, verbose_name='Videojuegos')
+    # Sumas de todo un grupo: una sola fila ya puede tener 2³¹ - 1 unidades a
+    # casi 10⁸ cada una. 28 dígitos es además la precisión del contexto
+    # decimal de Python, así que las sumas en memoria tampoco redondean.
+    unidades = models.BigIntegerField(default=0, verbose_name='Unidades en stock')
+    valor = models.DecimalField(max_digits=28, decimal_places=2, default=0, verbose_name='Valor del inventario')
+    stock_bajo = models.IntegerField(default=0, verbose_name='Videojuegos con stock bajo')
+
+    class Meta:
+        verbose_name = 'Estadística de inventario'
+        verbose_name_plural = 'Estadísticas de inventario'
+        ordering = ['plataforma', 'genero']
+        constraints = [
+            models.UniqueConstraint(fields=['plataforma', 'genero'], name='estadistica_plat_gen_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.plataforma} / {self.genero}"
+
+
+class CambioVideojuego(models.Model):
+    """
+    Registro de solo inserción de las altas, modificaciones y bajas de
+    videojuegos; el id es el token del feed de cambios (ver api.cambios)
+    """
+    # Sin ForeignKey: las bajas tienen que sobrevivir al videojuego
+    videojuego_id = models.BigIntegerField(verbose_name='Videojuego')
+    eliminado = models.BooleanField(default=False, verbose_name='Eliminado')
+    creado = models.DateTimeField(auto_now_add=True, verbose_name='Fecha del cambio')
+
+    class Meta:
+        verbose_name = 'Cambio de videojuego'
+        verbose_name_plural = 'Cambios de videojuegos'
+        ordering = ['id']
+        # La compactación busca, por videojuego, si hay un cambio posterior
+        indexes = [
+            models.Index(fields=['videojuego_id', 'id'], name='cambio_videojuego_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.id}: {'baja' if self.eliminado else 'cambio'} de {self.videojuego_id}"
+
+
+class CompactacionCambios(models.Model):
+    """Compactaciones del registro de cambios; los tokens anteriores a `hasta` ya no sirven"""
+    hasta = models.BigIntegerField(default=0, verbose_name='Bajas descartadas hasta el token')
+    eliminados = models.IntegerField(default=0, verbose_name='Cambios eliminados')
+    fecha = models.DateTimeField(auto_now_add=True, verbose_name='Fecha')
+
+    class Meta:
+        verbose_name = 'Compactación de cambios'
+        verbose_name_plural = 'Compactaciones de cambios'
+        ordering = ['-id']
+
+    def __str__(self):
+        return f"{self.fecha:%Y-%m-%d %H:%M} (hasta {self.hasta})"
+
+
+class VideojuegoSimilar(models.Model):
+    """Videojuegos más parecidos a cada uno, calculados por build_similares (ver api.similares)"""
+    # La restricción única (videojuego, posicion) ya sirve de índice para el FK
+    videojuego = models.ForeignKey(
+        Videojuego, on_delete=models.CASCADE, db_index=False, related_name='similares', verbose_name='Videojuego',
+    )
+    # Sin restricción ni cascada: las listas que nombran a un videojuego dado
+    # de baja las recalcula la próxima pasada incremental y, mientras tanto,
+    # el JOIN de la consulta las descarta.
+    similar = models.ForeignKey(
+        Videojuego, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+', verbose_name='Similar',
+    )
+    posicion = models.PositiveSmallIntegerField(verbose_name='Posición')
+    puntaje = models.FloatField(verbose_name='Puntaje')
+
+    class Meta:
+        verbose_name = 'Videojuego similar'
+        verbose_name_plural = 'Videojuegos similares'
+        ordering = ['videojuego', 'posicion']
+        constraints = [
+            models.UniqueConstraint(fields=['videojuego', 'posicion'], name='similar_videojuego_posicion_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.videojuego_id} -> {self.similar_id} ({self.puntaje:.3f})"
+
+
+class ConstruccionSimilares(models.Model):
+    """
+    Última pasada de build_similares: hasta qué token del feed de cambios
+    cubren los similares y el IDF de las palabras con el que se vectorizó
+    """
+    token = models.BigIntegerField(default=0, verbose_name='Token del feed')
+    idf = models.JSONField(default=dict, verbose_name='IDF por palabra')
+    creada = models.DateTimeField(auto_now_add=True, verbose_name='Construcción completa')
+    actualizada = models.DateTimeField(auto_now=True, verbose_name='Última actualización')
+
+    class Meta:
+        verbose_name = 'Construcción de similares'
+        verbose_name_plural = 'Construcciones de similares'
+        ordering = ['-id']
+
+    def __str__(self):
+        return f"{self.creada:%Y-%m-%d %H:%M} (token {self.token})"
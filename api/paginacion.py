@@ -0,0 +1,146 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+
+from .models import Videojuego
+
+# Paginación por cursor (keyset) sobre el catálogo.
+#
+# En lugar de OFFSET, cada página se pide a partir de los valores de las
+# columnas de orden de la última fila entregada, de modo que el costo de
+# cualquier página es el mismo sin importar lo lejos que esté del inicio.
+
+ORDEN_POR_DEFECTO = ('-created_at', 'id')
+
+
+class CursorInvalido(ValueError):
+    """El cursor recibido no se puede decodificar o no corresponde al orden pedido"""
+
+
+def _campo(nombre):
+    return Videojuego._meta.get_field(nombre.lstrip('-'))
+
+
+def columnas(orden):
+    """Nombres de columna (sin signo) que participan en el orden"""
+    return [nombre.lstrip('-') for nombre in orden]
+
+
+def ordenar(queryset, orden=ORDEN_POR_DEFECTO):
+    """Aplica el orden de paginación dejando los NULL siempre al final"""
+    expresiones = []
+    for nombre in orden:
+        if not _campo(nombre).null:
+            # Sin NULLS LAST en columnas NOT NULL: en SQLite impediría usar el
+            # índice para esa parte del orden
+            expresiones.append(nombre)
+        elif nombre.startswith('-'):
+            expresiones.append(F(nombre[1:]).desc(nulls_last=True))
+        else:
+            expresiones.append(F(nombre).asc(nulls_last=True))
+    return queryset.order_by(*expresiones)
+
+
+def _despues_de(nombre, valor):
+    """Condición para las filas que van estrictamente después de `valor` en una columna"""
+    campo = _campo(nombre)
+    if valor is None:
+        # Los NULL van al final: después de un NULL no hay nada en esta columna
+        return Q(pk__in=[])
+    lookup = 'lt' if nombre.startswith('-') else 'gt'
+    condicion = Q(**{f'{campo.name}__{lookup}': valor})
+    if campo.null:
+        condicion |= Q(**{f'{campo.name}__isnull': True})
+    return condicion
+
+
+def _igual_a(nombre, valor):
+    columna = _campo(nombre).name
+    if valor is None:
+        return Q(**{f'{columna}__isnull': True})
+    return Q(**{columna: valor})
+
+
+def filtro_keyset(orden, valores):
+    """Construye el filtro lexicográfico para continuar después de `valores`"""
+    # Se arma de la última columna hacia la primera:
+    # (a > x) OR (a = x AND ((b > y) OR (b = y AND ...)))
+    condicion = None
+    for nombre, valor in reversed(list(zip(orden, valores))):
+        despues = _despues_de(nombre, valor)
+        if condicion is None:
+            condicion = despues
+        else:
+            condicion = despues | (_igual_a(nombre, valor) & condicion)
+    return condicion
+
+
+def _a_json(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    return valor
+
+
+def codificar_cursor(orden, valores):
+    """Codifica los valores de la última fila como un cursor opaco"""
+    datos = {'o': ','.join(orden), 'v': [_a_json(valor) for valor in valores]}
+    crudo = json.dumps(datos, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor, orden):
+    """Devuelve los valores tipados guardados en el cursor"""
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        datos = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        if datos['o'] != ','.join(orden) or len(datos['v']) != len(orden):
+            raise CursorInvalido('El cursor no corresponde al orden solicitado')
+        return [
+            None if valor is None else _campo(nombre).to_python(valor)
+            for nombre, valor in zip(orden, datos['v'])
+        ]
+    except CursorInvalido:
+        raise
+    except (binascii.Error, ValueError, KeyError, TypeError, ValidationError):
+        raise CursorInvalido('Cursor inválido')
+
+
+def _consulta_pagina(queryset, columnas_consulta, limite, cursor, orden):
+    queryset = ordenar(queryset, orden)
+    if cursor:
+        queryset = queryset.filter(filtro_keyset(orden, decodificar_cursor(cursor, orden)))
+    return queryset.values_list(*columnas_consulta)[:limite + 1]
+
+
+def _cortar_pagina(filas, columnas_consulta, limite, orden):
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        ultima = filas[-1]
+        siguiente = codificar_cursor(orden, [ultima[columnas_consulta.index(columna)] for columna in columnas(orden)])
+    return filas, siguiente
+
+
+def paginar(queryset, columnas_consulta, limite, cursor=None, orden=ORDEN_POR_DEFECTO):
+    """
+    Devuelve (filas, siguiente_cursor) para una página del queryset.
+
+    Las filas son tuplas de `values_list(*columnas_consulta)`, que debe incluir
+    las columnas del orden. Se pide una fila de más para saber si hay otra
+    página sin tener que contar.
+    """
+    filas = list(_consulta_pagina(queryset, columnas_consulta, limite, cursor, orden))
+    return _cortar_pagina(filas, columnas_consulta, limite, orden)
+
+
+async def apaginar(queryset, columnas_consulta, limite, cursor=None, orden=ORDEN_POR_DEFECTO):
+    """Versión async de `paginar` (itera el queryset con el ORM async)"""
+    filas = [fila async for fila in _consulta_pagina(queryset, columnas_consulta, limite, cursor, orden)]
+    return _cortar_pagina(filas, columnas_consulta, limite, orden)
@@ -0,0 +1,107 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+try:
+    from . import imagenes
+except ImportError:  # Pillow es opcional; sin él no se aceptan portadas
+    imagenes = None
+
+# Portadas de videojuegos.
+#
+# Decodificar y redimensionar imágenes es trabajo de CPU que retiene el GIL,
+# así que se hace en un pool de procesos (api.imagenes) y el proceso web solo
+# escribe los archivos. Los nombres salen del sha256 del original: la misma
+# imagen subida dos veces no se vuelve a escribir y las URLs de las variantes
+# nunca cambian de contenido, así que se pueden cachear indefinidamente.
+
+CARPETA = 'portadas'
+# Clave de portada_srcset con [ancho, alto] del original, junto a los formatos
+ORIGINAL = 'original'
+
+_pool = None
+_lock = threading.Lock()
+
+
+def disponible():
+    return imagenes is not None
+
+
+def procesos():
+    return settings.API_PORTADA_PROCESOS or os.cpu_count() or 1
+
+
+def _executor():
+    global _pool
+    with _lock:
+        if _pool is None:
+            # spawn: los hijos no heredan las conexiones a la base del padre
+            _pool = ProcessPoolExecutor(
+                max_workers=procesos(),
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+    return _pool
+
+
+def procesar(datos):
+    """Encola el procesamiento de una imagen; devuelve un Future con el resultado de imagenes.procesar"""
+    if imagenes is None:
+        raise RuntimeError('Pillow no está instalado')
+    return _executor().submit(
+        imagenes.procesar, datos, list(settings.API_PORTADA_ANCHOS), imagenes.formatos_disponibles()
+    )
+
+
+def _escribir(nombre, contenido):
+    if default_storage.exists(nombre):
+        return nombre
+    return default_storage.save(nombre, ContentFile(contenido))
+
+
+def guardar(resultado, datos):
+    """Escribe el original y sus variantes; devuelve (nombre del original, variantes para portada_srcset)"""
+    base = f'{CARPETA}/{resultado["hash"][:2]}/{resultado["hash"]}'
+    original = _escribir(f'{base}/original.{resultado["extension"]}', datos)
+    variantes = {
+        formato: [[ancho, _escribir(f'{base}/{ancho}.{formato}', contenido)] for ancho, contenido in lista]
+        for formato, lista in resultado['variantes'].items()
+    }
+    variantes[ORIGINAL] = [resultado['ancho'], resultado['alto']]
+    return original, variantes
+
+
+def asignar(videojuego, resultado, datos):
+    """Guarda los archivos de un resultado ya procesado y los asocia al videojuego"""
+    videojuego.portada.name, videojuego.portada_srcset = guardar(resultado, datos)
+    # update_fields acota el UPDATE; las señales invalidan el cache como en
+    # cualquier otro cambio y las estadísticas no se tocan.
+    videojuego.save(update_fields=['portada', 'portada_srcset', 'updated_at'])
+    return videojuego
+
+
+def guardar_portada(videojuego, datos):
+    """
+    Procesa `datos` (bytes de la imagen) y la asigna como portada.
+    Lanza ValueError si no es una imagen válida.
+    """
+    return asignar(videojuego, procesar(datos).result(), datos)
+
+
+def pendiente(videojuego):
+    """True si la portada no tiene todas las variantes que pide la configuración actual"""
+    if not videojuego.portada:
+        return False
+    formatos = set(imagenes.formatos_disponibles()) if imagenes is not None else set()
+    variantes = dict(videojuego.portada_srcset or {})
+    tamano = variantes.pop(ORIGINAL, None)
+    # Sin el tamaño del original (portadas anteriores a guardarlo) no se sabe
+    # qué anchos le corresponden: se procesa una vez más y queda registrado
+    if tamano is None or set(variantes) != formatos:
+        return True
+    esperados = imagenes.anchos_para(tamano[0], settings.API_PORTADA_ANCHOS) if formatos else []
+    return any([ancho for ancho, _ in lista] != esperados for lista in variantes.values())
@@ -0,0 +1,60 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Réplicas de lectura.
+#
+# Con DB_REPLICAS configurado, las lecturas van a una réplica al azar y las
+# escrituras a la primaria (`default`). Una lectura va igualmente a la
+# primaria si la petición está fijada (el cliente acaba de escribir, ver
+# api.middleware) o si ocurre dentro de una transacción de la primaria: las
+# lecturas de una escritura (señales, lotes, inventario) deben ver sus
+# propios cambios.
+
+_usar_primaria = ContextVar('usar_primaria', default=False)
+
+
+def usar_primaria():
+    """True si las lecturas del contexto actual están fijadas a la primaria"""
+    return _usar_primaria.get()
+
+
+@contextmanager
+def primaria():
+    """Fija a la primaria las lecturas hechas dentro del bloque"""
+    token = _usar_primaria.set(True)
+    try:
+        yield
+    finally:
+        _usar_primaria.reset(token)
+
+
+def leyendo_de_replica():
+    """True si una lectura hecha ahora iría a una réplica"""
+    return (
+        bool(settings.DATABASE_REPLICAS)
+        and not _usar_primaria.get()
+        and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+    )
+
+
+class RouterReplicas:
+    """Router de bases: lecturas a réplicas, escrituras a la primaria"""
+
+    def __init__(self, replicas=None):
+        self.replicas = list(settings.DATABASE_REPLICAS if replicas is None else replicas)
+
+    def db_for_read(self, model, **hints):
+        if not self.replicas or _usar_primaria.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(self.replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Todas las bases tienen los mismos datos
+        return True
@@ -0,0 +1,123 @@
+import json
+
+from django.core.files.storage import default_storage
+from django.http import HttpResponse, JsonResponse
+
+from . import portadas
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional; sin él se usa json de la stdlib
+    orjson = None
+
+# Serialización de videojuegos para la API.
+#
+# Las lecturas trabajan sobre tuplas de `.values_list()` (sin instanciar
+# modelos): cada Serializador precalcula qué columnas pedir y qué conversión
+# aplicar a cada posición, y arma el dict de salida con una sola pasada.
+
+CAMPOS = (
+    'id', 'titulo', 'descripcion', 'precio', 'stock', 'plataforma', 'genero',
+    'desarrollador', 'fecha_lanzamiento', 'codigo_externo', 'portada', 'portada_srcset',
+    'created_at', 'updated_at',
+)
+
+
+def _isoformat(valor):
+    return valor.isoformat() if valor is not None else None
+
+
+def _url_portada(valor):
+    # values_list devuelve el nombre; una instancia, un FieldFile
+    nombre = getattr(valor, 'name', valor)
+    return default_storage.url(nombre) if nombre else None
+
+
+def _srcset(variantes):
+    """{formato: [[ancho, nombre], ...]} -> {formato: 'url 160w, url 320w'} listo para <source srcset>"""
+    return {
+        formato: ', '.join(f'{default_storage.url(nombre)} {ancho}w' for ancho, nombre in lista)
+        for formato, lista in (variantes or {}).items()
+        if formato != portadas.ORIGINAL
+    }
+
+
+CONVERSORES = {
+    'precio': str,
+    'fecha_lanzamiento': _isoformat,
+    'portada': _url_portada,
+    'portada_srcset': _srcset,
+    'created_at': _isoformat,
+    'updated_at': _isoformat,
+}
+
+
+def parse_campos(valor):
+    """Valida el parámetro `fields` (lista separada por comas) y devuelve la tupla de campos"""
+    if not valor:
+        return CAMPOS
+    campos = tuple(dict.fromkeys(campo.strip() for campo in valor.split(',') if campo.strip()))
+    invalidos = [campo for campo in campos if campo not in CAMPOS]
+    if invalidos or not campos:
+        raise ValueError(f'Campos inválidos. Opciones válidas: {", ".join(CAMPOS)}')
+    return campos
+
+
+class Serializador:
+    """Convierte filas de values_list en payloads con los campos pedidos"""
+
+    def __init__(self, campos=CAMPOS, extra=()):
+        self.campos = tuple(campos)
+        # Columnas adicionales que se consultan pero no se devuelven (por
+        # ejemplo las del orden, que la paginación necesita para el cursor).
+        self.columnas = self.campos + tuple(columna for columna in extra if columna not in self.campos)
+        self._convertidos = [
+            (campo, i, CONVERSORES[campo]) for i, campo in enumerate(self.campos) if campo in CONVERSORES
+        ]
+
+    def fila(self, fila):
+        # zip corta en self.campos: las columnas extra no llegan al payload
+        data = dict(zip(self.campos, fila))
+        for campo, i, conversor in self._convertidos:
+            data[campo] = conversor(fila[i])
+        return data
+
+    def filas(self, filas):
+        return [self.fila(fila) for fila in filas]
+
+    def instancia(self, videojuego):
+        return self.fila([getattr(videojuego, campo) for campo in self.campos])
+
+
+COMPLETO = Serializador()
+
+
+def serializar_videojuego(videojuego):
+    """Payload completo de una instancia (para altas y modificaciones)"""
+    return COMPLETO.instancia(videojuego)
+
+
+def proyectar(data, campos):
+    """Recorta un payload completo a los campos pedidos"""
+    if campos is CAMPOS:
+        return data
+    return {campo: data[campo] for campo in campos}
+
+
+if orjson is not None:
+    def a_json(data):
+        return orjson.dumps(data)
+else:
+    def a_json(data):
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+class RespuestaJSON(JsonResponse):
+    """JsonResponse que codifica con orjson cuando está instalado"""
+
+    def __init__(self, data, status=200, **kwargs):
+        if orjson is None:
+            super().__init__(data, safe=False, status=status, **kwargs)
+            return
+        kwargs.setdefault('content_type', 'application/json')
+        HttpResponse.__init__(self, content=orjson.dumps(data), status=status, **kwargs)
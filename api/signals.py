@@ -0,0 +1,68 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+
+from . import cache, cambios, estadisticas, eventos, facetas
+from .models import Videojuego
+
+# Se envía tras escrituras que no pasan por save() (bulk_create, bulk_update,
+# update()), con los ids afectados en `ids` y, en `previas`, las filas
+# (plataforma, genero, precio, stock) que esos ids tenían antes del cambio.
+# Los movimientos de stock mandan además `stocks` ({id: stock resultante}).
+cambio_masivo = Signal()
+
+
+@receiver(post_save, sender=Videojuego)
+@receiver(post_delete, sender=Videojuego)
+def invalidar_cache_catalogo(sender, instance, **kwargs):
+    """Cualquier cambio en un videojuego (API o admin) invalida el cache"""
+    cache.invalidar([instance.pk])
+
+
+@receiver(cambio_masivo, sender=Videojuego)
+def invalidar_cache_catalogo_masivo(sender, ids, **kwargs):
+    cache.invalidar(ids)
+
+
+@receiver(pre_save, sender=Videojuego)
+def preparar_estadisticas(sender, instance, update_fields=None, **kwargs):
+    estadisticas.antes_de_guardar(instance, update_fields)
+
+
+@receiver(post_save, sender=Videojuego)
+def actualizar_estadisticas(sender, instance, update_fields=None, **kwargs):
+    estadisticas.despues_de_guardar(instance, update_fields)
+
+
+@receiver(pre_delete, sender=Videojuego)
+def descontar_estadisticas(sender, instance, **kwargs):
+    estadisticas.antes_de_eliminar(instance)
+
+
+@receiver(cambio_masivo, sender=Videojuego)
+def actualizar_estadisticas_masivo(sender, ids, previas=None, **kwargs):
+    if previas is None:
+        # Sin el estado anterior no se puede calcular el delta
+        estadisticas.recalcular()
+        return
+    estadisticas.registrar(previas, estadisticas.filas(Videojuego.objects.filter(id__in=ids)))
+
+
+@receiver(post_save, sender=Videojuego)
+def registrar_cambio(sender, instance, **kwargs):
+    registrados = cambios.registrar([instance.pk])
+    eventos.notificar(registrados)
+    facetas.notificar(registrados)
+
+
+@receiver(post_delete, sender=Videojuego)
+def registrar_baja(sender, instance, **kwargs):
+    registrados = cambios.registrar([instance.pk], eliminado=True)
+    eventos.notificar(registrados)
+    facetas.notificar(registrados)
+
+
+@receiver(cambio_masivo, sender=Videojuego)
+def registrar_cambios_masivos(sender, ids, stocks=None, **kwargs):
+    registrados = cambios.registrar(ids)
+    eventos.notificar(registrados, stocks)
+    facetas.notificar(registrados)
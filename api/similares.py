@@ -0,0 +1,305 @@
+import math
+import re
+import zlib
+from collections import Counter
+from itertools import groupby
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import cambios
+from .models import ConstruccionSimilares, Videojuego, VideojuegoSimilar
+
+try:
+    import numpy as np
+except ImportError:  # numpy es opcional; sin él build_similares no corre
+    np = None
+
+# Videojuegos similares ("también te puede gustar").
+#
+# Cada videojuego se convierte en un vector con su plataforma, su
+# desarrollador, su banda de precio y el TF-IDF de título y descripción; el
+# parecido entre dos es el producto escalar de sus vectores normalizados
+# (coseno). Los vecinos se buscan solo entre los del mismo género: el género
+# hace de partición en vez de ser una dimensión más, así el costo es la suma
+# de los cuadrados de cada género y no el cuadrado del catálogo.
+#
+# Los vecinos se calculan con multiplicaciones de matrices de NumPy por
+# tramos de filas (API_SIMILARES_MEMORIA_MB acota la matriz de puntajes de
+# cada tramo) y se guardan en VideojuegoSimilar, así el endpoint los lee con
+# una sola consulta por índice.
+#
+# build_similares se pone al día con el feed de cambios: recalcula los
+# videojuegos modificados, los que los tenían en su lista y los que ahora
+# tendrían a un modificado por encima de su último vecino. Si el token venció
+# o hay más de API_SIMILARES_MAXIMO_INCREMENTAL cambios, reconstruye todo.
+
+_PALABRA = re.compile(r'\w{3,}')
+# Palabras distintas que se conservan (las de mayor frecuencia en documentos)
+VOCABULARIO = 50_000
+
+PLATAFORMAS = {codigo: i for i, (codigo, _) in enumerate(Videojuego.PLATAFORMAS)}
+DIMENSIONES_DESARROLLADOR = 32
+BANDAS_PRECIO = 12
+DIMENSIONES_TEXTO = 128
+
+# Cada grupo se normaliza y se multiplica por su peso antes de normalizar el vector
+PESOS = (
+    ('plataforma', len(PLATAFORMAS), 0.4),
+    ('desarrollador', DIMENSIONES_DESARROLLADOR, 0.6),
+    ('precio', BANDAS_PRECIO, 0.4),
+    ('texto', DIMENSIONES_TEXTO, 1.0),
+)
+_INICIO = {}
+DIMENSIONES = 0
+for _nombre, _ancho, _ in PESOS:
+    _INICIO[_nombre] = DIMENSIONES
+    DIMENSIONES += _ancho
+
+COLUMNAS = ('id', 'plataforma', 'desarrollador', 'precio', 'titulo', 'descripcion')
+
+
+class NumpyNoDisponible(RuntimeError):
+    """build_similares necesita numpy"""
+
+
+def _palabras(titulo, descripcion):
+    return _PALABRA.findall(f'{titulo} {descripcion or ""}'.lower())
+
+
+def _cubeta(texto, ancho):
+    # crc32 y no hash(): tiene que dar lo mismo en todos los procesos
+    return zlib.crc32(texto.encode()) % ancho
+
+
+def calcular_idf(textos):
+    """IDF de las palabras que aparecen en al menos dos de los (titulo, descripcion)"""
+    frecuencias, documentos = Counter(), 0
+    for titulo, descripcion in textos:
+        frecuencias.update(set(_palabras(titulo, descripcion)))
+        documentos += 1
+    # Una palabra de un solo videojuego no acerca a ninguno con otro
+    comunes = [(palabra, df) for palabra, df in frecuencias.most_common(VOCABULARIO) if df > 1]
+    return {palabra: round(math.log((1 + documentos) / (1 + df)) + 1, 4) for palabra, df in comunes}
+
+
+def _terminos(idf):
+    """{palabra: (columna, peso con signo)}: el signo (otro bit del crc) compensa las colisiones"""
+    terminos = {}
+    for palabra, valor in idf.items():
+        crc = zlib.crc32(palabra.encode())
+        terminos[palabra] = (_INICIO['texto'] + crc % DIMENSIONES_TEXTO, -valor if crc & 0x80000000 else valor)
+    return terminos
+
+
+def vectores(filas, terminos):
+    """Matriz (filas, DIMENSIONES) float32 con un vector de norma 1 por fila de COLUMNAS"""
+    matriz = np.zeros((len(filas), DIMENSIONES), dtype=np.float32)
+    if not filas:
+        return matriz
+    _, plataformas, desarrolladores, precios, titulos, descripciones = zip(*filas)
+    posiciones = np.arange(len(filas))
+
+    codigos = np.array([PLATAFORMAS.get(plataforma, -1) for plataforma in plataformas])
+    conocidas = codigos >= 0
+    matriz[posiciones[conocidas], _INICIO['plataforma'] + codigos[conocidas]] = 1
+
+    con_desarrollador = [i for i, desarrollador in enumerate(desarrolladores) if desarrollador]
+    matriz[con_desarrollador, [
+        _INICIO['desarrollador'] + _cubeta(desarrolladores[i].lower(), DIMENSIONES_DESARROLLADOR)
+        for i in con_desarrollador
+    ]] = 1
+
+    # Bandas logarítmicas (0-1, 1-3, 3-7, ...); las vecinas suman medio punto
+    bandas = np.log2(np.array(precios, dtype=np.float64) + 1).astype(np.int64).clip(0, BANDAS_PRECIO - 1)
+    inicio = _INICIO['precio']
+    matriz[posiciones, inicio + bandas] = 1
+    matriz[posiciones[bandas > 0], inicio + bandas[bandas > 0] - 1] = 0.5
+    matriz[posiciones[bandas < BANDAS_PRECIO - 1], inicio + bandas[bandas < BANDAS_PRECIO - 1] + 1] = 0.5
+
+    filas_texto, columnas_texto, valores_texto = [], [], []
+    for i, (titulo, descripcion) in enumerate(zip(titulos, descripciones)):
+        for palabra, veces in Counter(_palabras(titulo, descripcion)).items():
+            termino = terminos.get(palabra)
+            if termino is not None:
+                filas_texto.append(i)
+                columnas_texto.append(termino[0])
+                valores_texto.append((1 + math.log(veces)) * termino[1])
+    # add.at suma las palabras que caen en la misma columna
+    np.add.at(matriz, (filas_texto, columnas_texto), valores_texto)
+
+    for nombre, ancho, peso in PESOS:
+        grupo = matriz[:, _INICIO[nombre]:_INICIO[nombre] + ancho]
+        _normalizar(grupo)
+        grupo *= peso
+    _normalizar(matriz)
+    return matriz
+
+
+def _normalizar(matriz):
+    normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+    np.divide(matriz, normas, out=matriz, where=normas > 0)
+
+
+def _filas_por_tramo(total):
+    # La matriz de puntajes del tramo (float32) y las dos copias de argpartition
+    return max(1, settings.API_SIMILARES_MEMORIA_MB * 1024 * 1024 // (total * 4 * 3))
+
+
+def vecinos(matriz, posiciones, cantidad):
+    """
+    Los `cantidad` más parecidos (sin contarse a sí mismas) de las filas
+    `posiciones` de la matriz. Genera por tramos (posiciones, índices, puntajes),
+    del más al menos parecido.
+    """
+    total = len(matriz)
+    cantidad = min(cantidad, total - 1)
+    if cantidad <= 0 or not len(posiciones):
+        return
+    tramo = _filas_por_tramo(total)
+    for desde in range(0, len(posiciones), tramo):
+        parte = np.asarray(posiciones[desde:desde + tramo])
+        puntajes = matriz[parte] @ matriz.T
+        puntajes[np.arange(len(parte)), parte] = -np.inf
+        mejores = np.argpartition(puntajes, total - cantidad, axis=1)[:, total - cantidad:]
+        mejores_puntajes = np.take_along_axis(puntajes, mejores, axis=1)
+        orden = np.argsort(-mejores_puntajes, axis=1, kind='stable')
+        yield parte, np.take_along_axis(mejores, orden, axis=1), np.take_along_axis(mejores_puntajes, orden, axis=1)
+
+
+_INSERTAR = 'INSERT INTO {} ({}) VALUES (%s, %s, %s, %s)'.format(
+    connection.ops.quote_name(VideojuegoSimilar._meta.db_table),
+    ', '.join(
+        connection.ops.quote_name(VideojuegoSimilar._meta.get_field(campo).column)
+        for campo in ('videojuego', 'similar', 'posicion', 'puntaje')
+    ),
+)
+
+
+def _guardar(ids, matriz, posiciones):
+    """Reemplaza las listas de los videojuegos en `posiciones` de un bloque"""
+    cantidad = settings.API_SIMILARES_CANTIDAD
+    if len(ids) < 2:
+        # Solo en su género: no tiene vecinos (y si venía de otro, pierde los de antes)
+        VideojuegoSimilar.objects.filter(videojuego_id__in=ids[posiciones].tolist()).delete()
+        return
+    for parte, indices, puntajes in vecinos(matriz, posiciones, cantidad):
+        propios = ids[parte].tolist()
+        with transaction.atomic(), connection.cursor() as cursor:
+            VideojuegoSimilar.objects.filter(videojuego_id__in=propios).delete()
+            # Un millón de filas con bulk_create es sobre todo instanciar modelos y
+            # compilar el INSERT: executemany manda las tuplas tal cual
+            cursor.executemany(_INSERTAR, [
+                (id, similar, posicion, puntaje)
+                for id, similares, fila_puntajes in zip(propios, ids[indices].tolist(), puntajes.tolist())
+                for posicion, (similar, puntaje) in enumerate(zip(similares, fila_puntajes))
+            ])
+
+
+def _bloques(queryset):
+    """(genero, filas de COLUMNAS) por género, leyendo el catálogo una sola vez"""
+    filas = queryset.order_by('genero', 'id').values_list('genero', *COLUMNAS).iterator(
+        chunk_size=settings.API_STREAM_CHUNK_SIZE
+    )
+    for genero, grupo in groupby(filas, key=lambda fila: fila[0]):
+        yield genero, [fila[1:] for fila in grupo]
+
+
+def _bloque(filas, terminos):
+    return np.array([fila[0] for fila in filas], dtype=np.int64), vectores(filas, terminos)
+
+
+def construir():
+    """Recalcula los similares de todo el catálogo. Devuelve la cantidad de videojuegos."""
+    if np is None:
+        raise NumpyNoDisponible('build_similares necesita numpy (pip install numpy)')
+    # El token se toma antes de leer: lo que cambie mientras tanto lo
+    # recalcula la próxima pasada incremental.
+    token = cambios.token_actual()
+    textos = Videojuego.objects.order_by().values_list('titulo', 'descripcion')
+    idf = calcular_idf(textos.iterator(chunk_size=settings.API_STREAM_CHUNK_SIZE))
+    terminos = _terminos(idf)
+
+    procesados = 0
+    for _, filas in _bloques(Videojuego.objects.all()):
+        ids, matriz = _bloque(filas, terminos)
+        _guardar(ids, matriz, np.arange(len(ids)))
+        procesados += len(ids)
+
+    with transaction.atomic():
+        ConstruccionSimilares.objects.all().delete()
+        ConstruccionSimilares.objects.create(token=token, idf=idf)
+    return procesados
+
+
+def actualizar():
+    """
+    Aplica los cambios del feed desde la última pasada; reconstruye todo si no
+    hubo ninguna, el token venció o son demasiados. Devuelve (videojuegos
+    recalculados, si fue completa).
+    """
+    if np is None:
+        raise NumpyNoDisponible('build_similares necesita numpy (pip install numpy)')
+    construccion = ConstruccionSimilares.objects.first()
+    if construccion is None:
+        return construir(), True
+    try:
+        guardados, eliminados, siguiente, hay_mas = cambios.leer(
+            construccion.token, settings.API_SIMILARES_MAXIMO_INCREMENTAL
+        )
+    except cambios.TokenVencido:
+        return construir(), True
+    if hay_mas:
+        return construir(), True
+
+    tocados = set(guardados) | set(eliminados)
+    # Los que tenían en su lista a un videojuego que cambió o se dio de baja
+    referentes = set(
+        VideojuegoSimilar.objects.filter(similar_id__in=tocados).values_list('videojuego_id', flat=True)
+    ) if tocados else set()
+    VideojuegoSimilar.objects.filter(videojuego_id__in=eliminados).delete()
+    recalcular = set(guardados) | referentes
+    generos = set(
+        Videojuego.objects.filter(id__in=recalcular).order_by().values_list('genero', flat=True).distinct()
+    ) if recalcular else set()
+
+    terminos = _terminos(construccion.idf)
+    cantidad = settings.API_SIMILARES_CANTIDAD
+    recalculados = 0
+    for genero, filas in _bloques(Videojuego.objects.filter(genero__in=generos)):
+        ids, matriz = _bloque(filas, terminos)
+        en_bloque = np.isin(ids, list(recalcular))
+        modificados = np.flatnonzero(np.isin(ids, guardados))
+
+        # El puntaje del último vecino de cada uno: si un modificado lo supera,
+        # entra en esa lista. Sin lista completa cualquier modificado entra.
+        umbrales = np.full(len(ids), -np.inf, dtype=np.float32)
+        posicion_de = {id: i for i, id in enumerate(ids.tolist())}
+        ultimos = VideojuegoSimilar.objects.filter(videojuego__genero=genero, posicion=cantidad - 1)
+        for id, puntaje in ultimos.values_list('videojuego_id', 'puntaje'):
+            # Uno que pasó a este género después de leer el bloque no está en
+            # él: su cambio queda en el feed para la próxima pasada
+            if id in posicion_de:
+                umbrales[posicion_de[id]] = puntaje
+        tramo = _filas_por_tramo(len(ids))
+        for desde in range(0, len(modificados), tramo):
+            parte = modificados[desde:desde + tramo]
+            puntajes = matriz[parte] @ matriz.T
+            puntajes[np.arange(len(parte)), parte] = -np.inf
+            en_bloque |= puntajes.max(axis=0) > umbrales
+
+        posiciones = np.flatnonzero(en_bloque)
+        _guardar(ids, matriz, posiciones)
+        recalculados += len(posiciones)
+
+    ConstruccionSimilares.objects.filter(pk=construccion.pk).update(token=siguiente, actualizada=timezone.now())
+    return recalculados, False
+
+
+def leer(id, columnas):
+    """Filas (columnas del videojuego similar..., puntaje) de la lista de `id`, en orden"""
+    return list(
+        VideojuegoSimilar.objects.filter(videojuego_id=id).order_by('posicion')
+        .values_list(*(f'similar__{columna}' for columna in columnas), 'puntaje')
+    )
@@ -1,3 +1,1351 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+import os
+import tempfile
+import threading
+from collections import Counter
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.http import Http404, HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import admin as admin_catalogo, cache, cambios, coalescencia, estadisticas, estaticos, eventos, facetas, filtros, inventario, lotes, metricas, portadas, replicas, similares, validacion, views
+from .management.commands import seed_catalogo
+from .middleware import COOKIE_PRIMARIA, fijar_primaria
+from .models import CambioVideojuego, ConstruccionSimilares, Videojuego, VideojuegoSimilar
 
 # Crea tus pruebas aquí.
+
+
+def crear_videojuegos(cantidad, **extra):
+    return [
+        Videojuego.objects.create(titulo=f'Juego {i}', precio=Decimal('10.00') + i, **extra)
+        for i in range(cantidad)
+    ]
+
+
+class ListadoPaginadoTests(TestCase):
+    def test_recorre_todas_las_paginas_sin_repetir(self):
+        creados = crear_videojuegos(7)
+        # Mismo created_at para forzar el desempate por id
+        Videojuego.objects.filter(pk__in=[v.pk for v in creados[:4]]).update(created_at=creados[0].created_at)
+
+        vistos = []
+        cursor = None
+        while True:
+            params = {'limit': 3}
+            if cursor:
+                params['cursor'] = cursor
+            data = self.client.get('/api/videojuegos/', params).json()
+            vistos.extend(v['id'] for v in data['resultados'])
+            cursor = data['siguiente']
+            if not cursor:
+                break
+
+        self.assertEqual(len(vistos), 7)
+        self.assertEqual(set(vistos), {v.pk for v in creados})
+
+    def test_cursor_invalido(self):
+        response = self.client.get('/api/videojuegos/', {'cursor': 'no-es-un-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_stream_ndjson(self):
+        crear_videojuegos(3)
+        response = self.client.get('/api/videojuegos/', {'stream': 'ndjson'})
+        lineas = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lineas), 3)
+        self.assertIn('titulo', json.loads(lineas[0]))
+
+    def test_stream_json(self):
+        crear_videojuegos(3)
+        response = self.client.get('/api/videojuegos/', {'stream': 'json'})
+        self.assertEqual(len(json.loads(b''.join(response.streaming_content))), 3)
+
+
+class FiltrosListadoTests(TestCase):
+    def setUp(self):
+        Videojuego.objects.create(titulo='A', precio=Decimal('20.00'), stock=0, plataforma='PS5', genero='RPG')
+        Videojuego.objects.create(titulo='B', precio=Decimal('40.00'), stock=3, plataforma='PS5', genero='ACCION',
+                                  fecha_lanzamiento='2020-01-01')
+        Videojuego.objects.create(titulo='C', precio=Decimal('60.00'), stock=5, plataforma='PC', genero='RPG',
+                                  fecha_lanzamiento='2022-06-01')
+
+    def titulos(self, **params):
+        response = self.client.get('/api/videojuegos/', params)
+        self.assertEqual(response.status_code, 200)
+        return [v['titulo'] for v in response.json()['resultados']]
+
+    def test_filtros_combinados(self):
+        self.assertEqual(self.titulos(plataforma='PS5', en_stock='true'), ['B'])
+        self.assertEqual(self.titulos(genero='RPG', precio_max='30', ordering='titulo'), ['A'])
+        self.assertEqual(self.titulos(fecha_desde='2021-01-01'), ['C'])
+
+    def test_orden_con_nulos_pagina_completo(self):
+        primera = self.client.get('/api/videojuegos/', {'ordering': '-fecha_lanzamiento', 'limit': 2}).json()
+        self.assertEqual([v['titulo'] for v in primera['resultados']], ['C', 'B'])
+        segunda = self.client.get('/api/videojuegos/', {
+            'ordering': '-fecha_lanzamiento', 'limit': 2, 'cursor': primera['siguiente'],
+        }).json()
+        self.assertEqual([v['titulo'] for v in segunda['resultados']], ['A'])
+        self.assertIsNone(segunda['siguiente'])
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.client.get('/api/videojuegos/', {'ordering': 'stock'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/videojuegos/', {'plataforma': 'ATARI'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/videojuegos/', {'precio_min': 'abc'}).status_code, 400)
+
+
+class BusquedaTests(TestCase):
+    def setUp(self):
+        Videojuego.objects.create(titulo='The Legend of Zelda', precio=Decimal('59.99'), desarrollador='Nintendo',
+                                  descripcion='Aventura en Hyrule')
+        Videojuego.objects.create(titulo='Elden Ring', precio=Decimal('69.99'), desarrollador='FromSoftware',
+                                  descripcion='Acción y exploración')
+
+    def titulos(self, q):
+        response = self.client.get('/api/videojuegos/buscar/', {'q': q})
+        self.assertEqual(response.status_code, 200)
+        return [v['titulo'] for v in response.json()['resultados']]
+
+    def test_busca_por_palabra_y_prefijo(self):
+        self.assertEqual(self.titulos('nintendo'), ['The Legend of Zelda'])
+        self.assertEqual(self.titulos('eld'), ['Elden Ring'])
+        self.assertEqual(self.titulos('accion'), ['Elden Ring'])
+
+    def test_tolera_errores_de_tipeo(self):
+        self.assertEqual(self.titulos('zelad legend')[:1], ['The Legend of Zelda'])
+
+    def test_indice_sigue_las_actualizaciones(self):
+        juego = Videojuego.objects.get(titulo='Elden Ring')
+        juego.titulo = 'Sekiro'
+        juego.save()
+        self.assertEqual(self.titulos('sekiro'), ['Sekiro'])
+        juego.delete()
+        self.assertEqual(self.titulos('sekiro'), [])
+
+    def test_requiere_q(self):
+        self.assertEqual(self.client.get('/api/videojuegos/buscar/').status_code, 400)
+
+
+class CacheCatalogoTests(TestCase):
+    def setUp(self):
+        caches[cache.ALIAS].clear()
+        cache.reiniciar_estadisticas()
+        self.juego = crear_videojuegos(1)[0]
+
+    def test_listado_se_sirve_desde_cache_hasta_que_cambia_el_catalogo(self):
+        self.client.get('/api/videojuegos/')
+        with self.assertNumQueries(0):
+            self.client.get('/api/videojuegos/')
+        # Página y metadatos condicionales: un fallo y un acierto cada uno
+        self.assertEqual(cache.estadisticas(), {'hits': 2, 'misses': 2})
+
+        Videojuego.objects.create(titulo='Nuevo', precio=Decimal('1.00'))
+        data = self.client.get('/api/videojuegos/').json()
+        self.assertEqual(len(data['resultados']), 2)
+
+    def test_detalle_se_invalida_al_actualizar_y_eliminar(self):
+        url = f'/api/videojuegos/{self.juego.pk}/'
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+        self.client.put(f'{url}actualizar/', json.dumps({'stock': 9}), content_type='application/json')
+        self.assertEqual(self.client.get(url).json()['stock'], 9)
+
+        self.client.delete(f'{url}eliminar/')
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class ObtenerLoteTests(TestCase):
+    url = '/api/videojuegos/lote/'
+
+    def setUp(self):
+        caches[cache.ALIAS].clear()
+        self.juegos = crear_videojuegos(3)
+
+    def test_respeta_el_orden_e_informa_los_faltantes(self):
+        a, b, c = (juego.pk for juego in self.juegos)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'ids': f'{c},999,{a},{c}', 'fields': 'titulo'})
+        self.assertEqual(response.json(), {
+            'resultados': [{'titulo': self.juegos[2].titulo}, {'titulo': self.juegos[0].titulo}],
+            'faltantes': [999],
+        })
+
+        # Los detalles leídos quedan en cache: solo se consulta lo que falta
+        with self.assertNumQueries(1):
+            response = self.client.post(self.url, json.dumps({'ids': [a, b]}), content_type='application/json')
+        self.assertEqual([juego['id'] for juego in response.json()['resultados']], [a, b])
+        with self.assertNumQueries(0):
+            self.client.get(f'/api/videojuegos/{b}/')
+
+    def test_valida_los_ids(self):
+        for params in ({}, {'ids': 'uno,2'}, {'ids': ','.join(map(str, range(501)))}):
+            self.assertEqual(self.client.get(self.url, params).status_code, 400)
+        response = self.client.post(self.url, json.dumps({'ids': [True]}), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class PaginaInicioTests(TestCase):
+    def setUp(self):
+        caches[cache.ALIAS].clear()
+
+    def catalogo_inicial(self, response):
+        inicio = response.content.index(b'id="catalogo-inicial"')
+        inicio = response.content.index(b'>', inicio) + 1
+        return json.loads(response.content[inicio:response.content.index(b'</script>', inicio)])
+
+    @override_settings(API_INICIO_FILAS=2)
+    def test_renderiza_la_primera_pagina_con_su_hidratacion(self):
+        crear_videojuegos(3)
+        Videojuego.objects.create(titulo='<b>Sin escapar</b>', precio=Decimal('5.00'), plataforma='SWITCH')
+        response = self.client.get('/')
+        self.assertContains(response, '&lt;b&gt;Sin escapar&lt;/b&gt;')
+        self.assertContains(response, 'Nintendo Switch')
+        self.assertContains(response, 'onclick="editarVideojuego(', count=2)
+
+        # Mismo JSON que la API para esa página, con el cursor para seguir
+        pagina = self.catalogo_inicial(response)
+        self.assertEqual(pagina, self.client.get('/api/videojuegos/', {'limit': 2}).json())
+        self.assertEqual(pagina['resultados'][0]['titulo'], '<b>Sin escapar</b>')
+        self.assertIsNotNone(pagina['siguiente'])
+
+    def test_el_fragmento_se_cachea_por_version_del_catalogo(self):
+        response = self.client.get('/')
+        self.assertContains(response, 'No hay videojuegos registrados')
+        with self.assertNumQueries(0):
+            self.client.get('/')
+
+        Videojuego.objects.create(titulo='Recién llegado', precio=Decimal('1.00'))
+        response = self.client.get('/')
+        self.assertContains(response, 'Recién llegado')
+        self.assertEqual(len(self.catalogo_inicial(response)['resultados']), 1)
+
+
+class PeticionesCondicionalesTests(TestCase):
+    def setUp(self):
+        caches[cache.ALIAS].clear()
+        self.juego = crear_videojuegos(1)[0]
+        self.url = f'/api/videojuegos/{self.juego.pk}/'
+
+    def test_listado_responde_304_sin_consultas(self):
+        etag = self.client.get('/api/videojuegos/')['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/videojuegos/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.juego.delete()
+        response = self.client.get('/api/videojuegos/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_detalle_responde_304_y_cambia_con_la_fila(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.juego.stock = 4
+        self.juego.save()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_if_match_evita_pisar_cambios(self):
+        etag = self.client.get(self.url)['ETag']
+        actualizar = f'{self.url}actualizar/'
+        response = self.client.put(actualizar, json.dumps({'stock': 1}), content_type='application/json',
+                                   HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        # Segunda edición con el ETag viejo: la fila ya cambió
+        response = self.client.put(actualizar, json.dumps({'stock': 2}), content_type='application/json',
+                                   HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 412)
+        self.juego.refresh_from_db()
+        self.assertEqual(self.juego.stock, 1)
+
+
+class SerializacionTests(TestCase):
+    def setUp(self):
+        caches[cache.ALIAS].clear()
+        self.juego = crear_videojuegos(1)[0]
+
+    def test_fields_recorta_listado_y_detalle(self):
+        data = self.client.get('/api/videojuegos/', {'fields': 'titulo,precio'}).json()
+        self.assertEqual(data['resultados'], [{'titulo': 'Juego 0', 'precio': '10.00'}])
+
+        data = self.client.get(f'/api/videojuegos/{self.juego.pk}/', {'fields': 'stock'}).json()
+        self.assertEqual(data, {'stock': 0})
+
+    def test_fields_invalido(self):
+        self.assertEqual(self.client.get('/api/videojuegos/', {'fields': 'clave'}).status_code, 400)
+
+    def test_payload_completo(self):
+        data = self.client.get(f'/api/videojuegos/{self.juego.pk}/').json()
+        self.assertEqual(data['precio'], '10.00')
+        self.assertIsNone(data['fecha_lanzamiento'])
+        self.assertEqual(data['created_at'], self.juego.created_at.isoformat())
+
+
+class LoteTests(TestCase):
+    url = '/api/videojuegos/bulk/'
+
+    def enviar(self, metodo, data):
+        return getattr(self.client, metodo)(self.url, json.dumps(data), content_type='application/json')
+
+    def test_crea_y_hace_upsert_por_codigo_externo(self):
+        response = self.enviar('post', [
+            {'titulo': 'Uno', 'precio': 10, 'codigo_externo': 'SKU-1'},
+            {'titulo': 'Dos', 'precio': '20.50'},
+        ])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['creados'], 2)
+
+        response = self.enviar('post', [{'titulo': 'Uno v2', 'precio': 12, 'stock': 3, 'codigo_externo': 'SKU-1'}])
+        self.assertEqual(response.json()['actualizados'], 1)
+        self.assertEqual(Videojuego.objects.count(), 2)
+        self.assertEqual(Videojuego.objects.get(codigo_externo='SKU-1').titulo, 'Uno v2')
+        # El upsert mantiene al día el índice de búsqueda
+        self.assertEqual(len(self.client.get('/api/videojuegos/buscar/', {'q': 'v2'}).json()['resultados']), 1)
+
+    def test_upsert_parcial_conserva_los_campos_que_no_llegan(self):
+        Videojuego.objects.create(titulo='Uno', precio=Decimal('10.00'), stock=50, plataforma='PS5', genero='RPG',
+                                  desarrollador='FromSoftware', codigo_externo='SKU-1')
+        response = self.enviar('post', [
+            {'titulo': 'A', 'precio': 12, 'codigo_externo': 'SKU-1'},
+            {'titulo': 'Nuevo', 'precio': 5, 'codigo_externo': 'SKU-2'},
+        ])
+        self.assertEqual((response.json()['creados'], response.json()['actualizados']), (1, 1))
+        juego = Videojuego.objects.get(codigo_externo='SKU-1')
+        self.assertEqual(
+            (juego.titulo, juego.precio, juego.stock, juego.plataforma, juego.genero, juego.desarrollador),
+            ('A', Decimal('12.00'), 50, 'PS5', 'RPG', 'FromSoftware'),
+        )
+        # Las filas nuevas sí toman los valores por defecto
+        nuevo = Videojuego.objects.get(codigo_externo='SKU-2')
+        self.assertEqual((nuevo.stock, nuevo.plataforma, nuevo.genero), (0, 'PC', 'ACCION'))
+
+    def test_valida_todo_el_lote_antes_de_escribir(self):
+        response = self.enviar('post', [
+            {'titulo': 'Bien', 'precio': 1},
+            {'titulo': 'Mal', 'precio': -1},
+            {'precio': 1, 'plataforma': 'ATARI'},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([e['indice'] for e in response.json()['errores']], [1, 2])
+        self.assertFalse(Videojuego.objects.exists())
+
+    def test_actualiza_y_elimina_en_lote(self):
+        a, b = crear_videojuegos(2)
+        response = self.enviar('put', [{'id': a.pk, 'stock': 7}, {'id': b.pk, 'precio': '1.50'}])
+        self.assertEqual(response.status_code, 200)
+        a.refresh_from_db()
+        b.refresh_from_db()
+        self.assertEqual((a.stock, b.precio), (7, Decimal('1.50')))
+        self.assertGreater(a.updated_at, a.created_at)
+
+        response = self.enviar('put', [{'id': 999999, 'stock': 1}])
+        self.assertEqual(response.status_code, 400)
+
+        response = self.enviar('delete', [a.pk, b.pk, 999999])
+        self.assertEqual(response.json()['eliminados'], 2)
+        self.assertFalse(Videojuego.objects.exists())
+
+
+    def test_codigo_externo_ocupado_es_error_del_item(self):
+        a, b, c = crear_videojuegos(3)
+        Videojuego.objects.filter(id=a.id).update(codigo_externo='SKU-A')
+        Videojuego.objects.filter(id=b.id).update(codigo_externo='SKU-B')
+
+        response = self.enviar('put', [{'id': c.id, 'stock': 1}, {'id': b.id, 'codigo_externo': 'SKU-A'}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errores'], [{
+            'indice': 1,
+            'errores': [f'codigo_externo ya usado por el videojuego {a.id}: SKU-A'],
+            'campos': {'codigo_externo': f'codigo_externo ya usado por el videojuego {a.id}: SKU-A'},
+        }])
+        self.assertEqual(Videojuego.objects.get(id=c.id).stock, c.stock)
+
+        # Si el dueño libera el código en el mismo lote, el cambio pasa
+        response = self.enviar('put', [{'id': a.id, 'codigo_externo': None}, {'id': b.id, 'codigo_externo': 'SKU-A'}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Videojuego.objects.get(codigo_externo='SKU-A').id, b.id)
+
+        # Una carrera con otra escritura llega como IntegrityError: 409, no 500
+        with mock.patch.object(lotes, 'actualizar', side_effect=IntegrityError):
+            self.assertEqual(self.enviar('put', [{'id': c.id, 'codigo_externo': 'SKU-C'}]).status_code, 409)
+
+    def test_eliminar_no_acepta_booleanos_como_ids(self):
+        crear_videojuegos(1)
+        self.assertEqual(self.enviar('delete', [True]).status_code, 400)
+        self.assertEqual(Videojuego.objects.count(), 1)
+
+
+class ValidacionTests(TestCase):
+    def test_convierte_en_una_pasada_con_precio_decimal(self):
+        valores, errores = validacion.validar({
+            'titulo': 'Uno', 'precio': 19.99, 'stock': '3', 'fecha_lanzamiento': '2024-02-29',
+            'desarrollador': None, 'plataforma': '', 'desconocido': 1,
+        })
+        self.assertEqual(errores, {})
+        self.assertEqual(valores, {
+            'titulo': 'Uno', 'precio': Decimal('19.99'), 'stock': 3,
+            'fecha_lanzamiento': date(2024, 2, 29), 'desarrollador': '',
+        })
+        self.assertEqual(validacion.validar({'precio': '0.105'}, es_actualizacion=True)[0], {'precio': Decimal('0.11')})
+
+    def test_errores_por_campo(self):
+        response = self.client.post('/api/videojuegos/crear/', json.dumps({
+            'precio': 'gratis', 'stock': True, 'genero': ['RPG'], 'fecha_lanzamiento': '29/02/2024',
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()['campos']), {'titulo', 'precio', 'stock', 'genero', 'fecha_lanzamiento'})
+        self.assertIn('El precio debe ser un número válido', response.json()['error'])
+
+    def test_alta_y_modificacion_guardan_el_precio_exacto(self):
+        response = self.client.post('/api/videojuegos/crear/', json.dumps({'titulo': 'Uno', 'precio': 0.1}),
+                                    content_type='application/json')
+        self.assertEqual(response.json()['precio'], '0.10')
+        url = f'/api/videojuegos/{response.json()["id"]}/actualizar/'
+        response = self.client.put(url, json.dumps({'precio': '59.995'}), content_type='application/json')
+        self.assertEqual(response.json()['precio'], '60.00')
+        self.assertEqual(Videojuego.objects.get().precio, Decimal('60.00'))
+
+
+class ImportExportTests(TestCase):
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+
+    def ruta(self, nombre):
+        return os.path.join(self.directorio.name, nombre)
+
+    def test_exporta_e_importa_csv_y_ndjson(self):
+        Videojuego.objects.create(titulo='Con, coma', precio=Decimal('5.00'), descripcion='Línea 1\nLínea 2',
+                                  codigo_externo='SKU-1', fecha_lanzamiento='2021-02-03')
+        Videojuego.objects.create(titulo='Sin código', precio=Decimal('7.25'))
+
+        for extension in ('csv', 'ndjson'):
+            archivo = self.ruta(f'catalogo.{extension}')
+            call_command('export_catalogo', salida=archivo, stderr=StringIO())
+            call_command('import_catalogo', archivo, stdout=StringIO(), stderr=StringIO())
+
+        # SKU-1 se actualiza en cada importación; el que no tiene código se
+        # duplica: 1 -> 2 tras el CSV, y el NDJSON ya exporta esas 2 filas -> 4
+        self.assertEqual(Videojuego.objects.filter(codigo_externo='SKU-1').count(), 1)
+        self.assertEqual(Videojuego.objects.filter(titulo='Sin código').count(), 4)
+        juego = Videojuego.objects.get(codigo_externo='SKU-1')
+        self.assertEqual((juego.descripcion, str(juego.fecha_lanzamiento)), ('Línea 1\nLínea 2', '2021-02-03'))
+
+    def test_codigo_repetido_en_el_lote_se_combina_y_se_cuenta(self):
+        archivo = self.ruta('entrada.ndjson')
+        with open(archivo, 'w', encoding='utf-8') as f:
+            f.write('{"titulo": "A", "precio": 1, "stock": 7, "codigo_externo": "A"}\n')
+            f.write('{"titulo": "B", "precio": 2}\n')
+            f.write('{"titulo": "A2", "precio": 3, "codigo_externo": "A"}\n')
+
+        salida = StringIO()
+        call_command('import_catalogo', archivo, stdout=salida, stderr=StringIO())
+
+        self.assertIn('2 creados, 0 actualizados, 0 rechazados, 1 combinados', salida.getvalue())
+        juego = Videojuego.objects.get(codigo_externo='A')
+        self.assertEqual((juego.titulo, juego.precio, juego.stock), ('A2', Decimal('3.00'), 7))
+
+    def test_rechaza_filas_invalidas_y_reanuda(self):
+        archivo = self.ruta('entrada.ndjson')
+        with open(archivo, 'w', encoding='utf-8') as f:
+            f.write('{"titulo": "A", "precio": 1, "codigo_externo": "A"}\n')
+            f.write('{"titulo": "B", "precio": -3}\n')
+            f.write('no es json\n')
+            f.write('{"titulo": "C", "precio": 2, "codigo_externo": "C"}\n')
+
+        with open(f'{archivo}.checkpoint', 'w') as f:
+            json.dump({'ultima_fila': 1}, f)
+        call_command('import_catalogo', archivo, reanudar=True, batch_size=2, stdout=StringIO(), stderr=StringIO())
+
+        self.assertEqual(list(Videojuego.objects.values_list('titulo', flat=True).order_by('titulo')), ['C'])
+        with open(f'{archivo}.rechazados.ndjson', encoding='utf-8') as f:
+            self.assertEqual([json.loads(linea)['fila'] for linea in f], [2, 3])
+        with open(f'{archivo}.checkpoint') as f:
+            self.assertEqual(json.load(f)['ultima_fila'], 4)
+
+
+class CambiosTests(TestCase):
+    url = '/api/videojuegos/cambios/'
+
+    def test_devuelve_solo_lo_cambiado_desde_el_token(self):
+        viejo, borrado, intacto = crear_videojuegos(3)
+        token = self.client.get(self.url).json()['siguiente']
+
+        nuevo = Videojuego.objects.create(titulo='Nuevo', precio=Decimal('1.00'))
+        self.client.put(f'/api/videojuegos/{viejo.id}/actualizar/', json.dumps({'stock': 7}),
+                        content_type='application/json')
+        self.client.post(f'/api/videojuegos/{viejo.id}/stock/', {'delta': 1}, content_type='application/json')
+        self.client.delete(f'/api/videojuegos/{borrado.id}/eliminar/')
+
+        with self.assertNumQueries(3):
+            data = self.client.get(self.url, {'since': token}).json()
+        self.assertEqual([v['id'] for v in data['cambios']], [viejo.id, nuevo.id])
+        self.assertEqual(data['cambios'][0]['stock'], 8)
+        self.assertEqual(data['eliminados'], [borrado.id])
+        self.assertFalse(data['hay_mas'])
+
+        data = self.client.get(self.url, {'since': data['siguiente']}).json()
+        self.assertEqual((data['cambios'], data['eliminados']), ([], []))
+
+    def test_pagina_y_registra_escrituras_masivas(self):
+        token = self.client.get(self.url).json()['siguiente']
+        ids = self.client.post('/api/videojuegos/bulk/', [
+            {'titulo': f'Lote {i}', 'precio': '5.00', 'plataforma': 'PC', 'genero': 'RPG'} for i in range(3)
+        ], content_type='application/json').json()['ids']
+
+        vistos = []
+        while True:
+            data = self.client.get(self.url, {'since': token, 'limit': 2, 'fields': 'id,titulo'}).json()
+            vistos += [v['id'] for v in data['cambios']]
+            token = data['siguiente']
+            if not data['hay_mas']:
+                break
+        self.assertEqual(vistos, ids)
+        self.assertEqual(self.client.get(self.url, {'since': 'abc'}).status_code, 400)
+
+    def test_compactacion_descarta_lo_superado_y_vence_tokens_viejos(self):
+        token_inicial = cambios.token_actual()
+        juego, borrado = crear_videojuegos(2)
+        juego.stock = 3
+        juego.save()
+        borrado.delete()
+        token_intermedio = cambios.token_actual()
+        CambioVideojuego.objects.update(creado=timezone.now() - timedelta(days=40))
+        reciente = Videojuego.objects.create(titulo='Reciente', precio=Decimal('1.00'))
+
+        compactacion = cambios.compactar(30)
+        # Quedan el último cambio de `juego` y el alta reciente
+        self.assertEqual(sorted(CambioVideojuego.objects.values_list('videojuego_id', flat=True)),
+                         [juego.id, reciente.id])
+        self.assertEqual(compactacion.eliminados, 3)
+
+        self.assertEqual(self.client.get(self.url, {'since': token_inicial}).status_code, 410)
+        data = self.client.get(self.url, {'since': token_intermedio}).json()
+        self.assertEqual([v['id'] for v in data['cambios']], [reciente.id])
+
+
+class EventosTests(TestCase):
+    url = '/api/eventos/'
+
+    def confirmar(self, escritura):
+        """Ejecuta una escritura y los on_commit que dispara, como si se confirmara"""
+        with self.captureOnCommitCallbacks(execute=True):
+            return escritura()
+
+    async def leer(self, flujo):
+        return await asyncio.wait_for(anext(flujo), 1)
+
+    async def test_transmite_altas_stock_y_bajas(self):
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        flujo = response.streaming_content
+        try:
+            self.assertEqual(await self.leer(flujo), b'retry: 5000\n\n')
+            self.assertEqual(eventos.hub.clientes(), 1)
+
+            juego = await sync_to_async(self.confirmar)(
+                lambda: Videojuego.objects.create(titulo='Zelda', precio=Decimal('60.00'), stock=2))
+            token = await sync_to_async(cambios.token_actual)()
+            evento = (await self.leer(flujo)).decode()
+            self.assertTrue(evento.startswith(f'id: {token}\nevent: videojuego\n'))
+            self.assertEqual(json.loads(evento.split('data: ')[1])['titulo'], 'Zelda')
+
+            await sync_to_async(self.confirmar)(lambda: inventario.ajustar_stock(juego.id, -1))
+            self.assertIn(b'event: stock\ndata: {"id":%d,"stock":1}' % juego.id, await self.leer(flujo))
+
+            await sync_to_async(self.confirmar)(juego.delete)
+            self.assertIn(b'event: baja\n', await self.leer(flujo))
+        finally:
+            # Como hace el handler ASGI al terminar la respuesta
+            response.close()
+        self.assertEqual(eventos.hub.clientes(), 0)
+
+    async def test_reconexion_atrasada_pide_sincronizar(self):
+        token = await sync_to_async(cambios.token_actual)()
+        await sync_to_async(crear_videojuegos)(1)
+        response = await self.async_client.get(self.url, headers={'Last-Event-ID': str(token)})
+        flujo = response.streaming_content
+        try:
+            await self.leer(flujo)
+            self.assertEqual(await self.leer(flujo), b'event: sincronizar\ndata: {"since":"%d"}\n\n' % token)
+        finally:
+            response.close()
+
+    async def test_cliente_lento_recibe_un_solo_sincronizar(self):
+        suscripcion = eventos.Suscripcion(asyncio.get_running_loop(), 2)
+        suscripcion.ultimo_token = 7
+        suscripcion.poner([(8, b'a'), (9, b'b'), (10, b'c')])
+        suscripcion.poner([(11, b'd')])
+        # La cola no crece: lo pendiente se reemplaza por el pedido de sincronizar
+        self.assertEqual(await suscripcion.tomar(0), [(None, b'event: sincronizar\ndata: {"since":"7"}\n\n')])
+        self.assertEqual(await suscripcion.tomar(0), [])
+
+    def test_sin_clientes_no_arma_eventos(self):
+        with mock.patch.object(eventos, '_eventos') as armar, self.captureOnCommitCallbacks(execute=True):
+            crear_videojuegos(1)
+        armar.assert_not_called()
+
+    def test_requiere_asgi(self):
+        self.assertEqual(self.client.get(self.url).status_code, 501)
+        self.assertEqual(self.client.get(self.url, {'since': 'x'}).status_code, 501)
+
+
+class AdminCatalogoTests(TestCase):
+    url = '/admin/api/videojuego/'
+
+    def setUp(self):
+        from django.contrib.auth.models import User
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'clave'))
+
+    def test_pagina_por_cursor_sin_offset_y_cuenta_una_vez_por_version(self):
+        juegos = crear_videojuegos(5)
+        vistos = []
+        url = self.url
+        with mock.patch.object(admin_catalogo.VideojuegoAdmin, 'list_per_page', 2):
+            while url:
+                with CaptureQueriesContext(connection) as consultas:
+                    cl = self.client.get(url).context['cl']
+                self.assertFalse(any('OFFSET' in c['sql'] for c in consultas.captured_queries))
+                self.assertEqual(cl.result_count, 5)
+                vistos += [videojuego.id for videojuego in cl.result_list]
+                url = cl.url_siguiente and self.url + cl.url_siguiente
+            # El conteo quedó en cache para esta versión del catálogo
+            self.assertFalse(any('COUNT(' in c['sql'] for c in consultas.captured_queries))
+        self.assertEqual(vistos, [juego.id for juego in reversed(juegos)])
+
+    def test_busqueda_usa_el_indice_de_texto(self):
+        Videojuego.objects.create(titulo='The Legend of Zelda', precio=Decimal('60.00'))
+        crear_videojuegos(2)
+        with mock.patch.object(admin_catalogo.busqueda, 'buscar_ids', wraps=admin_catalogo.busqueda.buscar_ids) as buscar:
+            cl = self.client.get(self.url, {'q': 'zeld'}).context['cl']
+        buscar.assert_called_once()
+        self.assertEqual([videojuego.titulo for videojuego in cl.result_list], ['The Legend of Zelda'])
+
+    def test_acciones_masivas_son_un_solo_update(self):
+        a, b, c = crear_videojuegos(3, stock=1)
+        token = cambios.token_actual()
+        accion = {'_selected_action': [a.id, b.id], 'index': 0}
+
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.post(self.url, {**accion, 'action': 'ajustar_precio', 'valor': '-10'})
+        self.assertEqual(sum(c['sql'].startswith('UPDATE "api_videojuego"') for c in consultas.captured_queries), 1)
+        self.client.post(self.url, {**accion, 'action': 'reponer_stock', 'valor': '5'})
+        self.client.post(self.url, {**accion, 'action': 'reponer_stock', 'valor': '-1'})
+
+        precios = dict(Videojuego.objects.values_list('id', 'precio'))
+        self.assertEqual([precios[a.id], precios[b.id], precios[c.id]], [Decimal('9.00'), Decimal('9.90'), Decimal('12.00')])
+        self.assertEqual(list(Videojuego.objects.order_by('id').values_list('stock', flat=True)), [6, 6, 1])
+        # Estadísticas y feed de cambios al día, como con cualquier escritura masiva
+        self.assertEqual(estadisticas.recalcular(), 0)
+        self.assertEqual(cambios.leer(token, 100)[0], [a.id, b.id])
+
+
+    def test_acciones_masivas_omiten_las_filas_que_saldrian_de_rango(self):
+        barato = Videojuego.objects.create(titulo='Barato', precio=Decimal('0.01'), stock=validacion.STOCK_MAXIMO - 1)
+        caro = Videojuego.objects.create(titulo='Caro', precio=Decimal('60000000.00'), stock=1)
+        gratis = Videojuego.objects.create(titulo='Gratis', precio=Decimal('0.00'), stock=1)
+        accion = {'_selected_action': [barato.id, caro.id, gratis.id], 'index': 0}
+
+        # Ni 0.01 -> 0.00 ni 60 millones -> 120 millones (max_digits=10)
+        respuesta = self.client.post(self.url, {**accion, 'action': 'ajustar_precio', 'valor': '100'}, follow=True)
+        mensajes = respuesta.context['messages']
+        self.assertIn('1 videojuegos sin cambios', ' '.join(str(mensaje) for mensaje in mensajes))
+        self.client.post(self.url, {**accion, 'action': 'ajustar_precio', 'valor': '-90'})
+        precios = dict(Videojuego.objects.values_list('titulo', 'precio'))
+        self.assertEqual(precios, {'Barato': Decimal('0.02'), 'Caro': Decimal('6000000.00'), 'Gratis': Decimal('0.00')})
+
+        self.client.post(self.url, {**accion, 'action': 'reponer_stock', 'valor': '2'})
+        self.client.post(self.url, {**accion, 'action': 'reponer_stock', 'valor': str(validacion.STOCK_MAXIMO + 1)})
+        self.assertEqual(dict(Videojuego.objects.values_list('titulo', 'stock')), {
+            'Barato': validacion.STOCK_MAXIMO - 1, 'Caro': 3, 'Gratis': 3,
+        })
+
+
+    def test_acciones_masivas_al_borde_del_rango_no_avisan_omitidos(self):
+        juego = Videojuego.objects.create(titulo='Caro', precio=Decimal('60000000.00'), stock=0)
+        accion = {'_selected_action': [juego.id], 'index': 0}
+
+        # Después del UPDATE los valores nuevos caen en el filtro de omitidos:
+        # el aviso tiene que salir de lo que había antes
+        acciones = (
+            {'action': 'ajustar_precio', 'valor': '50'},
+            {'action': 'reponer_stock', 'valor': str(validacion.STOCK_MAXIMO)},
+        )
+        for datos in acciones:
+            respuesta = self.client.post(self.url, {**accion, **datos}, follow=True)
+            mensajes = [str(mensaje) for mensaje in respuesta.context['messages']]
+            self.assertFalse([mensaje for mensaje in mensajes if 'sin cambios' in mensaje], mensajes)
+        juego.refresh_from_db()
+        self.assertEqual((juego.precio, juego.stock), (Decimal('90000000.00'), validacion.STOCK_MAXIMO))
+
+
+class FacetasTests(TestCase):
+    url = '/api/videojuegos/facetas/'
+    combinaciones = (
+        {},
+        {'plataforma': 'PS5'},
+        {'plataforma': 'PS5,SWITCH', 'genero': 'RPG', 'en_stock': 'true'},
+        {'precio_min': '15', 'precio_max': '30.5'},
+        {'genero': 'RPG,PUZZLE', 'precio_max': '20'},
+    )
+
+    def setUp(self):
+        caches[cache.ALIAS].clear()
+        facetas.reiniciar()
+        self.addCleanup(facetas.reiniciar)
+        plataformas, generos = ('PS5', 'SWITCH', 'PC'), ('RPG', 'PUZZLE')
+        Videojuego.objects.bulk_create([
+            Videojuego(titulo=f'Juego {i}', precio=Decimal(10 + i % 25) + Decimal('0.50'), stock=i % 4,
+                       plataforma=plataformas[i % 3], genero=generos[i % 2])
+            for i in range(60)
+        ])
+
+    def assertCoincideConLaBase(self):
+        for params in self.combinaciones:
+            data = self.client.get(self.url, params).json()
+            esperado = filtros.filtrar_videojuegos(Videojuego.objects.all(), params)
+            self.assertEqual(data['total'], esperado.count(), params)
+            # Cada faceta se cuenta sin su propio filtro
+            sin_plataforma = filtros.filtrar_videojuegos(Videojuego.objects.all(), {**params, 'plataforma': ''})
+            for codigo, cantidad in data['plataforma'].items():
+                self.assertEqual(cantidad, sin_plataforma.filter(plataforma=codigo).count(), (params, codigo))
+            sin_genero = filtros.filtrar_videojuegos(Videojuego.objects.all(), {**params, 'genero': ''})
+            for codigo, cantidad in data['genero'].items():
+                self.assertEqual(cantidad, sin_genero.filter(genero=codigo).count(), (params, codigo))
+            sin_stock = filtros.filtrar_videojuegos(Videojuego.objects.all(), {**params, 'en_stock': ''})
+            self.assertEqual(data['en_stock'], sin_stock.filter(stock__gt=0).count(), params)
+
+    def test_conteos_coinciden_con_la_base(self):
+        # Token del feed y una lectura de las columnas indexadas
+        with self.assertNumQueries(3):
+            self.client.get(self.url)
+        # Después de construido, contar no consulta la base
+        with self.assertNumQueries(0):
+            self.client.get(self.url, {'genero': 'RPG', 'en_stock': '1'})
+        self.assertCoincideConLaBase()
+        self.assertEqual(self.client.get(self.url, {'desarrollador': 'Nintendo'}).status_code, 400)
+
+    def test_se_actualiza_por_senales_sin_reconstruir(self):
+        self.client.get(self.url)
+        juegos = list(Videojuego.objects.order_by('id')[:4])
+        with mock.patch.object(facetas.Indice, 'construir') as construir, self.captureOnCommitCallbacks(execute=True):
+            juegos[0].precio = Decimal('99.00')
+            juegos[0].save()
+            juegos[1].plataforma, juegos[1].stock = 'PC', 0
+            juegos[1].save()
+            juegos[2].delete()
+            Videojuego.objects.create(titulo='Nuevo', precio=Decimal('16.00'), plataforma='PS5', genero='RPG', stock=3)
+            self.client.post('/api/videojuegos/stock/', [{'id': juegos[3].pk, 'delta': 5}], content_type='application/json')
+        self.assertCoincideConLaBase()
+        construir.assert_not_called()
+
+    def test_se_pone_al_dia_con_el_feed(self):
+        self.client.get(self.url)
+        # Escrituras de otro proceso: este no recibe las señales
+        with mock.patch.object(facetas, 'notificar'):
+            Videojuego.objects.filter(genero='PUZZLE').first().delete()
+            lotes.actualizar_en_bloque(Videojuego.objects.filter(plataforma='PC'), stock=0, precio=Decimal('12.00'))
+        with mock.patch.object(facetas.Indice, 'construir') as construir:
+            self.assertCoincideConLaBase()
+        construir.assert_not_called()
+
+
+@skipUnless(similares.np is not None, 'numpy no está instalado')
+@override_settings(API_SIMILARES_CANTIDAD=3)
+class SimilaresTests(TestCase):
+    def setUp(self):
+        sagas = (
+            ('Dark Souls', 'FromSoftware', 'RPG', 'Mundo oscuro de combate exigente y jefes gigantes'),
+            ('Final Fantasy', 'Square Enix', 'RPG', 'Aventura de fantasía con combate por turnos e invocaciones'),
+            ('Tetris', 'Pajitnov', 'PUZZLE', 'Piezas que caen y líneas que desaparecen'),
+        )
+        for titulo, desarrollador, genero, descripcion in sagas:
+            for i, plataforma in enumerate(('PS5', 'PS4', 'PC')):
+                Videojuego.objects.create(
+                    titulo=f'{titulo} {i + 1}', desarrollador=desarrollador, genero=genero, plataforma=plataforma,
+                    descripcion=descripcion, precio=Decimal(20 + 10 * i), stock=1,
+                )
+        call_command('build_similares', stdout=StringIO())
+
+    def similares(self, juego, **params):
+        return self.client.get(f'/api/videojuegos/{juego.id}/similares/', params)
+
+    def listas(self):
+        listas = {}
+        for videojuego_id, puntaje in VideojuegoSimilar.objects.values_list('videojuego_id', 'puntaje'):
+            listas.setdefault(videojuego_id, []).append(round(puntaje, 4))
+        return listas
+
+    def test_vecinos_del_mismo_genero_y_saga(self):
+        juego = Videojuego.objects.get(titulo='Dark Souls 1')
+        with self.assertNumQueries(1):
+            resultados = self.similares(juego).json()['resultados']
+        self.assertEqual(len(resultados), 3)
+        self.assertEqual({r['titulo'] for r in resultados[:2]}, {'Dark Souls 2', 'Dark Souls 3'})
+        self.assertTrue(all(r['genero'] == 'RPG' for r in resultados))
+        self.assertEqual([r['puntaje'] for r in resultados], sorted((r['puntaje'] for r in resultados), reverse=True))
+
+        self.assertEqual(set(self.similares(juego, fields='titulo').json()['resultados'][0]), {'titulo', 'puntaje'})
+        self.assertEqual(self.similares(juego, fields='clave').status_code, 400)
+        self.assertEqual(self.client.get('/api/videojuegos/999999/similares/').status_code, 404)
+
+    def test_incremental_coincide_con_reconstruir(self):
+        tetris = Videojuego.objects.get(titulo='Tetris 1')
+        Videojuego.objects.create(
+            titulo='Dark Souls Remastered', desarrollador='FromSoftware', genero='RPG', plataforma='PS5',
+            descripcion='Mundo oscuro de combate exigente', precio=Decimal('20.00'),
+        )
+        Videojuego.objects.filter(titulo='Dark Souls 2').delete()
+        tetris.genero = 'RPG'
+        tetris.save()
+
+        with mock.patch.object(similares, 'construir') as construir:
+            call_command('build_similares', stdout=StringIO())
+        construir.assert_not_called()
+        titulos = [r['titulo'] for r in self.similares(Videojuego.objects.get(titulo='Dark Souls 1')).json()['resultados']]
+        self.assertEqual(titulos[0], 'Dark Souls Remastered')
+        self.assertNotIn('Dark Souls 2', titulos)
+        self.assertNotIn('Tetris 1', [r['titulo'] for r in self.similares(Videojuego.objects.get(titulo='Tetris 2')).json()['resultados']])
+
+        # Con el mismo IDF (el incremental no lo recalcula) da lo mismo que reconstruir
+        incremental = self.listas()
+        idf = ConstruccionSimilares.objects.get().idf
+        with mock.patch.object(similares, 'calcular_idf', return_value=idf):
+            call_command('build_similares', '--completo', stdout=StringIO())
+        self.assertEqual(incremental, self.listas())
+
+    @override_settings(API_SIMILARES_CANTIDAD=2)
+    def test_incremental_tolera_cambios_de_genero_entre_lecturas(self):
+        call_command('build_similares', '--completo', stdout=StringIO())
+        juego = Videojuego.objects.get(titulo='Dark Souls 1')
+        juego.precio = Decimal('99.00')
+        juego.save()
+        leer_bloques = similares._bloques
+
+        def bloques(queryset):
+            for genero, filas in leer_bloques(queryset):
+                # Otra escritura pasa a RPG un videojuego con lista completa
+                # después de leer el bloque y antes de leer los umbrales
+                Videojuego.objects.filter(titulo='Tetris 1').update(genero='RPG')
+                yield genero, filas
+
+        with mock.patch.object(similares, '_bloques', bloques):
+            call_command('build_similares', stdout=StringIO())
+        self.assertEqual(len(self.similares(juego).json()['resultados']), 2)
+
+
+class StockTests(TestCase):
+    def ajustar(self, url, data):
+        return self.client.post(url, json.dumps(data), content_type='application/json')
+
+    def test_ajuste_individual_no_deja_stock_negativo(self):
+        juego = Videojuego.objects.create(titulo='Zelda', precio=Decimal('60.00'), stock=2)
+        url = f'/api/videojuegos/{juego.id}/stock/'
+
+        self.assertEqual(self.ajustar(url, {'delta': -2}).json(), {'id': juego.id, 'stock': 0})
+        self.assertEqual(self.ajustar(url, {'delta': -1}).status_code, 409)
+        self.assertEqual(self.ajustar(url, {'delta': 5}).json()['stock'], 5)
+        self.assertEqual(self.ajustar(url, {'delta': 0}).status_code, 400)
+        self.assertEqual(self.ajustar('/api/videojuegos/999/stock/', {'delta': 1}).status_code, 404)
+
+    def test_lote_es_todo_o_nada(self):
+        a, b = crear_videojuegos(2, stock=3)
+
+        response = self.ajustar('/api/videojuegos/stock/', [{'id': b.id, 'delta': -4}, {'id': a.id, 'delta': -1}])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['ids'], [b.id])
+        self.assertEqual(list(Videojuego.objects.order_by('id').values_list('stock', flat=True)), [3, 3])
+
+        response = self.ajustar('/api/videojuegos/stock/', [
+            {'id': a.id, 'delta': -1}, {'id': b.id, 'delta': -3}, {'id': a.id, 'delta': -1},
+        ])
+        self.assertEqual(response.json(), [{'id': a.id, 'stock': 1}, {'id': b.id, 'stock': 0}])
+
+    def test_rechaza_deltas_y_stocks_fuera_del_rango_de_la_columna(self):
+        juego = Videojuego.objects.create(titulo='Zelda', precio=Decimal('60.00'), stock=2)
+        url = f'/api/videojuegos/{juego.id}/stock/'
+        maximo = validacion.STOCK_MAXIMO
+
+        self.assertEqual(self.ajustar(url, {'delta': 10 ** 30}).status_code, 400)
+        self.assertEqual(self.ajustar(url, {'delta': -maximo - 1}).status_code, 400)
+        response = self.ajustar(url, {'delta': maximo - 1})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['ids'], [juego.id])
+        self.assertEqual(self.ajustar(url, {'delta': maximo - 2}).json()['stock'], maximo)
+
+        # En el lote, los movimientos repetidos se suman antes de comprobar el rango
+        response = self.ajustar('/api/videojuegos/stock/', [{'id': juego.id, 'delta': -maximo}] * 2)
+        self.assertEqual(response.status_code, 400)
+        response = self.ajustar('/api/videojuegos/stock/', [{'id': juego.id, 'delta': 1}])
+        self.assertEqual(response.status_code, 400)
+        juego.refresh_from_db()
+        self.assertEqual(juego.stock, maximo)
+
+    def test_actualizar_solo_escribe_los_campos_recibidos(self):
+        juego = Videojuego.objects.create(titulo='Halo', precio=Decimal('30.00'), stock=10)
+        # Una venta concurrente cambia el stock entre la lectura y el PUT
+        Videojuego.objects.filter(id=juego.id).update(stock=7)
+        self.client.put(f'/api/videojuegos/{juego.id}/actualizar/', json.dumps({'titulo': 'Halo 2'}),
+                        content_type='application/json')
+        juego.refresh_from_db()
+        self.assertEqual((juego.titulo, juego.stock), ('Halo 2', 7))
+
+
+class EstadisticasTests(TestCase):
+    def enviar(self, metodo, url, data):
+        return getattr(self.client, metodo)(url, json.dumps(data), content_type='application/json')
+
+    def test_deltas_coinciden_con_el_recalculo(self):
+        self.enviar('post', '/api/videojuegos/crear/', {'titulo': 'A', 'precio': 19.99, 'stock': 3, 'plataforma': 'PS5'})
+        b = Videojuego.objects.create(titulo='B', precio=Decimal('10.00'), stock=10, plataforma='PC')
+        self.enviar('put', f'/api/videojuegos/{b.id}/actualizar/', {'plataforma': 'SWITCH', 'genero': 'RPG'})
+        self.enviar('post', f'/api/videojuegos/{b.id}/stock/', {'delta': -8})
+        self.enviar('post', '/api/videojuegos/bulk/', [
+            {'titulo': 'C', 'precio': 5, 'stock': 1, 'codigo_externo': 'SKU-C'},
+            {'titulo': 'D', 'precio': 7, 'stock': 20},
+        ])
+        self.enviar('post', '/api/videojuegos/bulk/', [{'titulo': 'C2', 'precio': 6, 'stock': 4, 'codigo_externo': 'SKU-C'}])
+        self.enviar('put', '/api/videojuegos/bulk/', [{'id': b.id, 'precio': 12}])
+        self.client.delete(f'/api/videojuegos/{Videojuego.objects.get(titulo="D").id}/eliminar/')
+
+        data = self.client.get('/api/videojuegos/estadisticas/').json()
+        # A: 3 x 19.99, B: 2 x 12 (SWITCH/RPG), C2: 4 x 6
+        self.assertEqual(data['total'], {'cantidad': 3, 'unidades': 9, 'valor': '107.97', 'stock_bajo': 3})
+        self.assertIn({'plataforma': 'SWITCH', 'genero': 'RPG', 'cantidad': 1, 'unidades': 2,
+                       'valor': '24.00', 'stock_bajo': 1}, data['por_grupo'])
+        self.assertEqual(estadisticas.recalcular(), 0)
+
+    def test_recompute_corrige_desvios(self):
+        crear_videojuegos(2, stock=1)
+        # update() no emite señales: las estadísticas quedan desactualizadas
+        Videojuego.objects.update(stock=100)
+        salida = StringIO()
+        call_command('recompute_estadisticas', stdout=salida)
+        self.assertIn('1 grupos estaban desactualizados', salida.getvalue())
+        self.assertEqual(self.client.get('/api/videojuegos/estadisticas/').json()['total']['unidades'], 200)
+
+
+    def test_totales_que_no_entran_en_int4_ni_en_16_digitos(self):
+        maximo = validacion.STOCK_MAXIMO
+        for i in range(3):
+            self.enviar('post', '/api/videojuegos/crear/', {'titulo': f'J{i}', 'precio': '99999999.99', 'stock': maximo})
+        total = self.client.get('/api/videojuegos/estadisticas/').json()['total']
+        self.assertEqual(total['unidades'], 3 * maximo)
+        # En SQLite el decimal pasa por REAL; en PostgreSQL es exacto
+        self.assertAlmostEqual(Decimal(total['valor']) / (3 * maximo * Decimal('99999999.99')), 1, places=12)
+
+
+class CoalescenciaTests(TestCase):
+    async def test_llamadas_concurrentes_comparten_una_ejecucion(self):
+        llamadas = 0
+
+        async def lenta():
+            nonlocal llamadas
+            llamadas += 1
+            await asyncio.sleep(0.01)
+            return llamadas
+
+        resultados = await asyncio.gather(*(coalescencia.ejecutar('clave', lenta) for _ in range(50)))
+        self.assertEqual(set(resultados), {1})
+        # Terminada la ráfaga no queda nada guardado: la siguiente vuelve a ejecutar
+        self.assertEqual(await coalescencia.ejecutar('clave', lenta), 2)
+
+    def test_rafaga_de_listados_consulta_una_vez(self):
+        crear_videojuegos(3)
+        caches[cache.ALIAS].clear()
+
+        async def rafaga():
+            return await asyncio.gather(*(self.async_client.get('/api/videojuegos/') for _ in range(20)))
+
+        with CaptureQueriesContext(connection) as consultas:
+            respuestas = async_to_sync(rafaga)()
+
+        self.assertEqual({r.status_code for r in respuestas}, {200})
+        self.assertEqual(len({r.content for r in respuestas}), 1)
+        # Una consulta para el ETag (aggregate) y otra para la página
+        self.assertEqual(len(consultas), 2)
+
+
+class SeedCatalogoTests(TestCase):
+    def test_genera_datos_reproducibles_y_sesgados(self):
+        def resumen(videojuegos):
+            return [(v.titulo, v.precio, v.stock, v.plataforma, v.genero) for v in videojuegos]
+
+        self.assertEqual(resumen(seed_catalogo.generar(50, semilla=1)), resumen(seed_catalogo.generar(50, semilla=1)))
+        plataformas = Counter(v.plataforma for v in seed_catalogo.generar(2000))
+        self.assertEqual(plataformas.most_common(1)[0][0], 'PC')
+        self.assertLess(plataformas['XBOX_ONE'], plataformas['PC'] / 3)
+
+    def test_comando_inserta_y_mantiene_las_estadisticas(self):
+        call_command('seed_catalogo', rows=300, batch_size=120, stdout=StringIO())
+        self.assertEqual(Videojuego.objects.count(), 300)
+        self.assertEqual(estadisticas.recalcular(), 0)
+
+
+class MetricasTests(TestCase):
+    def setUp(self):
+        metricas.reiniciar()
+        caches[cache.ALIAS].clear()
+
+    def test_server_timing_y_metricas_por_vista(self):
+        crear_videojuegos(3)
+        response = self.client.get('/api/videojuegos/')
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('2 consultas', response['Server-Timing'])
+        self.assertIn('cache;desc="0 aciertos, 2 fallos"', response['Server-Timing'])
+
+        texto = self.client.get('/metrics').content.decode()
+        etiquetas = 'vista="listar_videojuegos",metodo="GET"'
+        self.assertIn(f'api_peticion_segundos_bucket{{{etiquetas},le="+Inf"}} 1', texto)
+        self.assertIn(f'api_db_consultas_total{{{etiquetas}}} 2', texto)
+        self.assertIn(f'api_peticiones_total{{{etiquetas},estado="200"}} 1', texto)
+
+    @override_settings(API_METRICAS_TOKEN='secreto')
+    def test_metricas_con_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        response = self.client.get('/metrics', headers={'Authorization': 'Bearer secreto'})
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(API_UMBRAL_LENTA_MS=0)
+    def test_log_de_peticiones_lentas_incluye_el_sql(self):
+        with self.assertLogs('api.lentas', 'WARNING') as logs:
+            self.client.get('/api/videojuegos/estadisticas/')
+        self.assertIn('estadisticas_videojuegos', logs.output[0])
+        self.assertIn('api_estadisticainventario', logs.output[0])
+
+
+class CompresionTests(TestCase):
+    def test_comprime_respuestas_grandes_y_streaming(self):
+        crear_videojuegos(30)
+        response = self.client.get('/api/videojuegos/', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))['resultados']), 30)
+        self.assertTrue(response['ETag'].startswith('W/'))
+
+        response = self.client.get('/api/videojuegos/?stream=ndjson', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(gzip.decompress(b''.join(response.streaming_content)).splitlines()), 30)
+
+        response = self.client.get('/api/videojuegos/estadisticas/', headers={'Accept-Encoding': 'gzip'})
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_etag_debil_sirve_para_304_e_if_match(self):
+        # GZipMiddleware agrega hasta 100 bytes al azar y no comprime si el
+        # resultado no es más corto: con un payload chico el test sería azaroso
+        videojuego = crear_videojuegos(1, descripcion='Mundo abierto. ' * 100)[0]
+        with override_settings(API_GZIP_MINIMO_BYTES=0):
+            response = self.client.get(f'/api/videojuegos/{videojuego.pk}/', headers={'Accept-Encoding': 'gzip'})
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/'))
+
+        response = self.client.get(f'/api/videojuegos/{videojuego.pk}/', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        response = self.client.put(
+            f'/api/videojuegos/{videojuego.pk}/actualizar/', {'stock': 3},
+            content_type='application/json', headers={'If-Match': etag},
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+class EstaticosTests(SimpleTestCase):
+    def test_build_y_servicio_con_huella_y_precomprimidos(self):
+        with tempfile.TemporaryDirectory() as destino, override_settings(
+            STATIC_ROOT=destino,
+            # Solo los estáticos del proyecto, sin los del admin
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+            STORAGES={**settings.STORAGES, 'staticfiles': {'BACKEND': 'api.estaticos.AlmacenEstaticos'}},
+        ):
+            call_command('build_estaticos', stdout=StringIO())
+            with open(os.path.join(destino, 'staticfiles.json')) as archivo:
+                app_js = json.load(archivo)['paths']['js/app.js']
+            self.assertRegex(app_js, r'^js/app\.[0-9a-f]{12}\.js$')
+
+            def pedir(ruta, aceptadas=''):
+                request = RequestFactory().get(f'/static/{ruta}', headers={'Accept-Encoding': aceptadas})
+                return views.servir_estatico(request, ruta)
+
+            response = pedir(app_js, 'gzip, deflate, br')
+            self.assertEqual(response['Content-Encoding'], 'br' if estaticos.brotli else 'gzip')
+            self.assertEqual(response['Cache-Control'], estaticos.CACHE_INMUTABLE)
+            self.assertEqual(response['Vary'], 'Accept-Encoding')
+            self.assertTrue(response['Content-Type'].startswith('text/javascript'))
+            response.close()
+
+            response = pedir(app_js, 'br;q=0, gzip')
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            with open(os.path.join(destino, app_js), 'rb') as archivo:
+                self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), archivo.read())
+
+            response = pedir('js/app.js')
+            self.assertFalse(response.has_header('Content-Encoding'))
+            self.assertEqual(response['Cache-Control'], estaticos.CACHE_REVALIDAR)
+            response.close()
+
+            for ruta in ('../settings.py', app_js + '.gz', 'no/existe.css'):
+                with self.assertRaises(Http404):
+                    pedir(ruta)
+
+
+@skipUnless(portadas.disponible(), 'Pillow no está instalado')
+class PortadasTests(TestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(MEDIA_ROOT=directorio.name, API_PORTADA_ANCHOS=[160, 320, 640], API_PORTADA_PROCESOS=1)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.videojuego = crear_videojuegos(1)[0]
+
+    def imagen(self, ancho, alto, formato='JPEG'):
+        from PIL import Image
+
+        salida = BytesIO()
+        Image.new('RGB', (ancho, alto), (200, 30, 30)).save(salida, formato)
+        return salida.getvalue()
+
+    def subir(self, datos, nombre='portada.jpg'):
+        return self.client.post(
+            f'/api/videojuegos/{self.videojuego.id}/portada/',
+            {'portada': SimpleUploadedFile(nombre, datos)},
+        )
+
+    def test_genera_variantes_sin_agrandar_y_las_expone(self):
+        response = self.subir(self.imagen(400, 300))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertRegex(data['portada'], r'^/media/portadas/[0-9a-f]{2}/[0-9a-f]{64}/original\.jpg$')
+        self.assertIn('webp', data['portada_srcset'])
+        # 640 no entra en un original de 400: la mayor variante es el original
+        self.assertEqual([parte.split()[1] for parte in data['portada_srcset']['webp'].split(', ')],
+                         ['160w', '320w', '400w'])
+
+        self.videojuego.refresh_from_db()
+        self.assertFalse(portadas.pendiente(self.videojuego))
+        variantes = dict(self.videojuego.portada_srcset)
+        self.assertEqual(variantes.pop(portadas.ORIGINAL), [400, 300])
+        for lista in variantes.values():
+            for _, nombre in lista:
+                self.assertTrue(default_storage.exists(nombre))
+        self.assertEqual(self.client.get(f'/api/videojuegos/{self.videojuego.id}/').json(), data)
+
+        # La misma imagen reutiliza los archivos ya escritos
+        self.assertEqual(self.subir(self.imagen(400, 300)).json()['portada_srcset'], data['portada_srcset'])
+
+    def test_rechaza_archivos_que_no_son_imagenes(self):
+        self.assertEqual(self.subir(b'no es una imagen', 'portada.png').status_code, 400)
+        self.assertEqual(self.client.post(f'/api/videojuegos/{self.videojuego.id}/portada/').status_code, 400)
+        with override_settings(API_PORTADA_MAX_BYTES=10):
+            self.assertEqual(self.subir(self.imagen(50, 50)).status_code, 413)
+        self.videojuego.refresh_from_db()
+        self.assertFalse(self.videojuego.portada)
+
+    def test_backfill_regenera_las_que_no_coinciden_con_la_configuracion(self):
+        self.subir(self.imagen(400, 300))
+        with override_settings(API_PORTADA_ANCHOS=[100, 200]):
+            self.videojuego.refresh_from_db()
+            self.assertTrue(portadas.pendiente(self.videojuego))
+            call_command('backfill_portadas', stdout=StringIO())
+            self.videojuego.refresh_from_db()
+            self.assertEqual([ancho for ancho, _ in self.videojuego.portada_srcset['webp']], [100, 200])
+            self.assertFalse(portadas.pendiente(self.videojuego))
+
+    def test_un_ancho_nuevo_mayor_que_las_variantes_queda_pendiente(self):
+        self.subir(self.imagen(2000, 1000))
+        self.videojuego.refresh_from_db()
+        self.assertFalse(portadas.pendiente(self.videojuego))
+        # 1600 entra en el original de 2000 aunque la mayor variante sea 640
+        with override_settings(API_PORTADA_ANCHOS=[160, 320, 640, 1600]):
+            self.assertTrue(portadas.pendiente(self.videojuego))
+            call_command('backfill_portadas', stdout=StringIO())
+            self.videojuego.refresh_from_db()
+            self.assertEqual([ancho for ancho, _ in self.videojuego.portada_srcset['webp']], [160, 320, 640, 1600])
+            self.assertFalse(portadas.pendiente(self.videojuego))
+
+        # Una portada guardada sin el tamaño del original se reprocesa
+        del self.videojuego.portada_srcset[portadas.ORIGINAL]
+        self.assertTrue(portadas.pendiente(self.videojuego))
+
+    def test_backfill_asigna_portadas_desde_un_mapa(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            with open(os.path.join(directorio, 'tapa.png'), 'wb') as archivo:
+                archivo.write(self.imagen(200, 100, 'PNG'))
+            with open(os.path.join(directorio, 'mapa.csv'), 'w') as archivo:
+                archivo.write(f'id,archivo\n{self.videojuego.id},tapa.png\n')
+            call_command('backfill_portadas', mapa=os.path.join(directorio, 'mapa.csv'), stdout=StringIO())
+        self.videojuego.refresh_from_db()
+        self.assertTrue(self.videojuego.portada.name.endswith('/original.png'))
+        self.assertEqual([ancho for ancho, _ in self.videojuego.portada_srcset['webp']], [160, 200])
+
+
+# SimpleTestCase: TestCase envuelve cada test en una transacción y dentro de
+# una transacción el router siempre elige la primaria.
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicasTests(SimpleTestCase):
+    def test_router_envia_lecturas_a_replica_salvo_fijadas_o_en_transaccion(self):
+        router = replicas.RouterReplicas()
+        self.assertEqual(router.db_for_read(Videojuego), 'replica1')
+        self.assertEqual(router.db_for_write(Videojuego), 'default')
+        with replicas.primaria():
+            self.assertEqual(router.db_for_read(Videojuego), 'default')
+        with mock.patch.object(connection, 'in_atomic_block', True):
+            self.assertEqual(router.db_for_read(Videojuego), 'default')
+
+    def test_quien_escribe_queda_fijado_a_la_primaria(self):
+        vistos = []
+
+        def vista(request):
+            vistos.append(replicas.usar_primaria())
+            return HttpResponse(status=201 if request.method == 'POST' else 200)
+
+        middleware = fijar_primaria(vista)
+        factory = RequestFactory()
+        response = middleware(factory.post('/api/videojuegos/crear/'))
+        self.assertIn(COOKIE_PRIMARIA, response.cookies)
+
+        middleware(factory.get('/api/videojuegos/'))
+        con_cookie = factory.get('/api/videojuegos/')
+        con_cookie.COOKIES[COOKIE_PRIMARIA] = '1'
+        middleware(con_cookie)
+        self.assertEqual(vistos, [True, False, True])
+
+    def test_no_cachea_lecturas_de_replica_tras_un_cambio_reciente(self):
+        caches[cache.ALIAS].clear()
+        caches[cache.ALIAS].set(cache.CLAVE_ULTIMO_CAMBIO, timezone.now())
+        cache.guardar('clave', 'valor')
+        self.assertIsNone(caches[cache.ALIAS].get('clave'))
+        with replicas.primaria():
+            cache.guardar('clave', 'valor')
+        self.assertEqual(caches[cache.ALIAS].get('clave'), 'valor')
+
+
+
+REPLICA = 'replica_pruebas'
+
+
+# TransactionTestCase: dentro de la transacción de TestCase el router siempre
+# elige la primaria. La réplica es otro archivo SQLite sin replicación (ver
+# backend/settings.py), así que cada fila dice de qué base salió la lectura.
+@skipUnless(REPLICA in settings.DATABASES, 'La base de réplica de prueba solo se define con SQLite')
+@override_settings(
+    DATABASE_REPLICAS=[REPLICA],
+    DATABASE_ROUTERS=['api.replicas.RouterReplicas'],
+    MIDDLEWARE=[*settings.MIDDLEWARE, 'api.middleware.fijar_primaria'],
+)
+class ReplicasSQLiteTests(TransactionTestCase):
+    databases = {'default', REPLICA} & set(settings.DATABASES)
+
+    def titulos(self):
+        caches[cache.ALIAS].clear()
+        return [data['titulo'] for data in self.client.get('/api/videojuegos/').json()['resultados']]
+
+    def test_lee_de_la_primaria_solo_quien_acaba_de_escribir(self):
+        # bulk_create no emite señales: nada de la réplica se escribe en la primaria
+        Videojuego.objects.using(REPLICA).bulk_create([Videojuego(titulo='Solo en la réplica', precio=Decimal('1.00'))])
+        response = self.client.post(
+            '/api/videojuegos/crear/', json.dumps({'titulo': 'Recién creado', 'precio': 10}), content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Videojuego.objects.using('default').filter(titulo='Recién creado').exists())
+        self.assertFalse(Videojuego.objects.using(REPLICA).filter(titulo='Recién creado').exists())
+
+        # Con la cookie de la escritura lee lo que acaba de escribir
+        self.assertIn(COOKIE_PRIMARIA, self.client.cookies)
+        self.assertEqual(self.titulos(), ['Recién creado'])
+        # Sin ella (venció o es otro cliente) la lectura va a la réplica
+        self.client.cookies.clear()
+        self.assertEqual(self.titulos(), ['Solo en la réplica'])
+
+
+class EventosASGITests(TransactionTestCase):
+    """backend.asgi atiende /api/eventos/ antes de Django (fuera de la transacción de TestCase)"""
+
+    async def conectar(self, application, headers=()):
+        """Abre una conexión ASGI; devuelve (tarea, mensajes enviados, evento para desconectar)"""
+        enviados, desconectar = asyncio.Queue(), asyncio.Event()
+        pedido = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+        async def receive():
+            if pedido:
+                return pedido.pop()
+            await desconectar.wait()
+            return {'type': 'http.disconnect'}
+
+        scope = {'type': 'http', 'method': 'GET', 'path': '/api/eventos/', 'query_string': b'',
+                 'headers': [(b'host', b'testserver'), *headers]}
+        tarea = asyncio.create_task(application(scope, receive, enviados.put))
+        return tarea, enviados, desconectar
+
+    async def recibir(self, enviados):
+        return await asyncio.wait_for(enviados.get(), 1)
+
+    async def test_atiende_eventos_sin_pasar_por_django(self):
+        django = mock.AsyncMock()
+        application = eventos.con_eventos(django)
+        tarea, enviados, desconectar = await self.conectar(application)
+
+        inicio = await self.recibir(enviados)
+        self.assertEqual((inicio['status'], dict(inicio['headers'])[b'content-type']), (200, b'text/event-stream'))
+        self.assertEqual((await self.recibir(enviados))['body'], b'retry: 5000\n\n')
+        await sync_to_async(Videojuego.objects.create)(titulo='Zelda', precio=Decimal('60.00'))
+        self.assertIn(b'event: videojuego\n', (await self.recibir(enviados))['body'])
+
+        desconectar.set()
+        await asyncio.wait_for(tarea, 1)
+        self.assertEqual(eventos.hub.clientes(), 0)
+        django.assert_not_awaited()
+
+        tarea, enviados, _ = await self.conectar(application, [(b'last-event-id', b'x')])
+        await tarea
+        self.assertEqual((await self.recibir(enviados))['status'], 400)
+
+        await application({'type': 'http', 'method': 'GET', 'path': '/api/videojuegos/'}, None, None)
+        django.assert_awaited_once()
+
+
+class StockConcurrenciaTests(TransactionTestCase):
+    def setUp(self):
+        # Cada hilo abre su propia conexión: no sirve una base SQLite en memoria
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('La base de tests de SQLite está en memoria')
+
+    def test_compras_concurrentes_no_venden_de_mas(self):
+        juego = Videojuego.objects.create(titulo='Elden Ring', precio=Decimal('70.00'), stock=10)
+        resultados = []
+        barrera = threading.Barrier(20)
+
+        def comprar():
+            try:
+                barrera.wait()
+                response = self.client_class().post(f'/api/videojuegos/{juego.id}/stock/',
+                                                    json.dumps({'delta': -1}), content_type='application/json')
+                resultados.append(response.status_code)
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=comprar) for _ in range(20)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(sorted(resultados), [200] * 10 + [409] * 10)
+        juego.refresh_from_db()
+        self.assertEqual(juego.stock, 0)
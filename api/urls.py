@@ -3,8 +3,19 @@ from . import views
 
 urlpatterns = [
     path('videojuegos/', views.listar_videojuegos, name='listar_videojuegos'),
+    path('videojuegos/buscar/', views.buscar_videojuegos, name='buscar_videojuegos'),
+    path('videojuegos/cambios/', views.cambios_videojuegos, name='cambios_videojuegos'),
+    path('videojuegos/lote/', views.obtener_lote, name='obtener_lote'),
+    path('videojuegos/facetas/', views.facetas_videojuegos, name='facetas_videojuegos'),
+    path('videojuegos/estadisticas/', views.estadisticas_videojuegos, name='estadisticas_videojuegos'),
+    path('videojuegos/bulk/', views.videojuegos_bulk, name='videojuegos_bulk'),
+    path('videojuegos/stock/', views.ajustar_stock_lote, name='ajustar_stock_lote'),
+    path('eventos/', views.eventos_catalogo, name='eventos_catalogo'),
     path('videojuegos/crear/', views.crear_videojuego, name='crear_videojuego'),
     path('videojuegos/<int:id>/', views.obtener_videojuego, name='obtener_videojuego'),
     path('videojuegos/<int:id>/actualizar/', views.actualizar_videojuego, name='actualizar_videojuego'),
     path('videojuegos/<int:id>/eliminar/', views.eliminar_videojuego, name='eliminar_videojuego'),
+    path('videojuegos/<int:id>/similares/', views.similares_videojuego, name='similares_videojuego'),
+    path('videojuegos/<int:id>/stock/', views.ajustar_stock_videojuego, name='ajustar_stock_videojuego'),
+    path('videojuegos/<int:id>/portada/', views.subir_portada, name='subir_portada'),
 ]
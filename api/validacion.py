@@ -0,0 +1,191 @@
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+from .models import Videojuego
+
+# Validación y conversión de los datos de entrada de un videojuego,
+# compartida por las vistas de la API, los endpoints en lote y los comandos
+# de importación.
+#
+# El esquema se declara como una tupla de Campo y se compila una sola vez al
+# importar el módulo (opciones en frozensets, límites leídos del modelo). Cada
+# payload se recorre en una sola pasada que valida y a la vez devuelve los
+# valores con el tipo del modelo: precio como Decimal, fecha como date.
+
+# Valor de un campo vacío (None o '') que se trata como si no se hubiera enviado
+OMITIR = object()
+
+VALORES_POR_DEFECTO = {
+    'descripcion': '',
+    'stock': 0,
+    'plataforma': 'PC',
+    'genero': 'ACCION',
+    'desarrollador': '',
+    'fecha_lanzamiento': None,
+    'codigo_externo': None,
+}
+
+
+# Rango de la columna stock (IntegerField: int4 en PostgreSQL)
+STOCK_MAXIMO = 2 ** 31 - 1
+
+# Precisión de la columna precio y el primer valor que ya no entra en max_digits
+PRECIO_CENTAVOS = Decimal(1).scaleb(-Videojuego._meta.get_field('precio').decimal_places)
+PRECIO_LIMITE = Decimal(10) ** (
+    Videojuego._meta.get_field('precio').max_digits - Videojuego._meta.get_field('precio').decimal_places
+)
+
+
+class ErrorCampo(ValueError):
+    """Valor inválido para un campo; el mensaje es el que recibe el cliente"""
+
+
+class Campo:
+    """
+    Declaración de un campo del payload: `conversor` valida y convierte un
+    valor no vacío, `vacio` es lo que se guarda si llega None o '' y
+    `requerido` el error si falta al crear.
+    """
+
+    __slots__ = ('nombre', 'conversor', 'vacio', 'requerido')
+
+    def __init__(self, nombre, conversor, vacio=OMITIR, requerido=None):
+        self.nombre = nombre
+        self.conversor = conversor
+        self.vacio = vacio
+        self.requerido = requerido
+
+
+def parse_fecha(valor):
+    """Convierte un string YYYY-MM-DD (o un date) a date"""
+    if isinstance(valor, date):
+        return valor
+    # fromisoformat también acepta otras formas ISO (20240229, 2024-W09-4):
+    # solo se le pasa la forma YYYY-MM-DD. Es varias veces más rápido que strptime.
+    if isinstance(valor, str) and len(valor) == 10 and valor[4] == '-' and valor[7] == '-':
+        try:
+            return date.fromisoformat(valor)
+        except ValueError:
+            pass
+    raise ErrorCampo('Formato de fecha inválido. Use YYYY-MM-DD')
+
+
+def _texto(campo, mensaje):
+    maximo = Videojuego._meta.get_field(campo).max_length
+    mensaje = f'{mensaje} debe ser un texto de hasta {maximo} caracteres' if maximo else f'{mensaje} debe ser un texto'
+
+    def convertir(valor):
+        if not isinstance(valor, str) or (maximo and len(valor) > maximo):
+            raise ErrorCampo(mensaje)
+        return valor
+    return convertir
+
+
+def _precio():
+    centavos, limite = PRECIO_CENTAVOS, PRECIO_LIMITE
+
+    def convertir(valor):
+        # Un float de JSON pasa por str para conservar el literal (19.99 y no 19.989999...)
+        if isinstance(valor, bool) or not isinstance(valor, (int, float, str, Decimal)):
+            raise ErrorCampo('El precio debe ser un número válido')
+        try:
+            precio = Decimal(valor if isinstance(valor, (int, Decimal)) else str(valor).strip())
+        except InvalidOperation:
+            raise ErrorCampo('El precio debe ser un número válido')
+        if not precio.is_finite():
+            raise ErrorCampo('El precio debe ser un número válido')
+        if precio < 0:
+            raise ErrorCampo('El precio debe ser mayor o igual a 0')
+        precio = precio.quantize(centavos, rounding=ROUND_HALF_UP)
+        if precio >= limite:
+            raise ErrorCampo(f'El precio debe ser menor que {limite}')
+        return precio
+    return convertir
+
+
+def _stock(valor):
+    if isinstance(valor, bool):
+        raise ErrorCampo('El stock debe ser un número entero válido')
+    if isinstance(valor, str):
+        try:
+            valor = int(valor.strip())
+        except ValueError:
+            raise ErrorCampo('El stock debe ser un número entero válido')
+    elif isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    elif not isinstance(valor, int):
+        raise ErrorCampo('El stock debe ser un número entero válido')
+    if valor < 0:
+        raise ErrorCampo('El stock debe ser mayor o igual a 0')
+    if valor > STOCK_MAXIMO:
+        raise ErrorCampo('El stock supera el máximo permitido')
+    return valor
+
+
+def _opcion(opciones, mensaje):
+    validas = frozenset(clave for clave, _ in opciones)
+    mensaje = f'{mensaje}. Opciones válidas: {", ".join(clave for clave, _ in opciones)}'
+
+    def convertir(valor):
+        if not isinstance(valor, str) or valor not in validas:
+            raise ErrorCampo(mensaje)
+        return valor
+    return convertir
+
+
+def _codigo_externo(valor):
+    # Clave del upsert en lote
+    if not isinstance(valor, str) or len(valor) > 64:
+        raise ErrorCampo('El código externo debe ser un texto de 1 a 64 caracteres')
+    return valor
+
+
+ESQUEMA = (
+    Campo('titulo', _texto('titulo', 'El título'), requerido='El título es requerido'),
+    Campo('descripcion', _texto('descripcion', 'La descripción'), vacio=''),
+    Campo('precio', _precio(), requerido='El precio es requerido'),
+    Campo('stock', _stock),
+    Campo('plataforma', _opcion(Videojuego.PLATAFORMAS, 'Plataforma inválida')),
+    Campo('genero', _opcion(Videojuego.GENEROS, 'Género inválido')),
+    Campo('desarrollador', _texto('desarrollador', 'El desarrollador'), vacio=''),
+    Campo('fecha_lanzamiento', parse_fecha, vacio=None),
+    Campo('codigo_externo', _codigo_externo, vacio=None),
+)
+
+CAMPOS = tuple(campo.nombre for campo in ESQUEMA)
+
+_CAMPOS = {campo.nombre: (campo.conversor, campo.vacio) for campo in ESQUEMA}
+_REQUERIDOS = tuple((campo.nombre, campo.requerido) for campo in ESQUEMA if campo.requerido)
+
+
+def validar(data, es_actualizacion=False):
+    """
+    Valida un payload (dict) y lo convierte a los tipos del modelo.
+    Devuelve (valores, errores): los campos presentes ya convertidos y
+    {campo: mensaje} con los inválidos. Las claves desconocidas se ignoran.
+    """
+    valores, errores = {}, {}
+    for nombre, valor in data.items():
+        campo = _CAMPOS.get(nombre)
+        if campo is None:
+            continue
+        conversor, vacio = campo
+        if valor is None or valor == '':
+            if vacio is not OMITIR:
+                valores[nombre] = vacio
+            continue
+        try:
+            valores[nombre] = conversor(valor)
+        except ErrorCampo as e:
+            errores[nombre] = str(e)
+
+    if not es_actualizacion:
+        for nombre, error in _REQUERIDOS:
+            if nombre not in valores and nombre not in errores:
+                errores[nombre] = error
+    return valores, errores
+
+
+def mensaje(errores):
+    """Los errores de validar() en un solo texto, para el campo `error` de las respuestas"""
+    return '; '.join(errores.values())
@@ -1,120 +1,383 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, JsonResponse, QueryDict, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
+from django.utils.http import http_date
 from django.views.decorators.http import require_http_methods
+from django.views.static import was_modified_since
 from .models import Videojuego
+from . import busqueda, cache, cambios, coalescencia, condicional, estaticos, estadisticas, eventos, facetas, filtros, inventario, lotes, metricas, paginacion, portadas, serializadores, similares, validacion
 import json
-from datetime import datetime
+import mimetypes
+import os
+import secrets
 
 # Crea tus vistas aquí.
 
-def parse_fecha(fecha_str):
-    """Convierte un string de fecha a objeto date"""
-    if not fecha_str:
-        return None
-    if isinstance(fecha_str, str):
-        try:
-            return datetime.strptime(fecha_str, '%Y-%m-%d').date()
-        except ValueError:
-            raise ValueError('Formato de fecha inválido. Use YYYY-MM-DD')
-    return fecha_str
+def parse_limite(valor, por_defecto):
+    """Valida el parámetro `limit` y lo acota al máximo configurado"""
+    if valor in (None, ''):
+        return por_defecto
+    try:
+        limite = int(valor)
+    except (ValueError, TypeError):
+        raise ValueError('El parámetro limit debe ser un entero positivo')
+    if limite < 1:
+        raise ValueError('El parámetro limit debe ser un entero positivo')
+    return min(limite, settings.API_LIMITE_MAXIMO)
 
-def validar_datos_videojuego(data, es_actualizacion=False):
-    """Valida los datos del videojuego"""
-    errores = []
-    
-    # Validar campos requeridos solo en creación
-    if not es_actualizacion:
-        if not data.get('titulo'):
-            errores.append('El título es requerido')
-        if data.get('precio') is None:
-            errores.append('El precio es requerido')
-    
-    # Validar precio
-    if 'precio' in data and data.get('precio') is not None:
-        try:
-            precio = float(data.get('precio'))
-            if precio < 0:
-                errores.append('El precio debe ser mayor o igual a 0')
-        except (ValueError, TypeError):
-            errores.append('El precio debe ser un número válido')
-    
-    # Validar stock
-    if 'stock' in data and data.get('stock') is not None:
-        try:
-            stock = int(data.get('stock'))
-            if stock < 0:
-                errores.append('El stock debe ser mayor o igual a 0')
-        except (ValueError, TypeError):
-            errores.append('El stock debe ser un número entero válido')
-    
-    # Validar plataforma
-    if 'plataforma' in data and data.get('plataforma'):
-        plataformas_validas = [choice[0] for choice in Videojuego.PLATAFORMAS]
-        if data.get('plataforma') not in plataformas_validas:
-            errores.append(f'Plataforma inválida. Opciones válidas: {", ".join(plataformas_validas)}')
-    
-    # Validar género
-    if 'genero' in data and data.get('genero'):
-        generos_validos = [choice[0] for choice in Videojuego.GENEROS]
-        if data.get('genero') not in generos_validos:
-            errores.append(f'Género inválido. Opciones válidas: {", ".join(generos_validos)}')
-    
-    # Validar fecha de lanzamiento
-    if 'fecha_lanzamiento' in data and data.get('fecha_lanzamiento'):
-        try:
-            parse_fecha(data.get('fecha_lanzamiento'))
-        except ValueError as e:
-            errores.append(str(e))
-    
-    return errores
+def _agrupar(lineas, tamano=200):
+    """Junta varias líneas por chunk para no escribir al socket fila por fila"""
+    buffer = []
+    for linea in lineas:
+        buffer.append(linea)
+        if len(buffer) >= tamano:
+            yield b''.join(buffer)
+            buffer = []
+    if buffer:
+        yield b''.join(buffer)
 
-@require_http_methods(["GET"])
-def listar_videojuegos(request):
-    """Lista todos los videojuegos"""
-    videojuegos = Videojuego.objects.all()
-    data = []
-    for v in videojuegos:
-        data.append({
-            'id': v.id,
-            'titulo': v.titulo,
-            'descripcion': v.descripcion,
-            'precio': str(v.precio),
-            'stock': v.stock,
-            'plataforma': v.plataforma,
-            'genero': v.genero,
-            'desarrollador': v.desarrollador,
-            'fecha_lanzamiento': v.fecha_lanzamiento.isoformat() if v.fecha_lanzamiento else None,
-            'created_at': v.created_at.isoformat(),
-            'updated_at': v.updated_at.isoformat(),
+def _stream_ndjson(filas, serializador):
+    for fila in filas:
+        yield serializadores.a_json(serializador.fila(fila)) + b'\n'
+
+def _stream_json(filas, serializador):
+    yield b'['
+    separador = b''
+    for fila in filas:
+        yield separador + serializadores.a_json(serializador.fila(fila))
+        separador = b','
+    yield b']'
+
+# Versiones async de los generadores de streaming: bajo ASGI Django solo
+# transmite sin acumular en memoria si el iterador es async.
+
+async def _aagrupar(lineas, tamano=200):
+    buffer = []
+    async for linea in lineas:
+        buffer.append(linea)
+        if len(buffer) >= tamano:
+            yield b''.join(buffer)
+            buffer = []
+    if buffer:
+        yield b''.join(buffer)
+
+async def _astream_ndjson(filas, serializador):
+    async for fila in filas:
+        yield serializadores.a_json(serializador.fila(fila)) + b'\n'
+
+async def _astream_json(filas, serializador):
+    yield b'['
+    separador = b''
+    async for fila in filas:
+        yield separador + serializadores.a_json(serializador.fila(fila))
+        separador = b','
+    yield b']'
+
+async def _pagina_listado(clave, queryset, serializador, limite, cursor, orden):
+    """Cuerpo JSON de una página del listado, desde el cache o la base"""
+    contenido = await cache.aobtener(clave)
+    if contenido is None:
+        filas, siguiente = await paginacion.apaginar(queryset, serializador.columnas, limite, cursor, orden)
+        contenido = serializadores.a_json({
+            'resultados': serializador.filas(filas),
+            'siguiente': siguiente,
         })
-    return JsonResponse(data, safe=False)
+        await cache.aguardar(clave, contenido)
+    return contenido
+
+@require_http_methods(["GET"])
+@condicional.condicion(etag_func=condicional.etag_lista, last_modified_func=condicional.last_modified_lista)
+async def listar_videojuegos(request):
+    """Lista los videojuegos filtrados y paginados por cursor, o en streaming con ?stream=ndjson|json"""
+    stream = request.GET.get('stream')
+    if stream and stream not in ('ndjson', 'json'):
+        return JsonResponse({'error': 'Valor de stream inválido. Opciones válidas: ndjson, json'}, status=400)
+
+    try:
+        limite = parse_limite(request.GET.get('limit'), None if stream else settings.API_LIMITE_PAGINA)
+        orden = filtros.parse_orden(request.GET.get('ordering'))
+        campos = serializadores.parse_campos(request.GET.get('fields'))
+        queryset = filtros.filtrar_videojuegos(Videojuego.objects.all(), request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    cursor = request.GET.get('cursor')
+    serializador = serializadores.Serializador(campos, extra=paginacion.columnas(orden))
+
+    try:
+        if stream:
+            # El streaming recorre el catálogo con un cursor de servidor en
+            # bloques, así que la memoria no depende del tamaño del catálogo.
+            queryset = paginacion.ordenar(queryset, orden)
+            if cursor:
+                valores = paginacion.decodificar_cursor(cursor, orden)
+                queryset = queryset.filter(paginacion.filtro_keyset(orden, valores))
+            queryset = queryset.values_list(*serializador.columnas)
+            if limite:
+                queryset = queryset[:limite]
+            if isinstance(request, ASGIRequest):
+                filas = queryset.aiterator(chunk_size=settings.API_STREAM_CHUNK_SIZE)
+                generador = _astream_ndjson if stream == 'ndjson' else _astream_json
+                contenido = _aagrupar(generador(filas, serializador))
+            else:
+                filas = queryset.iterator(chunk_size=settings.API_STREAM_CHUNK_SIZE)
+                generador = _stream_ndjson if stream == 'ndjson' else _stream_json
+                contenido = _agrupar(generador(filas, serializador))
+            content_type = 'application/x-ndjson' if stream == 'ndjson' else 'application/json'
+            return StreamingHttpResponse(contenido, content_type=content_type)
+
+        # Las peticiones idénticas que llegan juntas comparten la misma consulta
+        clave = await condicional.clave_lista(request)
+        contenido = await coalescencia.ejecutar(
+            clave, lambda: _pagina_listado(clave, queryset, serializador, limite, cursor, orden)
+        )
+    except paginacion.CursorInvalido as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return HttpResponse(contenido, content_type='application/json')
+
+async def _renderizar_catalogo_inicial(clave):
+    # Es la misma página que GET /api/videojuegos/?limit=N (y la misma
+    # entrada de cache): el HTML y la hidratación salen del JSON de la API.
+    # El token se lee antes que la página: a lo sumo, el cliente recibe otra
+    # vez un cambio que ya vio, nunca se saltea uno
+    token = await sync_to_async(cambios.token_actual)()
+    params = QueryDict(f'limit={settings.API_INICIO_FILAS}')
+    orden = filtros.parse_orden(None)
+    queryset = filtros.filtrar_videojuegos(Videojuego.objects.all(), params)
+    serializador = serializadores.Serializador(extra=paginacion.columnas(orden))
+    clave_pagina = await cache.aclave_lista(params)
+    pagina = json.loads(await coalescencia.ejecutar(
+        clave_pagina,
+        lambda: _pagina_listado(clave_pagina, queryset, serializador, settings.API_INICIO_FILAS, None, orden),
+    ))
+    plataformas, generos = dict(Videojuego.PLATAFORMAS), dict(Videojuego.GENEROS)
+    videojuegos = [
+        {**videojuego, 'plataforma_nombre': plataformas.get(videojuego['plataforma'], videojuego['plataforma']),
+         'genero_nombre': generos.get(videojuego['genero'], videojuego['genero'])}
+        for videojuego in pagina['resultados']
+    ]
+    fragmento = render_to_string(
+        'parciales/catalogo_inicial.html', {'videojuegos': videojuegos, 'pagina': pagina, 'token_cambios': token}
+    )
+    await cache.aguardar(clave, fragmento)
+    return fragmento
+
+@require_http_methods(["GET"])
+async def inicio(request):
+    """Página principal con la primera página del catálogo ya renderizada e hidratable"""
+    clave = await cache.aclave_inicio()
+    fragmento = await cache.aobtener(clave)
+    if fragmento is None:
+        fragmento = await coalescencia.ejecutar(clave, lambda: _renderizar_catalogo_inicial(clave))
+    return render(request, 'index.html', {'catalogo_inicial': mark_safe(fragmento)})
+
+@require_http_methods(["GET"])
+def buscar_videojuegos(request):
+    """Busca videojuegos por texto en título, desarrollador y descripción"""
+    texto = request.GET.get('q', '').strip()
+    if not texto:
+        return JsonResponse({'error': 'El parámetro q es requerido'}, status=400)
+    try:
+        limite = parse_limite(request.GET.get('limit'), settings.API_LIMITE_BUSQUEDA)
+        campos = serializadores.parse_campos(request.GET.get('fields'))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    serializador = serializadores.Serializador(campos, extra=('id',))
+    ids = busqueda.buscar_ids(texto, limite)
+    posicion_id = serializador.columnas.index('id')
+    por_id = {
+        fila[posicion_id]: fila
+        for fila in Videojuego.objects.filter(id__in=ids).values_list(*serializador.columnas)
+    }
+    # Se respeta el orden de relevancia que devolvió el índice
+    return serializadores.RespuestaJSON({
+        'resultados': serializador.filas(por_id[id_] for id_ in ids if id_ in por_id),
+    })
+
+@require_http_methods(["GET"])
+def cambios_videojuegos(request):
+    """Videojuegos creados, modificados o eliminados desde el token `since`"""
+    try:
+        limite = parse_limite(request.GET.get('limit'), settings.API_LIMITE_MAXIMO)
+        campos = serializadores.parse_campos(request.GET.get('fields'))
+        desde = cambios.parse_token(request.GET.get('since'))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    if desde is None:
+        # Sin token: solo el token actual, para pedirlo antes de una descarga completa
+        return JsonResponse({'cambios': [], 'eliminados': [], 'siguiente': str(cambios.token_actual()), 'hay_mas': False})
+    try:
+        guardados, eliminados, siguiente, hay_mas = cambios.leer(desde, limite)
+    except cambios.TokenVencido:
+        return JsonResponse(
+            {'error': 'El token es anterior a la última compactación; hay que volver a descargar el catálogo'},
+            status=410,
+        )
+
+    serializador = serializadores.Serializador(campos)
+    filas = Videojuego.objects.filter(id__in=guardados).order_by('id').values_list(*serializador.columnas)
+    return serializadores.RespuestaJSON({
+        # Si un videojuego se borró después, su baja llega en una página siguiente
+        'cambios': serializador.filas(filas),
+        'eliminados': eliminados,
+        'siguiente': str(siguiente),
+        'hay_mas': hay_mas,
+    })
+
+@require_http_methods(["GET"])
+async def eventos_catalogo(request):
+    """
+    Eventos en vivo (Server-Sent Events) de altas, modificaciones, bajas y
+    stock. Con backend.asgi la petición no llega acá: la atiende
+    eventos.con_eventos sin reservar un hilo por cliente.
+    """
+    if not isinstance(request, ASGIRequest):
+        # Bajo WSGI cada conexión abierta ocuparía un hilo del servidor
+        return JsonResponse({'error': 'Los eventos en vivo requieren el servidor ASGI (backend.asgi)'}, status=501)
+    try:
+        # Al reconectarse, EventSource manda el id del último evento recibido
+        desde = cambios.parse_token(request.headers.get('Last-Event-ID') or request.GET.get('since'))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    try:
+        suscripcion = eventos.hub.suscribir()
+    except eventos.DemasiadosClientes:
+        return JsonResponse({'error': 'Demasiados clientes conectados; reintentar más tarde'}, status=503)
+
+    response = StreamingHttpResponse(eventos.Transmision(suscripcion, desde))
+    for nombre, valor in eventos.CABECERAS:
+        response[nombre.decode()] = valor.decode()
+    return response
+
+@require_http_methods(["GET"])
+def estadisticas_videojuegos(request):
+    """Totales de inventario por plataforma y género (de la tabla de resumen)"""
+    return serializadores.RespuestaJSON(estadisticas.resumen())
+
+@require_http_methods(["GET"])
+def facetas_videojuegos(request):
+    """Total y conteos por plataforma, género y en stock para los filtros pedidos"""
+    try:
+        filtros_facetas = filtros.parse_filtros_facetas(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return serializadores.RespuestaJSON(facetas.contar(**filtros_facetas))
+
+async def _cargar_detalle(id):
+    """Payload completo de un videojuego (None si no existe), desde el cache o la base"""
+    clave = cache.clave_detalle(id)
+    data = await cache.aobtener(clave)
+    if data is None:
+        fila = await Videojuego.objects.filter(id=id).values_list(*serializadores.CAMPOS).afirst()
+        if fila is None:
+            return None
+        data = serializadores.COMPLETO.fila(fila)
+        await cache.aguardar(clave, data)
+    return data
 
 @require_http_methods(["GET"])
-def obtener_videojuego(request, id):
+@condicional.condicion(etag_func=condicional.etag_detalle, last_modified_func=condicional.last_modified_detalle)
+async def obtener_videojuego(request, id):
     """Obtiene un videojuego por ID"""
     try:
-        videojuego = Videojuego.objects.get(id=id)
-        data = {
-            'id': videojuego.id,
-            'titulo': videojuego.titulo,
-            'descripcion': videojuego.descripcion,
-            'precio': str(videojuego.precio),
-            'stock': videojuego.stock,
-            'plataforma': videojuego.plataforma,
-            'genero': videojuego.genero,
-            'desarrollador': videojuego.desarrollador,
-            'fecha_lanzamiento': videojuego.fecha_lanzamiento.isoformat() if videojuego.fecha_lanzamiento else None,
-            'created_at': videojuego.created_at.isoformat(),
-            'updated_at': videojuego.updated_at.isoformat(),
-        }
-        return JsonResponse(data)
-    except Videojuego.DoesNotExist:
+        campos = serializadores.parse_campos(request.GET.get('fields'))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    data = await coalescencia.ejecutar(cache.clave_detalle(id), lambda: _cargar_detalle(id))
+    if data is None:
         return JsonResponse({'error': 'Videojuego no encontrado'}, status=404)
+    return serializadores.RespuestaJSON(serializadores.proyectar(data, campos))
+
+@require_http_methods(["GET"])
+def similares_videojuego(request, id):
+    """Videojuegos parecidos a uno (calculados por build_similares), del más al menos parecido"""
+    try:
+        campos = serializadores.parse_campos(request.GET.get('fields'))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    serializador = serializadores.Serializador(campos)
+    filas = similares.leer(id, serializador.columnas)
+    # Sin lista: puede que no exista o que todavía no se haya calculado
+    if not filas and not Videojuego.objects.filter(id=id).exists():
+        return JsonResponse({'error': 'Videojuego no encontrado'}, status=404)
+    resultados = []
+    for fila in filas:
+        data = serializador.fila(fila)
+        data['puntaje'] = round(fila[-1], 4)
+        resultados.append(data)
+    return serializadores.RespuestaJSON({'resultados': resultados})
+
+def _parse_ids(valor):
+    """Ids de `?ids=1,2,3` o de la lista del POST, sin repetir y en el orden pedido"""
+    if isinstance(valor, str):
+        valor = [parte.strip() for parte in valor.split(',') if parte.strip()]
+    if not isinstance(valor, list) or not valor:
+        raise ValueError('El parámetro ids debe ser una lista de ids enteros no vacía')
+    ids = []
+    for item in valor:
+        if isinstance(item, bool) or not isinstance(item, (int, str)):
+            raise ValueError('El parámetro ids debe ser una lista de ids enteros no vacía')
+        try:
+            ids.append(int(item))
+        except ValueError:
+            raise ValueError('El parámetro ids debe ser una lista de ids enteros no vacía')
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > settings.API_LIMITE_MAXIMO:
+        raise ValueError(f'Se admiten como máximo {settings.API_LIMITE_MAXIMO} ids por pedido')
+    return ids
+
+@csrf_exempt
+@require_http_methods(["GET", "POST", "OPTIONS"])
+def obtener_lote(request):
+    """Obtiene varios videojuegos por id en una sola petición (`?ids=1,2,3` o POST `{"ids": [...]}`)"""
+    # Manejar peticiones OPTIONS (preflight de CORS)
+    if request.method == 'OPTIONS':
+        response = JsonResponse({})
+        response['Access-Control-Allow-Origin'] = '*'
+        response['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
+        response['Access-Control-Allow-Headers'] = 'Content-Type, X-CSRFToken'
+        return response
+
+    try:
+        if request.method == 'POST':
+            data = json.loads(request.body)
+            ids = _parse_ids(data.get('ids') if isinstance(data, dict) else None)
+        else:
+            ids = _parse_ids(request.GET.get('ids', ''))
+        campos = serializadores.parse_campos(request.GET.get('fields'))
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'JSON inválido'}, status=400)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    # Lo que está en el cache de detalle no se vuelve a leer; el resto sale de
+    # una sola consulta y queda cacheado para el detalle y el próximo lote
+    detalles = cache.obtener_detalles(ids)
+    faltan = [id for id in ids if id not in detalles]
+    if faltan:
+        leidos = {
+            fila[0]: serializadores.COMPLETO.fila(fila)
+            for fila in Videojuego.objects.filter(id__in=faltan).values_list(*serializadores.CAMPOS)
+        }
+        cache.guardar_detalles(leidos)
+        detalles.update(leidos)
+    return serializadores.RespuestaJSON({
+        'resultados': [serializadores.proyectar(detalles[id], campos) for id in ids if id in detalles],
+        'faltantes': [id for id in ids if id not in detalles],
+    })
 
 @csrf_exempt
 @require_http_methods(["POST", "OPTIONS"])
-def crear_videojuego(request):
+async def crear_videojuego(request):
     """Crea un nuevo videojuego"""
     # Manejar peticiones OPTIONS (preflight de CORS)
     if request.method == 'OPTIONS':
@@ -126,122 +389,78 @@ def crear_videojuego(request):
     
     try:
         data = json.loads(request.body)
+        if not isinstance(data, dict):
+            return JsonResponse({'error': 'Se esperaba un objeto JSON'}, status=400)
         
-        # Validar datos
-        errores = validar_datos_videojuego(data, es_actualizacion=False)
+        # Validar y convertir los datos en una sola pasada
+        valores, errores = validacion.validar(data, es_actualizacion=False)
         if errores:
-            return JsonResponse({'error': '; '.join(errores)}, status=400)
-        
-        # Parsear fecha
-        fecha_lanzamiento = None
-        if data.get('fecha_lanzamiento'):
-            try:
-                fecha_lanzamiento = parse_fecha(data.get('fecha_lanzamiento'))
-            except ValueError as e:
-                return JsonResponse({'error': str(e)}, status=400)
+            return JsonResponse({'error': validacion.mensaje(errores), 'campos': errores}, status=400)
         
         # Crear videojuego
-        videojuego = Videojuego.objects.create(
-            titulo=data.get('titulo'),
-            descripcion=data.get('descripcion') or '',
-            precio=float(data.get('precio')),
-            stock=int(data.get('stock', 0)),
-            plataforma=data.get('plataforma', 'PC'),
-            genero=data.get('genero', 'ACCION'),
-            desarrollador=data.get('desarrollador') or '',
-            fecha_lanzamiento=fecha_lanzamiento
-        )
+        videojuego = await Videojuego.objects.acreate(**{**validacion.VALORES_POR_DEFECTO, **valores})
         
-        return JsonResponse({
-            'id': videojuego.id,
-            'titulo': videojuego.titulo,
-            'descripcion': videojuego.descripcion,
-            'precio': str(videojuego.precio),
-            'stock': videojuego.stock,
-            'plataforma': videojuego.plataforma,
-            'genero': videojuego.genero,
-            'desarrollador': videojuego.desarrollador,
-            'fecha_lanzamiento': videojuego.fecha_lanzamiento.isoformat() if videojuego.fecha_lanzamiento else None,
-            'created_at': videojuego.created_at.isoformat(),
-            'updated_at': videojuego.updated_at.isoformat(),
-        }, status=201)
+        return serializadores.RespuestaJSON(serializadores.serializar_videojuego(videojuego), status=201)
     except json.JSONDecodeError:
         return JsonResponse({'error': 'JSON inválido'}, status=400)
-    except Exception as e:
+    except Exception:
         return JsonResponse({'error': 'Error al crear el videojuego. Verifique los datos enviados.'}, status=400)
 
+def _actualizar(request, id, valores):
+    """Lectura con bloqueo, comparación de If-Match y escritura en una transacción"""
+    with transaction.atomic():
+        # La fila queda bloqueada hasta el commit, así la comparación de
+        # If-Match y la escritura no pueden intercalarse con otra edición.
+        videojuego = Videojuego.objects.select_for_update().get(id=id)
+        if not condicional.cumple_if_match(request, condicional.etag_videojuego(videojuego.id, videojuego.updated_at)):
+            return JsonResponse({'error': 'El videojuego fue modificado por otra petición. Recárguelo e intente de nuevo.'}, status=412)
+
+        # Actualizar campos solo si están presentes
+        for campo, valor in valores.items():
+            setattr(videojuego, campo, valor)
+
+        # Solo se escriben las columnas recibidas (más updated_at)
+        videojuego.save(update_fields=[*valores, 'updated_at'])
+
+    response = serializadores.RespuestaJSON(serializadores.serializar_videojuego(videojuego))
+    response['ETag'] = condicional.etag_videojuego(videojuego.id, videojuego.updated_at)
+    return response
+
 @csrf_exempt
 @require_http_methods(["PUT", "OPTIONS"])
-def actualizar_videojuego(request, id):
+async def actualizar_videojuego(request, id):
     """Actualiza un videojuego existente"""
     # Manejar peticiones OPTIONS (preflight de CORS)
     if request.method == 'OPTIONS':
         response = JsonResponse({})
         response['Access-Control-Allow-Origin'] = '*'
         response['Access-Control-Allow-Methods'] = 'PUT, OPTIONS'
-        response['Access-Control-Allow-Headers'] = 'Content-Type, X-CSRFToken'
+        response['Access-Control-Allow-Headers'] = 'Content-Type, X-CSRFToken, If-Match'
         return response
     
     try:
-        videojuego = Videojuego.objects.get(id=id)
         data = json.loads(request.body)
+        if not isinstance(data, dict):
+            return JsonResponse({'error': 'Se esperaba un objeto JSON'}, status=400)
         
-        # Validar datos
-        errores = validar_datos_videojuego(data, es_actualizacion=True)
+        # Validar y convertir los datos en una sola pasada
+        valores, errores = validacion.validar(data, es_actualizacion=True)
         if errores:
-            return JsonResponse({'error': '; '.join(errores)}, status=400)
-        
-        # Actualizar campos solo si están presentes
-        if 'titulo' in data:
-            videojuego.titulo = data.get('titulo')
-        if 'descripcion' in data:
-            videojuego.descripcion = data.get('descripcion') or ''
-        if 'precio' in data and data.get('precio') is not None:
-            videojuego.precio = float(data.get('precio'))
-        if 'stock' in data and data.get('stock') is not None:
-            videojuego.stock = int(data.get('stock'))
-        if 'plataforma' in data:
-            videojuego.plataforma = data.get('plataforma')
-        if 'genero' in data:
-            videojuego.genero = data.get('genero')
-        if 'desarrollador' in data:
-            videojuego.desarrollador = data.get('desarrollador') or ''
-        
-        # Manejar fecha_lanzamiento (permite establecer a null)
-        if 'fecha_lanzamiento' in data:
-            if data.get('fecha_lanzamiento') is None or data.get('fecha_lanzamiento') == '':
-                videojuego.fecha_lanzamiento = None
-            else:
-                try:
-                    videojuego.fecha_lanzamiento = parse_fecha(data.get('fecha_lanzamiento'))
-                except ValueError as e:
-                    return JsonResponse({'error': str(e)}, status=400)
+            return JsonResponse({'error': validacion.mensaje(errores), 'campos': errores}, status=400)
         
-        videojuego.save()
-        
-        return JsonResponse({
-            'id': videojuego.id,
-            'titulo': videojuego.titulo,
-            'descripcion': videojuego.descripcion,
-            'precio': str(videojuego.precio),
-            'stock': videojuego.stock,
-            'plataforma': videojuego.plataforma,
-            'genero': videojuego.genero,
-            'desarrollador': videojuego.desarrollador,
-            'fecha_lanzamiento': videojuego.fecha_lanzamiento.isoformat() if videojuego.fecha_lanzamiento else None,
-            'created_at': videojuego.created_at.isoformat(),
-            'updated_at': videojuego.updated_at.isoformat(),
-        })
+        # El ORM async todavía no admite transacciones: la parte transaccional
+        # corre en un hilo con sync_to_async.
+        return await sync_to_async(_actualizar)(request, id, valores)
     except Videojuego.DoesNotExist:
         return JsonResponse({'error': 'Videojuego no encontrado'}, status=404)
     except json.JSONDecodeError:
         return JsonResponse({'error': 'JSON inválido'}, status=400)
-    except Exception as e:
+    except Exception:
         return JsonResponse({'error': 'Error al actualizar el videojuego. Verifique los datos enviados.'}, status=400)
 
 @csrf_exempt
 @require_http_methods(["DELETE", "OPTIONS"])
-def eliminar_videojuego(request, id):
+async def eliminar_videojuego(request, id):
     """Elimina un videojuego"""
     # Manejar peticiones OPTIONS (preflight de CORS)
     if request.method == 'OPTIONS':
@@ -252,8 +471,186 @@ def eliminar_videojuego(request, id):
         return response
     
     try:
-        videojuego = Videojuego.objects.get(id=id)
-        videojuego.delete()
+        videojuego = await Videojuego.objects.aget(id=id)
+        await videojuego.adelete()
         return JsonResponse({'message': 'Videojuego eliminado correctamente'})
     except Videojuego.DoesNotExist:
         return JsonResponse({'error': 'Videojuego no encontrado'}, status=404)
+
+@csrf_exempt
+@require_http_methods(["POST", "PUT", "DELETE", "OPTIONS"])
+def videojuegos_bulk(request):
+    """Crea (o hace upsert por codigo_externo), actualiza o elimina videojuegos en lote"""
+    # Manejar peticiones OPTIONS (preflight de CORS)
+    if request.method == 'OPTIONS':
+        response = JsonResponse({})
+        response['Access-Control-Allow-Origin'] = '*'
+        response['Access-Control-Allow-Methods'] = 'POST, PUT, DELETE, OPTIONS'
+        response['Access-Control-Allow-Headers'] = 'Content-Type, X-CSRFToken'
+        return response
+    
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'JSON inválido'}, status=400)
+    
+    try:
+        if request.method == 'POST':
+            return JsonResponse(lotes.crear(data), status=201)
+        if request.method == 'PUT':
+            return JsonResponse(lotes.actualizar(data))
+        return JsonResponse(lotes.eliminar(data))
+    except lotes.ErrorLote as e:
+        return JsonResponse({'error': 'El lote contiene datos inválidos', 'errores': e.errores}, status=400)
+    except IntegrityError:
+        # Otra escritura tomó un codigo_externo del lote entre la validación y el UPDATE
+        return JsonResponse({'error': 'Un codigo_externo del lote ya está en uso; reintentar'}, status=409)
+
+def _parse_delta(valor):
+    """El delta de stock debe ser un entero distinto de cero dentro del rango de la columna"""
+    if isinstance(valor, bool) or not isinstance(valor, int) or valor == 0:
+        raise ValueError('El delta debe ser un entero distinto de cero')
+    if abs(valor) > validacion.STOCK_MAXIMO:
+        raise ValueError(f'El delta debe estar entre -{validacion.STOCK_MAXIMO} y {validacion.STOCK_MAXIMO}')
+    return valor
+
+@csrf_exempt
+@require_http_methods(["POST", "OPTIONS"])
+def ajustar_stock_videojuego(request, id):
+    """Suma o resta stock de forma atómica (delta negativo = venta/reserva)"""
+    # Manejar peticiones OPTIONS (preflight de CORS)
+    if request.method == 'OPTIONS':
+        response = JsonResponse({})
+        response['Access-Control-Allow-Origin'] = '*'
+        response['Access-Control-Allow-Methods'] = 'POST, OPTIONS'
+        response['Access-Control-Allow-Headers'] = 'Content-Type, X-CSRFToken'
+        return response
+    
+    try:
+        data = json.loads(request.body)
+        delta = _parse_delta(data.get('delta') if isinstance(data, dict) else None)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'JSON inválido'}, status=400)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    try:
+        stock = inventario.ajustar_stock(id, delta)
+    except Videojuego.DoesNotExist:
+        return JsonResponse({'error': 'Videojuego no encontrado'}, status=404)
+    except inventario.StockInsuficiente as e:
+        return JsonResponse({'error': 'Stock insuficiente', 'ids': e.ids}, status=409)
+    except inventario.StockExcedido as e:
+        return JsonResponse({'error': 'El stock resultante supera el máximo permitido', 'ids': e.ids}, status=400)
+    return JsonResponse({'id': id, 'stock': stock})
+
+@csrf_exempt
+@require_http_methods(["POST", "OPTIONS"])
+def ajustar_stock_lote(request):
+    """Aplica varios movimientos de stock (un carrito) todo-o-nada"""
+    # Manejar peticiones OPTIONS (preflight de CORS)
+    if request.method == 'OPTIONS':
+        response = JsonResponse({})
+        response['Access-Control-Allow-Origin'] = '*'
+        response['Access-Control-Allow-Methods'] = 'POST, OPTIONS'
+        response['Access-Control-Allow-Headers'] = 'Content-Type, X-CSRFToken'
+        return response
+    
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'JSON inválido'}, status=400)
+    if not isinstance(data, list) or not data:
+        return JsonResponse({'error': 'Se esperaba una lista de movimientos {id, delta} no vacía'}, status=400)
+    if len(data) > settings.API_BULK_MAX_ITEMS:
+        return JsonResponse({'error': f'El lote admite como máximo {settings.API_BULK_MAX_ITEMS} ítems'}, status=400)
+    
+    # Los movimientos repetidos de un mismo videojuego se suman
+    movimientos = {}
+    for item in data:
+        if not isinstance(item, dict) or isinstance(item.get('id'), bool) or not isinstance(item.get('id'), int):
+            return JsonResponse({'error': 'Cada movimiento debe tener un id entero'}, status=400)
+        try:
+            delta = _parse_delta(item.get('delta'))
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        movimientos[item['id']] = movimientos.get(item['id'], 0) + delta
+    movimientos = {id: delta for id, delta in movimientos.items() if delta}
+    # La suma de los movimientos repetidos también tiene que entrar en la columna
+    fuera_de_rango = sorted(id for id, delta in movimientos.items() if abs(delta) > validacion.STOCK_MAXIMO)
+    if fuera_de_rango:
+        return JsonResponse({'error': 'La suma de los deltas supera el máximo permitido', 'ids': fuera_de_rango}, status=400)
+    
+    try:
+        stocks = inventario.ajustar_stock_lote(movimientos) if movimientos else {}
+    except Videojuego.DoesNotExist as e:
+        return JsonResponse({'error': 'Videojuego no encontrado', 'ids': e.args[0]}, status=404)
+    except inventario.StockInsuficiente as e:
+        return JsonResponse({'error': 'Stock insuficiente', 'ids': e.ids}, status=409)
+    except inventario.StockExcedido as e:
+        return JsonResponse({'error': 'El stock resultante supera el máximo permitido', 'ids': e.ids}, status=400)
+    return JsonResponse([{'id': id, 'stock': stock} for id, stock in sorted(stocks.items())], safe=False)
+
+@csrf_exempt
+@require_http_methods(["POST", "OPTIONS"])
+def subir_portada(request, id):
+    """Recibe la portada (multipart, campo `portada`) y genera sus variantes"""
+    # Manejar peticiones OPTIONS (preflight de CORS)
+    if request.method == 'OPTIONS':
+        response = JsonResponse({})
+        response['Access-Control-Allow-Origin'] = '*'
+        response['Access-Control-Allow-Methods'] = 'POST, OPTIONS'
+        response['Access-Control-Allow-Headers'] = 'Content-Type, X-CSRFToken'
+        return response
+    
+    if not portadas.disponible():
+        return JsonResponse({'error': 'El procesamiento de imágenes no está disponible (falta Pillow)'}, status=503)
+    archivo = request.FILES.get('portada')
+    if archivo is None:
+        return JsonResponse({'error': 'Falta el archivo "portada"'}, status=400)
+    if archivo.size > settings.API_PORTADA_MAX_BYTES:
+        return JsonResponse({'error': f'La portada supera los {settings.API_PORTADA_MAX_BYTES} bytes'}, status=413)
+    
+    try:
+        videojuego = Videojuego.objects.get(pk=id)
+    except Videojuego.DoesNotExist:
+        return JsonResponse({'error': 'Videojuego no encontrado'}, status=404)
+    try:
+        portadas.guardar_portada(videojuego, archivo.read())
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return serializadores.RespuestaJSON(serializadores.serializar_videojuego(videojuego))
+
+@require_http_methods(["GET"])
+def exportar_metricas(request):
+    """Métricas de este proceso en formato de texto de Prometheus"""
+    token = settings.API_METRICAS_TOKEN
+    if token and not secrets.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return JsonResponse({'error': 'No autorizado'}, status=401)
+    return HttpResponse(metricas.exportar(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@require_http_methods(["GET", "HEAD"])
+def servir_estatico(request, ruta):
+    """Sirve STATIC_ROOT con la variante precomprimida (br/gzip) que acepte el cliente"""
+    try:
+        archivo, codificacion, original = estaticos.resolver(ruta, request.headers.get('Accept-Encoding', ''))
+    except FileNotFoundError:
+        raise Http404('Archivo estático no encontrado')
+
+    modificado = os.stat(original).st_mtime
+    if not was_modified_since(request.headers.get('If-Modified-Since'), modificado):
+        return HttpResponseNotModified()
+
+    content_type = mimetypes.guess_type(original)[0] or 'application/octet-stream'
+    if content_type.startswith('text/') or content_type == 'application/javascript':
+        content_type += '; charset=utf-8'
+    response = FileResponse(open(archivo, 'rb'), content_type=content_type, filename=os.path.basename(original))
+    if codificacion:
+        response.headers['Content-Encoding'] = codificacion
+    if estaticos.comprimible(original):
+        response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Last-Modified'] = http_date(modificado)
+    response.headers['Cache-Control'] = (
+        estaticos.CACHE_INMUTABLE if estaticos.tiene_huella(ruta) else estaticos.CACHE_REVALIDAR
+    )
+    return response
@@ -13,4 +13,10 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Los eventos en vivo (/api/eventos/) se atienden antes de Django: cada
+# conexión abierta no ocupa un hilo ni una conexión a la base
+from api.eventos import con_eventos  # noqa: E402
+
+application = con_eventos(django_application)
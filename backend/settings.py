@@ -43,6 +43,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero, para que el tiempo medido incluya al resto de los middlewares
+    'api.middleware.medir_peticiones',
+    # Antes que el resto: comprime la respuesta ya terminada
+    'api.middleware.ComprimirRespuestas',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -87,6 +91,110 @@ DATABASES = {
     }
 }
 
+# Conexiones
+#
+# PostgreSQL: pool de conexiones de psycopg 3 (DB_POOL, activo por defecto),
+# así cada petición toma una conexión ya abierta en vez de pagar conexión TCP
+# y autenticación. Con el pool desactivado se usan conexiones persistentes
+# (DB_CONN_MAX_AGE segundos); en ambos casos se verifica la conexión antes de
+# reutilizarla. Bajo ASGI conviene el pool (o DB_CONN_MAX_AGE=0): las
+# conexiones persistentes son por hilo y las vistas async no reutilizan hilos
+# entre peticiones.
+#
+# SQLite: WAL (lectores y un escritor a la vez), synchronous=NORMAL (seguro
+# con WAL), espera de DB_SQLITE_BUSY_TIMEOUT ms ante bloqueos en vez de fallar,
+# lectura por mmap, y transacciones IMMEDIATE para que una transacción que lee
+# y luego escribe no falle con "database is locked" al pedir el bloqueo.
+if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+    if config('DB_POOL', default=True, cast=bool):
+        DATABASES['default']['OPTIONS'] = {
+            'pool': {
+                'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+                'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+                'timeout': config('DB_POOL_TIMEOUT', default=10, cast=float),
+            },
+        }
+    else:
+        DATABASES['default']['CONN_MAX_AGE'] = config('DB_CONN_MAX_AGE', default=60, cast=int)
+
+elif DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['default']['CONN_MAX_AGE'] = config('DB_CONN_MAX_AGE', default=60, cast=int)
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+    DATABASES['default']['OPTIONS'] = {
+        'transaction_mode': 'IMMEDIATE',
+        'init_command': ';'.join([
+            'PRAGMA journal_mode=WAL',
+            'PRAGMA synchronous=NORMAL',
+            f"PRAGMA busy_timeout={config('DB_SQLITE_BUSY_TIMEOUT', default=5000, cast=int)}",
+            f"PRAGMA mmap_size={config('DB_SQLITE_MMAP_SIZE', default=128 * 1024 * 1024, cast=int)}",
+            'PRAGMA cache_size=-20000',
+            'PRAGMA temp_store=MEMORY',
+        ]),
+    }
+    # La base de tests por defecto vive en memoria y no admite varias
+    # conexiones a la vez; con un archivo, los tests de concurrencia pueden
+    # abrir una conexión por hilo.
+    DATABASES['default']['TEST'] = {'NAME': str(BASE_DIR / 'test_db.sqlite3')}
+    # Segundo archivo, sin replicación, para probar el ruteo a réplicas contra
+    # una base real (api.tests.ReplicasSQLiteTests). Solo lo abre quien lo
+    # pida por alias: no está en DATABASE_REPLICAS ni lo migra `migrate`.
+    DATABASES['replica_pruebas'] = {
+        **DATABASES['default'],
+        'NAME': str(BASE_DIR / 'replica_pruebas.sqlite3'),
+        'TEST': {'NAME': str(BASE_DIR / 'test_replica_pruebas.sqlite3')},
+    }
+
+# Réplicas de lectura (DB_REPLICAS, separadas por coma): con PostgreSQL cada
+# una es HOST[:PORT] con el mismo nombre y credenciales que la primaria; con
+# SQLite es la ruta de otro archivo (útil para probar el ruteo en local).
+# Las lecturas van a las réplicas y las escrituras a `default`; quien acaba
+# de escribir lee de la primaria durante API_REPLICA_FIJACION_SEGUNDOS.
+DATABASE_REPLICAS = []
+for numero, replica in enumerate(config('DB_REPLICAS', default='', cast=Csv()), start=1):
+    alias = f'replica{numero}'
+    DATABASES[alias] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+    if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+        DATABASES[alias]['NAME'] = str(BASE_DIR / replica)
+    else:
+        host, _, port = replica.partition(':')
+        DATABASES[alias].update(HOST=host, PORT=port or DATABASES['default']['PORT'])
+    DATABASE_REPLICAS.append(alias)
+
+API_REPLICA_FIJACION_SEGUNDOS = config('API_REPLICA_FIJACION_SEGUNDOS', default=5, cast=int)
+
+if DATABASE_REPLICAS:
+    DATABASE_ROUTERS = ['api.replicas.RouterReplicas']
+    MIDDLEWARE.append('api.middleware.fijar_primaria')
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+#
+# 'catalogo' guarda las respuestas de lectura de la API. Por defecto es un
+# LocMemCache acotado (LRU: al llenarse desaloja la décima parte menos usada);
+# se puede apuntar a Redis/Memcached cambiando el backend y la ubicación.
+
+CACHE_CATALOGO_BACKEND = config('CACHE_CATALOGO_BACKEND', default='django.core.cache.backends.locmem.LocMemCache')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'default',
+    },
+    'catalogo': {
+        'BACKEND': CACHE_CATALOGO_BACKEND,
+        'LOCATION': config('CACHE_CATALOGO_LOCATION', default='catalogo'),
+        'TIMEOUT': config('CACHE_CATALOGO_TIMEOUT', default=300, cast=int),
+    },
+}
+
+if CACHE_CATALOGO_BACKEND.endswith('LocMemCache'):
+    CACHES['catalogo']['OPTIONS'] = {
+        'MAX_ENTRIES': config('CACHE_CATALOGO_MAX_ENTRIES', default=5000, cast=int),
+        'CULL_FREQUENCY': 10,
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -124,6 +232,27 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
+# Destino de `manage.py build_estaticos` (collectstatic + precompresión)
+STATIC_ROOT = config('STATIC_ROOT', default=str(BASE_DIR / 'staticfiles'))
+
+# Con ESTATICOS_CON_HUELLA los estáticos se publican como nombre.<hash>.ext;
+# requiere haber corrido build_estaticos (el template busca los nombres en
+# el manifiesto). Con ESTATICOS_SERVIR, Django sirve STATIC_ROOT con las
+# variantes .br/.gz y cache inmutable (sin un servidor web delante).
+ESTATICOS_CON_HUELLA = config('ESTATICOS_CON_HUELLA', default=False, cast=bool)
+ESTATICOS_SERVIR = config('ESTATICOS_SERVIR', default=False, cast=bool)
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {
+        'BACKEND': 'api.estaticos.AlmacenEstaticos' if ESTATICOS_CON_HUELLA
+        else 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+# Archivos subidos (portadas). En DEBUG los sirve Django; en producción,
+# el servidor web que tenga delante.
+MEDIA_URL = 'media/'
+MEDIA_ROOT = config('MEDIA_ROOT', default=str(BASE_DIR / 'media'))
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -136,3 +265,75 @@ CORS_ALLOW_CREDENTIALS = True
 
 # CSRF settings
 CSRF_TRUSTED_ORIGINS = config('CSRF_TRUSTED_ORIGINS', default='http://localhost:8000,http://127.0.0.1:8000', cast=Csv())
+
+# Paginación del catálogo
+API_LIMITE_PAGINA = config('API_LIMITE_PAGINA', default=50, cast=int)
+API_LIMITE_MAXIMO = config('API_LIMITE_MAXIMO', default=500, cast=int)
+API_LIMITE_BUSQUEDA = config('API_LIMITE_BUSQUEDA', default=20, cast=int)
+API_STREAM_CHUNK_SIZE = config('API_STREAM_CHUNK_SIZE', default=2000, cast=int)
+# Videojuegos que la página principal trae ya renderizados (el resto lo pide app.js)
+API_INICIO_FILAS = config('API_INICIO_FILAS', default=50, cast=int)
+
+# Operaciones en lote
+API_BULK_MAX_ITEMS = config('API_BULK_MAX_ITEMS', default=10000, cast=int)
+API_BULK_BATCH_SIZE = config('API_BULK_BATCH_SIZE', default=1000, cast=int)
+
+# Estadísticas de inventario: un videojuego cuenta como "stock bajo" con
+# stock <= este umbral. Si se cambia, hay que correr recompute_estadisticas.
+API_UMBRAL_STOCK_BAJO = config('API_UMBRAL_STOCK_BAJO', default=5, cast=int)
+
+# Métricas (/metrics) y log de peticiones lentas (logger "api.lentas").
+# Con API_METRICAS_TOKEN, /metrics exige "Authorization: Bearer <token>".
+API_UMBRAL_LENTA_MS = config('API_UMBRAL_LENTA_MS', default=500, cast=int)
+API_METRICAS_TOKEN = config('API_METRICAS_TOKEN', default='')
+
+# Las respuestas de texto (JSON, HTML...) de al menos este tamaño se envían con
+# gzip si el cliente lo acepta; las de streaming, siempre. Por debajo de un
+# segmento TCP comprimir no ahorra viajes de red.
+API_GZIP_MINIMO_BYTES = config('API_GZIP_MINIMO_BYTES', default=1400, cast=int)
+
+# Portadas: anchos de las variantes (nunca se agranda el original), procesos
+# del pool que las genera (0 = uno por CPU) y tamaño máximo de subida.
+API_PORTADA_ANCHOS = config('API_PORTADA_ANCHOS', default='160,320,640,1280', cast=Csv(int))
+API_PORTADA_PROCESOS = config('API_PORTADA_PROCESOS', default=0, cast=int)
+API_PORTADA_MAX_BYTES = config('API_PORTADA_MAX_BYTES', default=10 * 1024 * 1024, cast=int)
+
+# Feed de cambios (/api/videojuegos/cambios/): compactar_cambios descarta por
+# defecto lo que tenga más de API_CAMBIOS_RETENCION_DIAS. El margen deja fuera
+# del feed los cambios de los últimos segundos, que en PostgreSQL pueden
+# confirmarse fuera de orden; SQLite serializa las escrituras y no lo necesita.
+API_CAMBIOS_RETENCION_DIAS = config('API_CAMBIOS_RETENCION_DIAS', default=30, cast=int)
+API_CAMBIOS_MARGEN_SEGUNDOS = config(
+    'API_CAMBIOS_MARGEN_SEGUNDOS',
+    default=0 if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3' else 2,
+    cast=float,
+)
+
+# Eventos en vivo (/api/eventos/, solo con ASGI). El backend por defecto reparte
+# los eventos dentro de cada proceso; con varios workers sobre PostgreSQL,
+# api.eventos.BackendPostgres los comparte con LISTEN/NOTIFY. Cada cliente
+# tiene una cola de API_EVENTOS_COLA eventos: si se llena, se le pide que se
+# sincronice con el feed de cambios.
+API_EVENTOS_BACKEND = config('API_EVENTOS_BACKEND', default='api.eventos.BackendLocal')
+API_EVENTOS_COLA = config('API_EVENTOS_COLA', default=100, cast=int)
+API_EVENTOS_MAX_CLIENTES = config('API_EVENTOS_MAX_CLIENTES', default=10000, cast=int)
+API_EVENTOS_LATIDO_SEGUNDOS = config('API_EVENTOS_LATIDO_SEGUNDOS', default=15, cast=float)
+
+# Admin de videojuegos para catálogos grandes: en PostgreSQL, por debajo de
+# esta estimación del planificador se cuenta exacto; la búsqueda del admin
+# usa el índice de texto completo y muestra a lo sumo este límite de resultados.
+API_ADMIN_CONTEO_EXACTO_HASTA = config('API_ADMIN_CONTEO_EXACTO_HASTA', default=10000, cast=int)
+API_ADMIN_BUSQUEDA_LIMITE = config('API_ADMIN_BUSQUEDA_LIMITE', default=1000, cast=int)
+
+# Índice de facetas en memoria (/api/videojuegos/facetas/): cantidad de
+# cambios que se aplican sobre el índice de cada proceso antes de reconstruirlo
+# completo (también al ponerse al día con el feed de cambios).
+API_FACETAS_MAXIMO_INCREMENTAL = config('API_FACETAS_MAXIMO_INCREMENTAL', default=10000, cast=int)
+
+# Videojuegos similares (/api/videojuegos/<id>/similares/, comando
+# build_similares): vecinos guardados por videojuego, memoria (MB) de la
+# matriz de puntajes de cada tramo y cantidad de cambios del feed que se
+# aplican de forma incremental antes de recalcular todo el catálogo.
+API_SIMILARES_CANTIDAD = config('API_SIMILARES_CANTIDAD', default=10, cast=int)
+API_SIMILARES_MEMORIA_MB = config('API_SIMILARES_MEMORIA_MB', default=256, cast=int)
+API_SIMILARES_MAXIMO_INCREMENTAL = config('API_SIMILARES_MAXIMO_INCREMENTAL', default=10000, cast=int)
@@ -15,11 +15,21 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
-from django.views.generic import TemplateView
+from django.conf import settings
+from django.conf.urls.static import static
+from django.urls import path, include, re_path
+
+from api.views import exportar_metricas, inicio, servir_estatico
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
-    path('', TemplateView.as_view(template_name='index.html'), name='home'),
+    path('metrics', exportar_metricas, name='metricas'),
+    path('', inicio, name='home'),
 ]
+
+if settings.ESTATICOS_SERVIR:
+    urlpatterns.insert(0, re_path(r'^static/(?P<ruta>.+)$', servir_estatico, name='estaticos'))
+
+# En desarrollo Django sirve las portadas subidas (static() no hace nada sin DEBUG)
+urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,107 @@
+"""
+Prueba de carga HTTP contra un servidor ya levantado.
+
+Abre `--clientes` conexiones keep-alive concurrentes (asyncio, sin
+dependencias externas) que repiten GET a las URLs indicadas durante
+`--duracion` segundos, y reporta peticiones por segundo y latencias p50/p99.
+Sirve para comparar el mismo proyecto servido por WSGI y por ASGI:
+
+    gunicorn backend.wsgi -w 4 --threads 32 -b 127.0.0.1:8001
+    uvicorn backend.asgi:application --workers 4 --port 8002
+
+    python -m benchmarks.carga --url http://127.0.0.1:8001/api/videojuegos/ --clientes 500
+    python -m benchmarks.carga --url http://127.0.0.1:8002/api/videojuegos/ --clientes 500
+
+El generador corre en un solo proceso: con muchos clientes puede ser él el
+cuello de botella, conviene ejecutarlo en otra máquina o con menos clientes
+para confirmar que el límite está del lado del servidor.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+
+async def _leer_respuesta(lector):
+    """Lee una respuesta HTTP/1.1 completa y devuelve el código de estado"""
+    estado = int((await lector.readline()).split()[1])
+    largo, chunked = 0, False
+    while (linea := await lector.readline()) not in (b'\r\n', b''):
+        nombre, _, valor = linea.decode('latin-1').partition(':')
+        nombre = nombre.strip().lower()
+        if nombre == 'content-length':
+            largo = int(valor)
+        elif nombre == 'transfer-encoding' and 'chunked' in valor.lower():
+            chunked = True
+    if chunked:
+        while (tamano := int((await lector.readline()).strip(), 16)):
+            await lector.readexactly(tamano + 2)
+        await lector.readline()
+    elif largo:
+        await lector.readexactly(largo)
+    return estado
+
+
+async def _cliente(urls, fin, latencias, errores, indice):
+    conexion = None
+    while time.perf_counter() < fin:
+        url = urls[indice % len(urls)]
+        indice += 1
+        partes = urlsplit(url)
+        ruta = partes.path + (f'?{partes.query}' if partes.query else '')
+        try:
+            if conexion is None:
+                conexion = await asyncio.open_connection(partes.hostname, partes.port or 80)
+            lector, escritor = conexion
+            inicio = time.perf_counter()
+            escritor.write(f'GET {ruta} HTTP/1.1\r\nHost: {partes.netloc}\r\nConnection: keep-alive\r\n\r\n'.encode())
+            await escritor.drain()
+            estado = await _leer_respuesta(lector)
+            latencias.append(time.perf_counter() - inicio)
+            if estado >= 400:
+                errores.append(estado)
+        except (OSError, ValueError, IndexError, asyncio.IncompleteReadError) as e:
+            errores.append(type(e).__name__)
+            if conexion is not None:
+                conexion[1].close()
+            conexion = None
+            await asyncio.sleep(0.01)
+    if conexion is not None:
+        conexion[1].close()
+
+
+async def _correr(urls, clientes, duracion):
+    latencias, errores = [], []
+    inicio = time.perf_counter()
+    fin = inicio + duracion
+    await asyncio.gather(*(_cliente(urls, fin, latencias, errores, i) for i in range(clientes)))
+    return latencias, errores, time.perf_counter() - inicio
+
+
+def _percentil(ordenadas, p):
+    return ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * p))] if ordenadas else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--url', action='append', required=True,
+                        help='URL a pedir (se puede repetir; los clientes las alternan)')
+    parser.add_argument('--clientes', type=int, default=500, help='Conexiones concurrentes')
+    parser.add_argument('--duracion', type=float, default=10, help='Segundos de carga')
+    args = parser.parse_args()
+
+    latencias, errores, total = asyncio.run(_correr(args.url, args.clientes, args.duracion))
+    ordenadas = sorted(latencias)
+    print(f'{len(latencias):>9,} peticiones en {total:.1f} s ({args.clientes} clientes)')
+    print(f'{len(latencias) / total:>9,.0f} peticiones/s')
+    if ordenadas:
+        print(f'{statistics.mean(ordenadas) * 1000:>9.1f} ms promedio')
+        print(f'{_percentil(ordenadas, 0.50) * 1000:>9.1f} ms p50')
+        print(f'{_percentil(ordenadas, 0.99) * 1000:>9.1f} ms p99')
+    if errores:
+        print(f'{len(errores):>9,} errores ({", ".join(sorted({str(e) for e in errores}))})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Latencia por petición según cómo se manejan las conexiones a la base.
+
+Cada petición pasa por el cliente de pruebas y al terminar se llama a
+close_old_connections(), igual que hace Django con la señal request_finished
+en un servidor real. Se comparan, sobre la base configurada:
+
+- SQLite: conexión nueva por petición sin ajustes, conexión nueva por
+  petición con los PRAGMAs de settings, y conexión persistente con PRAGMAs.
+- PostgreSQL: conexión nueva por petición, conexión persistente
+  (CONN_MAX_AGE) y pool de psycopg 3.
+
+    python -m benchmarks.conexiones [--peticiones 2000]
+    DB_ENGINE=django.db.backends.postgresql DB_NAME=... python -m benchmarks.conexiones
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks import entorno
+
+
+def _escenarios(settings_dict):
+    opciones = settings_dict.get('OPTIONS', {})
+    if settings_dict['ENGINE'] == 'django.db.backends.postgresql':
+        pool = opciones.get('pool') or True
+        return [
+            ('conexión nueva por petición', {'CONN_MAX_AGE': 0, 'OPTIONS': {}}),
+            ('CONN_MAX_AGE=60', {'CONN_MAX_AGE': 60, 'OPTIONS': {}}),
+            ('pool de psycopg', {'CONN_MAX_AGE': 0, 'OPTIONS': {'pool': pool}}),
+        ]
+    return [
+        ('conexión nueva, sin PRAGMAs', {'CONN_MAX_AGE': 0, 'OPTIONS': {}}),
+        ('conexión nueva, con PRAGMAs', {'CONN_MAX_AGE': 0, 'OPTIONS': opciones}),
+        ('CONN_MAX_AGE=60, con PRAGMAs', {'CONN_MAX_AGE': 60, 'OPTIONS': opciones}),
+    ]
+
+
+def _configurar_conexion(connection, cambios):
+    connection.close()
+    if getattr(connection, 'pool', None):
+        connection.close_pool()
+    connection.settings_dict.update(cambios)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--peticiones', type=int, default=2000)
+    parser.add_argument('--url', default='/api/videojuegos/estadisticas/',
+                        help='Endpoint a pedir (por defecto uno de una sola consulta)')
+    args = parser.parse_args()
+
+    entorno.configurar()
+    from django.db import close_old_connections
+    from django.test import Client
+
+    client = Client()
+    with entorno.base_de_prueba() as connection:
+        entorno.poblar(1000)
+        original = {clave: connection.settings_dict.get(clave) for clave in ('CONN_MAX_AGE', 'OPTIONS')}
+        print(f'Motor: {connection.vendor}  ({args.peticiones} peticiones a {args.url})')
+        print(f'{"escenario":<32}  {"promedio":>9}  {"p50":>9}  {"p99":>9}')
+        try:
+            for nombre, cambios in _escenarios(connection.settings_dict):
+                _configurar_conexion(connection, cambios)
+                latencias = []
+                for _ in range(args.peticiones):
+                    inicio = time.perf_counter()
+                    client.get(args.url)
+                    close_old_connections()
+                    latencias.append(time.perf_counter() - inicio)
+                latencias.sort()
+                print(
+                    f'{nombre:<32}  {statistics.mean(latencias) * 1000:>7.3f}ms  '
+                    f'{latencias[len(latencias) // 2] * 1000:>7.3f}ms  '
+                    f'{latencias[int(len(latencias) * 0.99)] * 1000:>7.3f}ms'
+                )
+        finally:
+            _configurar_conexion(connection, original)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Entorno compartido por los benchmarks.
+
+Cada benchmark se ejecuta como módulo desde la raíz del proyecto
+(`python -m benchmarks.<nombre>`) contra una base de datos de prueba
+descartable, igual que la que crea `manage.py test`.
+"""
+import os
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+
+import django
+
+
+def configurar():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+    django.setup()
+
+
+@contextmanager
+def base_de_prueba():
+    """Crea la base de prueba (migrada) y la elimina al terminar"""
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    nombre_original = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(nombre_original, verbosity=0)
+        teardown_test_environment()
+
+
+def poblar(cantidad, lote=5000):
+    """Inserta `cantidad` videojuegos simples en lotes"""
+    from api.models import Videojuego
+
+    plataformas = [codigo for codigo, _ in Videojuego.PLATAFORMAS]
+    generos = [codigo for codigo, _ in Videojuego.GENEROS]
+    existentes = Videojuego.objects.count()
+    for inicio in range(existentes, cantidad, lote):
+        Videojuego.objects.bulk_create([
+            Videojuego(
+                titulo=f'Juego {i}',
+                descripcion=f'Descripción del juego número {i}',
+                precio=Decimal(i % 9000) / 100,
+                stock=i % 50,
+                plataforma=plataformas[i % len(plataformas)],
+                genero=generos[i % len(generos)],
+                desarrollador=f'Estudio {i % 200}',
+            )
+            for i in range(inicio, min(inicio + lote, cantidad))
+        ])
+
+
+def medir(funcion, repeticiones=3):
+    """Mejor tiempo (segundos) de varias ejecuciones de `funcion`"""
+    mejor = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        duracion = time.perf_counter() - inicio
+        mejor = duracion if mejor is None else min(mejor, duracion)
+    return mejor
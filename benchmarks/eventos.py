@@ -0,0 +1,132 @@
+"""
+Memoria por conexión SSE inactiva y tiempo de reparto de un evento.
+
+Abre N conexiones a /api/eventos/ directamente contra la aplicación ASGI
+(sin servidor HTTP, así que no cuenta los buffers de uvicorn ni los sockets),
+espera a que todas estén suscriptas y mide con tracemalloc la memoria que
+retienen. Después da de alta un videojuego y mide cuánto tarda el evento en
+llegar a todas las conexiones.
+
+Se compara backend.asgi (con_eventos atiende la ruta) con la aplicación de
+Django sin envolver (la vista eventos_catalogo); en la segunda, además de lo
+que mide tracemalloc, cada conexión retiene un hilo del sistema y una
+conexión a la base.
+
+    python -m benchmarks.eventos [--clientes 2000]
+"""
+import argparse
+import asyncio
+import gc
+import logging
+import time
+import tracemalloc
+
+from benchmarks import entorno
+
+SCOPE = {
+    'type': 'http',
+    'asgi': {'version': '3.0'},
+    'http_version': '1.1',
+    'method': 'GET',
+    'scheme': 'http',
+    'path': '/api/eventos/',
+    'raw_path': b'/api/eventos/',
+    'query_string': b'',
+    'root_path': '',
+    'headers': [(b'host', b'testserver'), (b'accept', b'text/event-stream')],
+    'client': ('127.0.0.1', 50000),
+    'server': ('testserver', 80),
+}
+
+
+async def _cliente(application, desconectar, abiertas, llegadas):
+    """Una conexión SSE que no hace nada hasta que se le pide desconectarse"""
+    pedido = False
+
+    async def receive():
+        nonlocal pedido
+        if not pedido:
+            pedido = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await desconectar.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(mensaje):
+        if mensaje['type'] == 'http.response.start' and mensaje['status'] != 200:
+            raise RuntimeError(f'/api/eventos/ respondió {mensaje["status"]}')
+        if mensaje['type'] != 'http.response.body':
+            return
+        if mensaje['body'].startswith(b'retry:'):
+            abiertas.append(1)
+        elif b'event: videojuego' in mensaje['body']:
+            llegadas.append(time.perf_counter())
+
+    await application(dict(SCOPE), receive, send)
+
+
+async def _esperar(condicion, limite=120):
+    inicio = time.perf_counter()
+    while not condicion():
+        if time.perf_counter() - inicio > limite:
+            raise TimeoutError
+        await asyncio.sleep(0.01)
+
+
+async def _medir(application, clientes):
+    from asgiref.sync import sync_to_async
+
+    from api import eventos
+    from api.models import Videojuego
+
+    desconectar = asyncio.Event()
+    abiertas, llegadas = [], []
+
+    gc.collect()
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    inicio = time.perf_counter()
+    tareas = [asyncio.create_task(_cliente(application, desconectar, abiertas, llegadas)) for _ in range(clientes)]
+    # Cada conexión ya está suscripta y esperando en su cola
+    await _esperar(lambda: len(abiertas) == clientes)
+    apertura = time.perf_counter() - inicio
+    gc.collect()
+    despues = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    inicio = time.perf_counter()
+    await sync_to_async(Videojuego.objects.create)(titulo='Evento', precio='1.00')
+    await _esperar(lambda: len(llegadas) == clientes)
+    reparto = time.perf_counter() - inicio
+
+    desconectar.set()
+    await asyncio.gather(*tareas)
+    return (despues - antes) / clientes, apertura, reparto, eventos.hub.clientes()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--clientes', type=int, default=2000)
+    args = parser.parse_args()
+
+    entorno.configurar()
+    # Abrir miles de conexiones a la vez supera el umbral de peticiones lentas
+    logging.getLogger('api.lentas').setLevel(logging.ERROR)
+    from backend.asgi import application, django_application
+
+    print(f'{args.clientes} conexiones inactivas')
+    print(f'{"aplicación":<22}  {"apertura":>9}  {"memoria/conexión":>16}  {"total":>9}  {"reparto":>9}')
+    with entorno.base_de_prueba():
+        for nombre, aplicacion in (('backend.asgi', application), ('Django sin envolver', django_application)):
+            # Una ronda corta antes: imports y caches que se cargan una sola vez
+            asyncio.run(_medir(aplicacion, 10))
+            por_cliente, apertura, reparto, restantes = asyncio.run(_medir(aplicacion, args.clientes))
+            if restantes:
+                raise RuntimeError(f'{restantes} suscripciones quedaron abiertas tras desconectar')
+            print(
+                f'{nombre:<22}  {apertura:>7.2f} s  {por_cliente / 1024:>12.1f} KiB  '
+                f'{por_cliente * args.clientes / 1024 / 1024:>5.1f} MiB  {reparto * 1000:>6.1f} ms'
+            )
+
+
+if __name__ == '__main__':
+    main()
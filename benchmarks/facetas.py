@@ -0,0 +1,90 @@
+"""
+Conteos de facetas: índice en memoria contra GROUP BY en la base.
+
+Para cada combinación de filtros compara api.facetas.contar (índice ya
+construido, calculando y con la combinación ya memorizada) con lo que costaría resolver lo mismo en la base: un COUNT para el
+total, un GROUP BY por plataforma, otro por género y un COUNT de en stock, cada
+uno sin el filtro de su propia faceta. Informa además cuánto tarda en
+construirse el índice, cuánto ocupan sus arrays y bitmaps y cuánto cuesta
+aplicarle cambios.
+
+    python -m benchmarks.facetas [--filas 100000 1000000]
+"""
+import argparse
+import sys
+import time
+
+from benchmarks import entorno
+
+COMBINACIONES = {
+    'sin filtros': {},
+    'PS5': {'plataforma': 'PS5'},
+    'PS5+SWITCH, RPG, stock': {'plataforma': 'PS5,SWITCH', 'genero': 'RPG', 'en_stock': 'true'},
+    'precio 10-30': {'precio_min': '10', 'precio_max': '30'},
+    'RPG, precio <= 20': {'genero': 'RPG', 'precio_max': '20'},
+}
+
+
+def _en_la_base(Videojuego, filtros, params):
+    from django.db.models import Count
+
+    def sin(nombre):
+        return filtros.filtrar_videojuegos(Videojuego.objects.order_by(), {**params, nombre: ''})
+
+    return {
+        'total': filtros.filtrar_videojuegos(Videojuego.objects.all(), params).count(),
+        'plataforma': dict(sin('plataforma').values_list('plataforma').annotate(Count('id'))),
+        'genero': dict(sin('genero').values_list('genero').annotate(Count('id'))),
+        'en_stock': sin('en_stock').filter(stock__gt=0).count(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--filas', type=int, nargs='+', default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    entorno.configurar()
+    from api import cache, facetas, filtros
+    from api.models import Videojuego
+
+    with entorno.base_de_prueba():
+        for cantidad in sorted(args.filas):
+            entorno.poblar(cantidad)
+            facetas.reiniciar()
+            version = cache.version_catalogo()
+
+            inicio = time.perf_counter()
+            indice = facetas.Indice.construir(version)
+            construccion = time.perf_counter() - inicio
+            facetas._indice = indice
+            columnas = (indice.ids, indice.plataforma, indice.genero, indice.precio, indice.con_stock, indice.por_id)
+            memoria = sum(columna.buffer_info()[1] * columna.itemsize for columna in columnas)
+            memoria += sum(sys.getsizeof(bitmap) for bitmap in indice.bitmaps.values())
+
+            print(f'{cantidad:,} videojuegos: índice construido en {construccion:.2f} s, {memoria / 1024 / 1024:.1f} MiB')
+            print(f'  {"filtros":<24}  {"GROUP BY":>10}  {"índice":>10}  {"mejora":>7}  {"memorizado":>10}')
+            for nombre, params in COMBINACIONES.items():
+                parametros = filtros.parse_filtros_facetas(params)
+                esperado = _en_la_base(Videojuego, filtros, params)
+                obtenido = facetas.contar(**parametros)
+                if obtenido['total'] != esperado['total'] or obtenido['en_stock'] != esperado['en_stock']:
+                    raise RuntimeError(f'Conteos distintos para {nombre}: {obtenido} != {esperado}')
+                en_base = entorno.medir(lambda: _en_la_base(Videojuego, filtros, params))
+                en_indice = entorno.medir(lambda: indice._contar(**parametros), repeticiones=20)
+                memorizado = entorno.medir(lambda: facetas.contar(**parametros), repeticiones=20)
+                print(
+                    f'  {nombre:<24}  {en_base * 1000:>7.1f} ms  {en_indice * 1e6:>7.0f} µs  {en_base / en_indice:>6.0f}x'
+                    f'  {memorizado * 1e6:>7.1f} µs'
+                )
+
+            filas = list(facetas._filas(Videojuego.objects.order_by('id')[:1000]))
+            cambiadas = [(id, plataforma, genero, centavos + 100, stock) for id, plataforma, genero, centavos, stock in filas]
+            for cantidad_cambios in (1, 1000):
+                inicio = time.perf_counter()
+                indice.aplicar(cambiadas[:cantidad_cambios], [])
+                print(f'  aplicar {cantidad_cambios} cambios de precio: {(time.perf_counter() - inicio) * 1000:.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
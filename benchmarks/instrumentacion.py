@@ -0,0 +1,80 @@
+"""
+Costo de la instrumentación de peticiones (api.middleware.medir_peticiones).
+
+Mide, en microsegundos por operación:
+
+- una vista trivial llamada directamente y envuelta por el middleware
+  (Medicion, ContextVar, registro en el histograma y Server-Timing);
+- una consulta SQL simple con y sin el execute_wrapper de métricas.
+
+La diferencia es lo que agrega la instrumentación a cada petición y a cada
+consulta; el objetivo es quedar muy por debajo de 50 µs por petición.
+
+    python -m benchmarks.instrumentacion [--repeticiones 20000]
+"""
+import argparse
+import time
+
+from benchmarks import entorno
+
+
+def _por_operacion(funcion, repeticiones):
+    """Mejor de 5 rondas, en microsegundos por llamada"""
+    mejor = float('inf')
+    for _ in range(5):
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor / repeticiones * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeticiones', type=int, default=20000)
+    args = parser.parse_args()
+
+    entorno.configurar()
+    from django.http import HttpResponse
+    from django.test import RequestFactory
+
+    from api import metricas
+    from api.middleware import medir_peticiones
+
+    respuesta = b'{"ok": true}'
+
+    def vista(request):
+        return HttpResponse(respuesta, content_type='application/json')
+
+    request = RequestFactory().get('/api/videojuegos/')
+    instrumentada = medir_peticiones(vista)
+
+    sin = _por_operacion(lambda: vista(request), args.repeticiones)
+    con = _por_operacion(lambda: instrumentada(request), args.repeticiones)
+    metricas.reiniciar()
+    print(f'{"vista trivial":<28}  {sin:>8.2f} µs')
+    print(f'{"con medir_peticiones":<28}  {con:>8.2f} µs  (+{con - sin:.2f} µs por petición)')
+
+    with entorno.base_de_prueba() as connection:
+        entorno.poblar(10)
+
+        def consulta():
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+
+        consulta()
+        wrappers = connection.execute_wrappers
+        _, token = metricas.iniciar()
+        try:
+            con_sql = _por_operacion(consulta, args.repeticiones)
+            connection.execute_wrappers = [w for w in wrappers if w is not metricas.medir_sql]
+            sin_sql = _por_operacion(consulta, args.repeticiones)
+        finally:
+            connection.execute_wrappers = wrappers
+            metricas.terminar(token)
+    print(f'{"SELECT 1":<28}  {sin_sql:>8.2f} µs')
+    print(f'{"SELECT 1 con execute_wrapper":<28}  {con_sql:>8.2f} µs  (+{con_sql - sin_sql:.2f} µs por consulta)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Micro-benchmark de serialización del listado.
+
+Compara la ruta original (instanciar cada Videojuego y armar el dict a mano,
+codificar con JsonResponse) contra api.serializadores (tuplas de values_list
+y RespuestaJSON, que usa orjson si está instalado).
+
+    python -m benchmarks.serializacion [--filas 10000 100000]
+"""
+import argparse
+
+from benchmarks import entorno
+
+
+def _antes(Videojuego, JsonResponse):
+    data = []
+    for v in Videojuego.objects.all():
+        data.append({
+            'id': v.id,
+            'titulo': v.titulo,
+            'descripcion': v.descripcion,
+            'precio': str(v.precio),
+            'stock': v.stock,
+            'plataforma': v.plataforma,
+            'genero': v.genero,
+            'desarrollador': v.desarrollador,
+            'fecha_lanzamiento': v.fecha_lanzamiento.isoformat() if v.fecha_lanzamiento else None,
+            'created_at': v.created_at.isoformat(),
+            'updated_at': v.updated_at.isoformat(),
+        })
+    return JsonResponse(data, safe=False).content
+
+
+def _despues(Videojuego, serializador, RespuestaJSON):
+    filas = Videojuego.objects.order_by().values_list(*serializador.columnas)
+    return RespuestaJSON(serializador.filas(filas)).content
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--filas', type=int, nargs='+', default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    entorno.configurar()
+    from django.http import JsonResponse
+
+    from api import serializadores
+    from api.models import Videojuego
+
+    completo = serializadores.Serializador()
+    parcial = serializadores.Serializador(('titulo', 'precio', 'stock'))
+    print(f'Codificador JSON: {"orjson" if serializadores.orjson else "json (stdlib)"}')
+    print(f'{"filas":>8}  {"antes":>12}  {"después":>12}  {"fields=3":>12}  {"mejora":>7}')
+
+    with entorno.base_de_prueba():
+        for cantidad in sorted(args.filas):
+            entorno.poblar(cantidad)
+            antes = entorno.medir(lambda: _antes(Videojuego, JsonResponse))
+            despues = entorno.medir(lambda: _despues(Videojuego, completo, serializadores.RespuestaJSON))
+            sparse = entorno.medir(lambda: _despues(Videojuego, parcial, serializadores.RespuestaJSON))
+            print(
+                f'{cantidad:>8}  {cantidad / antes:>10,.0f}/s  {cantidad / despues:>10,.0f}/s  '
+                f'{cantidad / sparse:>10,.0f}/s  {antes / despues:>6.1f}x'
+            )
+
+
+if __name__ == '__main__':
+    main()
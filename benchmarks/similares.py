@@ -0,0 +1,74 @@
+"""
+Videojuegos similares: lista precalculada contra calcularla en cada petición.
+
+Compara leer la lista de un videojuego de VideojuegoSimilar (lo que hace
+/api/videojuegos/<id>/similares/) con lo que costaría calcularla al vuelo:
+leer y vectorizar su género completo y multiplicar contra todos. Informa
+además cuánto tarda build_similares completo y una pasada incremental
+después de cambiar algunos precios.
+
+    python -m benchmarks.similares [--filas 100000] [--cambios 100]
+"""
+import argparse
+import time
+
+from benchmarks import entorno
+
+
+def _antes(similares, Videojuego, id, columnas):
+    # Lo que haría la vista sin la tabla: su género entero, en cada petición
+    genero = Videojuego.objects.filter(id=id).values_list('genero', flat=True).get()
+    filas = list(Videojuego.objects.filter(genero=genero).order_by('id').values_list(*similares.COLUMNAS))
+    idf = similares.calcular_idf((titulo, descripcion) for *_, titulo, descripcion in filas)
+    ids, matriz = similares._bloque(filas, similares._terminos(idf))
+    posicion = int(similares.np.searchsorted(ids, id))
+    _, indices, _ = next(similares.vecinos(matriz, [posicion], 10))
+    vecinos = ids[indices[0]].tolist()
+    en_orden = {fila[0]: fila[1:] for fila in Videojuego.objects.filter(id__in=vecinos).values_list('id', *columnas)}
+    return [en_orden[vecino] for vecino in vecinos]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--filas', type=int, default=100_000)
+    parser.add_argument('--cambios', type=int, default=100)
+    args = parser.parse_args()
+
+    entorno.configurar()
+    from decimal import Decimal
+
+    from django.conf import settings
+
+    from api import lotes, similares
+    from api.models import Videojuego
+
+    with entorno.base_de_prueba():
+        entorno.poblar(args.filas)
+
+        inicio = time.perf_counter()
+        similares.construir()
+        print(f'{args.filas:,} videojuegos: build_similares completo en {time.perf_counter() - inicio:.2f} s')
+
+        cambiados = list(Videojuego.objects.order_by('id').values_list('id', flat=True)[:args.cambios])
+        lotes.actualizar_en_bloque(Videojuego.objects.filter(id__in=cambiados), precio=Decimal('99.00'))
+        # El feed no entrega los cambios más recientes que el margen
+        time.sleep(settings.API_CAMBIOS_MARGEN_SEGUNDOS)
+        inicio = time.perf_counter()
+        recalculados, _ = similares.actualizar()
+        print(
+            f'  incremental tras {args.cambios} cambios de precio: {time.perf_counter() - inicio:.2f} s '
+            f'({recalculados} videojuegos recalculados)'
+        )
+
+        id = Videojuego.objects.order_by('id').values_list('id', flat=True)[args.filas // 2]
+        columnas = ('titulo', 'precio')
+        al_vuelo = entorno.medir(lambda: _antes(similares, Videojuego, id, columnas))
+        precalculado = entorno.medir(lambda: similares.leer(id, columnas), repeticiones=20)
+        print(
+            f'  por petición: al vuelo {al_vuelo * 1000:.1f} ms, precalculado {precalculado * 1000:.2f} ms '
+            f'({al_vuelo / precalculado:.0f}x)'
+        )
+
+
+if __name__ == '__main__':
+    main()
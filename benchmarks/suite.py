@@ -0,0 +1,412 @@
+"""
+Suite de benchmarks de todos los endpoints de la API.
+
+Para cada tamaño de catálogo (--filas, de menor a mayor) completa la base de
+prueba con datos de seed_catalogo y pide cada endpoint de api/urls.py
+--peticiones veces con el cliente de pruebas de Django. De cada endpoint
+guarda peticiones/s, latencias p50/p95/p99 y consultas SQL por petición
+(del encabezado Server-Timing y, en streaming, de lo que se consulta al
+recorrer la respuesta). Los casos "frío" vacían el cache del catálogo y el
+índice de facetas antes de cada petición (fuera del tiempo medido).
+
+Con --similares (y numpy instalado) antes de medir cada tamaño se calculan
+los similares con build_similares y el caso "similares" lee esas listas. Es
+opcional porque el cálculo completo es cuadrático dentro de cada género: 40 s
+con 100.000 videojuegos, algo más de una hora con 1.000.000.
+
+Con --http además levanta un servidor WSGI local con hilos sobre la misma
+base y le aplica carga HTTP real con benchmarks.carga.
+
+Los resultados se escriben en JSON (--salida). Con --comparar se contrastan
+contra una línea base: el comando termina con código 1 si algún endpoint
+hace más consultas que antes o si su p50 empeora más que --tolerancia, así
+que CI puede correrlo en cada cambio:
+
+    python -m benchmarks.suite --http --similares --salida benchmarks/linea_base.json
+    python -m benchmarks.suite --filas 1000 100000 --comparar benchmarks/linea_base.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import platform
+import random
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+from benchmarks import carga, entorno
+
+CONSULTAS = re.compile(r'desc="(\d+) consultas"')
+
+JSON = 'application/json'
+
+# Una portada real del repositorio (691x1000): se generan las variantes de
+# API_PORTADA_ANCHOS que entran en ese ancho, en cada formato disponible
+PORTADA = Path(__file__).resolve().parent.parent / 'static' / 'images' / 'games' / 'ac_shadow.jpg'
+
+
+@contextlib.contextmanager
+def _media_temporal():
+    """Las portadas subidas van a un directorio descartable, no al MEDIA_ROOT real"""
+    from django.test import override_settings
+
+    with tempfile.TemporaryDirectory() as directorio, override_settings(MEDIA_ROOT=directorio):
+        yield
+
+
+@contextlib.contextmanager
+def _cliente_eventos():
+    """Un cliente SSE conectado (en su propio loop) mientras dura el caso"""
+    from api import eventos
+
+    suscripto, parar = threading.Event(), threading.Event()
+
+    async def escuchar():
+        suscripcion = eventos.hub.suscribir()
+        suscripto.set()
+        try:
+            while not parar.is_set():
+                await suscripcion.tomar(0.1)
+        finally:
+            eventos.hub.desuscribir(suscripcion)
+
+    hilo = threading.Thread(target=asyncio.run, args=(escuchar(),))
+    hilo.start()
+    suscripto.wait()
+    try:
+        yield
+    finally:
+        parar.set()
+        hilo.join()
+
+
+def _casos(client, ids, semilla, con_similares):
+    """
+    Lista de (nombre, frio, peticion[, contexto]); `peticion(i)` hace la
+    i-ésima petición y `contexto()`, si está, envuelve todas las del caso.
+    Primero las lecturas y después las escrituras, que invalidan el cache.
+    """
+    from django.core.files.uploadedfile import SimpleUploadedFile
+
+    from api import portadas
+
+    rng = random.Random(semilla)
+    muestra = rng.sample(ids, min(len(ids), 1000))
+    creados, creados_lote = [], []
+
+    def elegido(i):
+        return muestra[i % len(muestra)]
+
+    primera = json.loads(client.get('/api/videojuegos/').content)
+    segunda = {'cursor': primera['siguiente']} if primera['siguiente'] else {}
+    filtros = {'plataforma': 'PS5', 'genero': 'RPG', 'ordering': 'precio', 'en_stock': '1'}
+    filtros_facetas = {'plataforma': 'PS5,SWITCH', 'en_stock': '1', 'precio_max': '30'}
+    # Los últimos 100 cambios del registro (el sembrado deja uno por videojuego)
+    token = int(json.loads(client.get('/api/videojuegos/cambios/').content)['siguiente'])
+    ultimos_cambios = {'since': max(token - 100, 0)}
+
+    def facetas_variadas(i):
+        # Otro rango de precio en cada petición: no sale de los conteos memorizados
+        return client.get('/api/videojuegos/facetas/', {'genero': 'RPG', 'precio_max': f'{10 + i % 80}.{i % 100:02d}'})
+
+    def lote(i):
+        return {'ids': ','.join(str(elegido(i + j)) for j in range(50))}
+
+    def crear(i):
+        response = client.post('/api/videojuegos/crear/', {
+            'titulo': f'Benchmark {i}', 'precio': '19.99', 'stock': 5, 'plataforma': 'PC', 'genero': 'PUZZLE',
+        }, content_type=JSON)
+        creados.append(json.loads(response.content)['id'])
+        return response
+
+    def bulk_crear(i):
+        response = client.post('/api/videojuegos/bulk/', [
+            {'titulo': f'Lote {i}-{j}', 'precio': '9.99', 'stock': 3, 'plataforma': 'SWITCH', 'genero': 'PUZZLE'}
+            for j in range(10)
+        ], content_type=JSON)
+        creados_lote.append(json.loads(response.content)['ids'])
+        return response
+
+    def actualizar(i):
+        return client.put(
+            f'/api/videojuegos/{elegido(i)}/actualizar/', json.dumps({'stock': i % 40}), content_type=JSON)
+
+    def subir_portada(i):
+        # Mismo archivo en cada petición: se decodifica y se codifica cada vez,
+        # solo la escritura de los archivos se omite después de la primera
+        portada = SimpleUploadedFile(PORTADA.name, PORTADA.read_bytes(), content_type='image/jpeg')
+        return client.post(f'/api/videojuegos/{elegido(i)}/portada/', {'portada': portada})
+
+    casos = [
+        ('listado', False, lambda i: client.get('/api/videojuegos/')),
+        ('listado_frio', True, lambda i: client.get('/api/videojuegos/')),
+        ('listado_pagina_2_frio', True, lambda i: client.get('/api/videojuegos/', segunda)),
+        ('listado_filtrado_frio', True, lambda i: client.get('/api/videojuegos/', filtros)),
+        ('listado_campos_frio', True, lambda i: client.get('/api/videojuegos/', {'fields': 'titulo,precio'})),
+        ('inicio', False, lambda i: client.get('/')),
+        ('inicio_frio', True, lambda i: client.get('/')),
+        ('listado_stream_100', False, lambda i: client.get('/api/videojuegos/', {'stream': 'ndjson', 'limit': 100})),
+        ('busqueda', False, lambda i: client.get('/api/videojuegos/buscar/', {'q': 'dragón'})),
+        ('cambios_100', False, lambda i: client.get('/api/videojuegos/cambios/', ultimos_cambios)),
+        ('facetas', False, lambda i: client.get('/api/videojuegos/facetas/', filtros_facetas)),
+        ('facetas_variadas', False, facetas_variadas),
+        ('facetas_frio', True, lambda i: client.get('/api/videojuegos/facetas/', filtros_facetas)),
+        ('estadisticas', False, lambda i: client.get('/api/videojuegos/estadisticas/')),
+        ('detalle', False, lambda i: client.get(f'/api/videojuegos/{elegido(i)}/')),
+        ('detalle_frio', True, lambda i: client.get(f'/api/videojuegos/{elegido(i)}/')),
+        ('similares', False, lambda i: client.get(f'/api/videojuegos/{elegido(i)}/similares/')),
+        ('lote_50', False, lambda i: client.get('/api/videojuegos/lote/', lote(i))),
+        ('lote_50_frio', True, lambda i: client.get('/api/videojuegos/lote/', lote(i))),
+        ('crear', False, crear),
+        ('actualizar', False, actualizar),
+        # Con alguien escuchando /api/eventos/ cada escritura además lee el
+        # payload de lo que cambió y lo reparte al confirmarse
+        ('actualizar_con_eventos', False, actualizar, _cliente_eventos),
+        ('stock', False, lambda i: client.post(
+            f'/api/videojuegos/{elegido(i)}/stock/', {'delta': 1}, content_type=JSON)),
+        ('stock_lote_10', False, lambda i: client.post('/api/videojuegos/stock/', [
+            {'id': elegido(i + j), 'delta': 1} for j in range(10)
+        ], content_type=JSON)),
+        ('bulk_crear_10', False, bulk_crear),
+        ('bulk_actualizar_10', False, lambda i: client.put('/api/videojuegos/bulk/', json.dumps([
+            {'id': id, 'stock': i % 40} for id in creados_lote[i % len(creados_lote)]
+        ]), content_type=JSON)),
+        ('bulk_eliminar_10', False, lambda i: client.delete(
+            '/api/videojuegos/bulk/', json.dumps(creados_lote[i]), content_type=JSON)),
+        ('eliminar', False, lambda i: client.delete(f'/api/videojuegos/{creados[i]}/eliminar/')),
+    ]
+    if not con_similares:
+        casos = [caso for caso in casos if caso[0] != 'similares']
+    if portadas.disponible():
+        casos.append(('portada', False, subir_portada, _media_temporal))
+    return casos
+
+
+def _percentil(ordenadas, p):
+    return ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * p))]
+
+
+def _resumen(latencias, consultas, errores):
+    ordenadas = sorted(latencias)
+    return {
+        'peticiones_s': round(len(ordenadas) / sum(ordenadas), 1),
+        'p50_ms': round(_percentil(ordenadas, 0.50) * 1000, 3),
+        'p95_ms': round(_percentil(ordenadas, 0.95) * 1000, 3),
+        'p99_ms': round(_percentil(ordenadas, 0.99) * 1000, 3),
+        'consultas': round(statistics.mean(consultas), 2),
+        'errores': errores,
+    }
+
+
+def _medir_cliente(casos, peticiones, limpiar_cache):
+    resultados = {}
+    for nombre, frio, peticion, *contexto in casos:
+        with contexto[0]() if contexto else contextlib.nullcontext():
+            resultados[nombre] = _medir_caso(peticion, frio, peticiones, limpiar_cache)
+        print(f'  {nombre:<24} {_formatear(resultados[nombre])}', flush=True)
+    return resultados
+
+
+def _medir_caso(peticion, frio, peticiones, limpiar_cache):
+    from api import metricas
+
+    peticion(0)  # calentamiento (conexión, caches de Django, pool de procesos, etc.)
+    latencias, consultas, errores = [], [], 0
+    for i in range(1, peticiones + 1):
+        if frio:
+            limpiar_cache()
+        # Las consultas de una respuesta en streaming ocurren al recorrerla,
+        # después del middleware: se cuentan en una medición externa.
+        medicion, token = metricas.iniciar()
+        try:
+            inicio = time.perf_counter()
+            response = peticion(i)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            latencias.append(time.perf_counter() - inicio)
+        finally:
+            metricas.terminar(token)
+        coincidencia = CONSULTAS.search(response.get('Server-Timing', ''))
+        consultas.append(medicion.consultas + (int(coincidencia.group(1)) if coincidencia else 0))
+        errores += response.status_code >= 400
+    return _resumen(latencias, consultas, errores)
+
+
+def _formatear(resultado):
+    return (
+        f'{resultado["peticiones_s"]:>9,.0f}/s  p50 {resultado["p50_ms"]:>8.2f} ms  '
+        f'p99 {resultado["p99_ms"]:>8.2f} ms  {resultado["consultas"]:>5} consultas'
+        + (f'  {resultado["errores"]} errores' if resultado['errores'] else '')
+    )
+
+
+def _medir_http(ids, clientes, duracion):
+    """Carga HTTP real contra un servidor WSGI con hilos levantado en este proceso"""
+    from django.core.servers.basehttp import ThreadedWSGIServer, get_internal_wsgi_application
+    from django.test import override_settings
+    from django.test.testcases import QuietWSGIRequestHandler
+
+    servidor = ThreadedWSGIServer(('127.0.0.1', 0), QuietWSGIRequestHandler, allow_reuse_address=False)
+    servidor.set_app(get_internal_wsgi_application())
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    base = f'http://127.0.0.1:{servidor.server_port}/api/videojuegos'
+    urls = {
+        'listado': [f'{base}/'],
+        'detalle': [f'{base}/{id}/' for id in random.Random(0).sample(ids, min(len(ids), 100))],
+        'busqueda': [f'{base}/buscar/?q=drag%C3%B3n'],
+        'estadisticas': [f'{base}/estadisticas/'],
+    }
+    resultados = {}
+    with override_settings(ALLOWED_HOSTS=['127.0.0.1']):
+        hilo.start()
+        try:
+            for nombre, lista in urls.items():
+                # Una petición previa llena el cache: se mide el estado estable,
+                # no la estampida inicial de clientes con el cache frío
+                urllib.request.urlopen(lista[0]).read()
+                latencias, errores, total = asyncio.run(carga._correr(lista, clientes, duracion))
+                ordenadas = sorted(latencias)
+                resultados[nombre] = {
+                    'peticiones_s': round(len(ordenadas) / total, 1),
+                    'p50_ms': round(_percentil(ordenadas, 0.50) * 1000, 3),
+                    'p99_ms': round(_percentil(ordenadas, 0.99) * 1000, 3),
+                    'errores': len(errores),
+                }
+                print(f'  http {nombre:<19} {resultados[nombre]["peticiones_s"]:>9,.0f}/s  '
+                      f'p50 {resultados[nombre]["p50_ms"]:>8.2f} ms  p99 {resultados[nombre]["p99_ms"]:>8.2f} ms',
+                      flush=True)
+        finally:
+            servidor.shutdown()
+            servidor.server_close()
+    return resultados
+
+
+def _comparar(actual, base, tolerancia):
+    """
+    Devuelve las regresiones de `actual` respecto de `base`. Los casos sin
+    línea base (o que ya no se miden) no son regresiones, pero se listan para
+    que se note que falta regenerarla.
+    """
+    regresiones, sin_base = [], []
+    print(f'\nComparación con la línea base (tolerancia p50: +{tolerancia:.0%})')
+    for filas, casos in actual['cliente'].items():
+        anteriores = base.get('cliente', {}).get(filas, {})
+        for nombre, resultado in casos.items():
+            anterior = anteriores.get(nombre)
+            if anterior is None:
+                print(f'  {filas:>8} {nombre:<24} sin línea base')
+                sin_base.append(f'{filas} {nombre}')
+                continue
+            razon = resultado['p50_ms'] / anterior['p50_ms'] if anterior['p50_ms'] else 1
+            marcas = []
+            if resultado['consultas'] > anterior['consultas']:
+                marcas.append(f'consultas {anterior["consultas"]} -> {resultado["consultas"]}')
+            if razon > 1 + tolerancia:
+                marcas.append(f'p50 {anterior["p50_ms"]} -> {resultado["p50_ms"]} ms')
+            if resultado['errores'] > anterior['errores']:
+                marcas.append(f'errores {anterior["errores"]} -> {resultado["errores"]}')
+            print(f'  {filas:>8} {nombre:<24} p50 x{razon:5.2f}  {"; ".join(marcas) or "ok"}')
+            regresiones += [f'{filas} {nombre}: {marca}' for marca in marcas]
+        for nombre in sorted(anteriores.keys() - casos.keys()):
+            print(f'  {filas:>8} {nombre:<24} en la línea base pero no medido')
+    if sin_base:
+        print(f'\n{len(sin_base)} casos sin línea base (regenerarla con --salida):\n  ' + '\n  '.join(sin_base))
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--filas', type=int, nargs='+', default=[1000, 100_000, 1_000_000])
+    parser.add_argument('--peticiones', type=int, default=200, help='Peticiones por endpoint y tamaño')
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--http', action='store_true', help='Medir también con carga HTTP real')
+    parser.add_argument('--clientes', type=int, default=20, help='Conexiones concurrentes con --http')
+    parser.add_argument('--duracion', type=float, default=5, help='Segundos de carga por endpoint con --http')
+    parser.add_argument('--similares', action='store_true',
+                        help='Correr build_similares completo en cada tamaño y medir /similares/ (requiere numpy)')
+    parser.add_argument('--salida', help='Archivo JSON donde guardar los resultados')
+    parser.add_argument('--comparar', help='Línea base JSON contra la que comparar')
+    parser.add_argument('--tolerancia', type=float, default=0.5,
+                        help='Empeoramiento de p50 admitido antes de marcar regresión (0.5 = 50 %%)')
+    args = parser.parse_args()
+
+    entorno.configurar()
+    # Bajo carga muchas peticiones superan API_UMBRAL_LENTA_MS; el log no aporta acá
+    logging.getLogger('api.lentas').setLevel(logging.ERROR)
+    import django
+    from django.core.cache import caches
+    from django.test import Client
+
+    from api import cache, facetas, serializadores, similares
+    from api.management.commands.seed_catalogo import sembrar
+    from api.models import Videojuego
+
+    if args.similares and similares.np is None:
+        parser.error('--similares necesita numpy (pip install numpy)')
+
+    resultado = {
+        'entorno': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'json': 'orjson' if serializadores.orjson else 'json',
+            'plataforma': platform.platform(),
+        },
+        'parametros': {'peticiones': args.peticiones, 'semilla': args.semilla, 'similares': args.similares},
+        'cliente': {},
+    }
+    if args.http:
+        resultado['http'] = {}
+        resultado['parametros'].update(clientes=args.clientes, duracion=args.duracion)
+
+    client = Client()
+    cache_catalogo = caches[cache.ALIAS]
+
+    def limpiar_cache():
+        cache_catalogo.clear()
+        # El índice de /facetas/ es un cache en memoria del proceso
+        facetas.reiniciar()
+    with entorno.base_de_prueba() as connection:
+        resultado['entorno']['motor'] = connection.vendor
+        for filas in sorted(args.filas):
+            faltantes = filas - Videojuego.objects.count()
+            if faltantes > 0:
+                inicio = time.perf_counter()
+                sembrar(faltantes, args.semilla)
+                print(f'{filas:,} videojuegos (sembrados en {time.perf_counter() - inicio:.1f} s)', flush=True)
+            if args.similares:
+                # Las listas de /similares/ las calcula build_similares, no la petición
+                inicio = time.perf_counter()
+                similares.construir()
+                print(f'  build_similares completo en {time.perf_counter() - inicio:.1f} s', flush=True)
+            ids = list(Videojuego.objects.values_list('id', flat=True))
+            cache_catalogo.clear()
+            resultado['cliente'][str(filas)] = _medir_cliente(
+                _casos(client, ids, args.semilla, args.similares), args.peticiones, limpiar_cache
+            )
+            if args.http:
+                resultado['http'][str(filas)] = _medir_http(ids, args.clientes, args.duracion)
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as archivo:
+            json.dump(resultado, archivo, indent=2, ensure_ascii=False)
+            archivo.write('\n')
+        print(f'Resultados guardados en {args.salida}')
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as archivo:
+            regresiones = _comparar(resultado, json.load(archivo), args.tolerancia)
+        if regresiones:
+            print(f'\n{len(regresiones)} regresiones:\n  ' + '\n  '.join(regresiones))
+            sys.exit(1)
+        print('\nSin regresiones')
+
+
+if __name__ == '__main__':
+    main()
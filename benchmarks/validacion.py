@@ -0,0 +1,123 @@
+"""
+Micro-benchmark de validación de payloads de videojuegos.
+
+Compara la ruta original (validar_datos_videojuego, que rearmaba las listas de
+opciones en cada llamada y solo devolvía errores, y la conversión que hacían
+después las vistas: float(precio), int(stock) y parse_fecha otra vez) contra
+api.validacion.validar, que valida y convierte en una sola pasada.
+
+    python -m benchmarks.validacion [--payloads 100000]
+"""
+import argparse
+from datetime import datetime
+
+from benchmarks import entorno
+
+PAYLOADS = {
+    'alta completa': {
+        'titulo': 'Elden Ring', 'descripcion': 'RPG de mundo abierto', 'precio': 59.99, 'stock': 12,
+        'plataforma': 'PS5', 'genero': 'RPG', 'desarrollador': 'FromSoftware',
+        'fecha_lanzamiento': '2022-02-25', 'codigo_externo': 'SKU-1',
+    },
+    'modificación (stock)': {'stock': 7},
+    'alta inválida': {'precio': 'gratis', 'plataforma': 'ATARI', 'fecha_lanzamiento': '25/02/2022'},
+}
+
+
+def _parse_fecha(fecha_str):
+    if not fecha_str:
+        return None
+    if isinstance(fecha_str, str):
+        try:
+            return datetime.strptime(fecha_str, '%Y-%m-%d').date()
+        except ValueError:
+            raise ValueError('Formato de fecha inválido. Use YYYY-MM-DD')
+    return fecha_str
+
+
+def _validar_datos_videojuego(Videojuego, data, es_actualizacion=False):
+    errores = []
+    if not es_actualizacion:
+        if not data.get('titulo'):
+            errores.append('El título es requerido')
+        if data.get('precio') is None:
+            errores.append('El precio es requerido')
+    if 'precio' in data and data.get('precio') is not None:
+        try:
+            precio = float(data.get('precio'))
+            if precio < 0:
+                errores.append('El precio debe ser mayor o igual a 0')
+        except (ValueError, TypeError):
+            errores.append('El precio debe ser un número válido')
+    if 'stock' in data and data.get('stock') is not None:
+        try:
+            stock = int(data.get('stock'))
+            if stock < 0:
+                errores.append('El stock debe ser mayor o igual a 0')
+        except (ValueError, TypeError):
+            errores.append('El stock debe ser un número entero válido')
+    if 'plataforma' in data and data.get('plataforma'):
+        plataformas_validas = [choice[0] for choice in Videojuego.PLATAFORMAS]
+        if data.get('plataforma') not in plataformas_validas:
+            errores.append(f'Plataforma inválida. Opciones válidas: {", ".join(plataformas_validas)}')
+    if 'genero' in data and data.get('genero'):
+        generos_validos = [choice[0] for choice in Videojuego.GENEROS]
+        if data.get('genero') not in generos_validos:
+            errores.append(f'Género inválido. Opciones válidas: {", ".join(generos_validos)}')
+    if 'codigo_externo' in data and data.get('codigo_externo') is not None:
+        codigo = data.get('codigo_externo')
+        if not isinstance(codigo, str) or not codigo or len(codigo) > 64:
+            errores.append('El código externo debe ser un texto de 1 a 64 caracteres')
+    if 'fecha_lanzamiento' in data and data.get('fecha_lanzamiento'):
+        try:
+            _parse_fecha(data.get('fecha_lanzamiento'))
+        except ValueError as e:
+            errores.append(str(e))
+    return errores
+
+
+def _antes(Videojuego, data, es_actualizacion):
+    errores = _validar_datos_videojuego(Videojuego, data, es_actualizacion)
+    if errores:
+        return errores
+    # Lo que las vistas volvían a convertir después de validar
+    valores = {}
+    if data.get('precio') is not None:
+        valores['precio'] = float(data['precio'])
+    if data.get('stock') is not None:
+        valores['stock'] = int(data['stock'])
+    if data.get('fecha_lanzamiento'):
+        valores['fecha_lanzamiento'] = _parse_fecha(data['fecha_lanzamiento'])
+    return valores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--payloads', type=int, default=100_000)
+    args = parser.parse_args()
+
+    entorno.configurar()
+    from api import validacion
+    from api.models import Videojuego
+
+    print(f'{"payload":<22}  {"antes":>12}  {"después":>12}  {"mejora":>7}')
+    for nombre, data in PAYLOADS.items():
+        es_actualizacion = nombre.startswith('modificación')
+
+        def antes():
+            for _ in range(args.payloads):
+                _antes(Videojuego, data, es_actualizacion)
+
+        def despues():
+            for _ in range(args.payloads):
+                validacion.validar(data, es_actualizacion)
+
+        t_antes, t_despues = entorno.medir(antes), entorno.medir(despues)
+        print(
+            f'{nombre:<22}  {args.payloads / t_antes:>10,.0f}/s  {args.payloads / t_despues:>10,.0f}/s  '
+            f'{t_antes / t_despues:>6.1f}x'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,13 @@
 // Configuración de la API
 const API_BASE_URL = '/api';
+const PAGINA_LIMITE = 500;
 
 // Estado de la aplicación
 let editingVideojuegoId = null;
+let editingVideojuegoEtag = null;
+// Catálogo mostrado y token del feed de cambios con el que se sincroniza
+let videojuegosCargados = [];
+let tokenCambios = null;
 
 // Elementos del DOM
 const videojuegoForm = document.getElementById('videojuego-form');
@@ -18,6 +23,8 @@ const btnText = document.getElementById('btn-text');
 const gameModal = document.getElementById('game-modal');
 const closeModalBtn = document.getElementById('close-modal');
 const addBtn = document.querySelector('.add-btn');
+const searchInput = document.querySelector('.search-bar input');
+const searchBtn = document.querySelector('.search-btn');
 
 // Verificar que los elementos críticos existan
 if (!videojuegoForm) {
@@ -87,19 +94,61 @@ function showError(message) {
     }, 5000);
 }
 
-// Cargar videojuegos
-async function cargarVideojuegos() {
-    setLoading(true);
+// Pedir una página del listado (la API pagina por cursor)
+async function pedirPagina(cursor) {
+    let url = `${API_BASE_URL}/videojuegos/?limit=${PAGINA_LIMITE}`;
+    if (cursor) {
+        url += `&cursor=${encodeURIComponent(cursor)}`;
+    }
+    const response = await fetch(url);
+
+    if (!response.ok) {
+        throw new Error('Error al cargar videojuegos');
+    }
+
+    return response.json();
+}
+
+// Primera página que el servidor ya renderizó en la tabla (JSON de hidratación)
+function leerCatalogoInicial() {
+    const script = document.getElementById('catalogo-inicial');
+    if (!script) return null;
+    tokenCambios = videojuegosTable.dataset.tokenCambios || null;
+    return JSON.parse(script.textContent);
+}
+
+// Token actual del feed de cambios (se pide antes de descargar el catálogo)
+async function pedirTokenCambios() {
+    const response = await fetch(`${API_BASE_URL}/videojuegos/cambios/`);
+    if (!response.ok) {
+        throw new Error('Error al consultar los cambios');
+    }
+    return (await response.json()).siguiente;
+}
+
+// Cargar videojuegos; con `paginaInicial` se evita volver a pedir la primera página
+async function cargarVideojuegos(paginaInicial = null) {
+    // La tabla ya muestra la primera página: no hace falta el spinner
+    setLoading(!paginaInicial);
     errorMessageDiv.style.display = 'none';
     
     try {
-        const response = await fetch(`${API_BASE_URL}/videojuegos/`);
-        
-        if (!response.ok) {
-            throw new Error('Error al cargar videojuegos');
+        if (!paginaInicial) {
+            tokenCambios = await pedirTokenCambios();
+        }
+        // Se piden páginas hasta que no haya siguiente
+        const videojuegos = [];
+        let pagina = paginaInicial || await pedirPagina(null);
+        videojuegos.push(...pagina.resultados);
+        while (pagina.siguiente) {
+            pagina = await pedirPagina(pagina.siguiente);
+            videojuegos.push(...pagina.resultados);
+        }
+
+        videojuegosCargados = videojuegos;
+        if (paginaInicial && videojuegos.length === paginaInicial.resultados.length) {
+            return;
         }
-        
-        const videojuegos = await response.json();
         mostrarVideojuegos(videojuegos);
     } catch (error) {
         console.error('Error:', error);
@@ -109,6 +158,111 @@ async function cargarVideojuegos() {
     }
 }
 
+// Aplicar al catálogo local una página del feed de cambios
+function aplicarCambios(data) {
+    const eliminados = new Set(data.eliminados);
+    const cambiados = new Map(data.cambios.map(videojuego => [videojuego.id, videojuego]));
+    videojuegosCargados = videojuegosCargados
+        .filter(videojuego => !eliminados.has(videojuego.id))
+        .map(videojuego => {
+            const actualizado = cambiados.get(videojuego.id);
+            cambiados.delete(videojuego.id);
+            return actualizado || videojuego;
+        });
+    // Los que no estaban son altas: van primero, como en el listado
+    videojuegosCargados.unshift(...[...cambiados.values()].reverse());
+}
+
+// Traer solo lo que cambió desde la última sincronización
+async function sincronizarCambios() {
+    if (tokenCambios === null) {
+        await cargarVideojuegos();
+        return;
+    }
+
+    try {
+        let data;
+        do {
+            const response = await fetch(`${API_BASE_URL}/videojuegos/cambios/?since=${encodeURIComponent(tokenCambios)}`);
+            if (response.status === 410) {
+                // El token quedó vencido por una compactación: descarga completa
+                await cargarVideojuegos();
+                return;
+            }
+            if (!response.ok) {
+                throw new Error('Error al consultar los cambios');
+            }
+            data = await response.json();
+            aplicarCambios(data);
+            tokenCambios = data.siguiente;
+        } while (data.hay_mas);
+
+        mostrarVideojuegos(videojuegosCargados);
+    } catch (error) {
+        console.error('Error:', error);
+        showError('Error al actualizar los videojuegos. Por favor, intenta de nuevo.');
+    }
+}
+
+// Hay una búsqueda en pantalla: los eventos actualizan el estado pero no la tabla
+function hayBusqueda() {
+    return Boolean(searchInput && searchInput.value.trim());
+}
+
+// Varios eventos seguidos se resuelven con una sola consulta al feed de cambios
+let sincronizacionProgramada = null;
+function programarSincronizacion() {
+    if (hayBusqueda()) return;  // al limpiar la búsqueda se sincroniza igual
+    clearTimeout(sincronizacionProgramada);
+    sincronizacionProgramada = setTimeout(sincronizarCambios, 250);
+}
+
+// Eventos en vivo (SSE): el stock se aplica directo; altas, modificaciones y
+// bajas se traen del feed de cambios. Sin servidor ASGI la API responde 501 y
+// EventSource no reintenta: la página sigue funcionando sin eventos.
+function escucharEventos() {
+    if (!window.EventSource) return;
+    const fuente = new EventSource(`${API_BASE_URL}/eventos/`);
+
+    fuente.addEventListener('stock', (e) => {
+        const { id, stock } = JSON.parse(e.data);
+        const videojuego = videojuegosCargados.find(v => v.id === id);
+        if (!videojuego || videojuego.stock === stock) return;
+        videojuego.stock = stock;
+        if (!hayBusqueda()) {
+            mostrarVideojuegos(videojuegosCargados);
+        }
+    });
+    ['videojuego', 'baja', 'sincronizar'].forEach(tipo => {
+        fuente.addEventListener(tipo, programarSincronizacion);
+    });
+}
+
+// Buscar videojuegos en el servidor (índice de texto completo)
+async function buscarVideojuegos(texto) {
+    if (!texto) {
+        await sincronizarCambios();
+        return;
+    }
+
+    try {
+        const response = await fetch(`${API_BASE_URL}/videojuegos/buscar/?q=${encodeURIComponent(texto)}`);
+
+        if (!response.ok) {
+            throw new Error('Error al buscar videojuegos');
+        }
+
+        const data = await response.json();
+        // Se descartan respuestas de búsquedas que ya no coinciden con el input
+        if (searchInput && searchInput.value.trim() === texto) {
+            mostrarVideojuegos(data.resultados);
+        }
+    } catch (error) {
+        console.error('Error:', error);
+        showError('Error al buscar los videojuegos. Por favor, intenta de nuevo.');
+    }
+}
+
 // Mapeo de nombres de plataformas y géneros
 const PLATAFORMAS_NOMBRES = {
     'PC': 'PC',
@@ -133,6 +287,16 @@ const GENEROS_NOMBRES = {
     'PUZZLE': 'Puzzle'
 };
 
+// Miniatura de la portada: el navegador elige formato (avif/webp) y ancho
+function htmlPortada(videojuego) {
+    if (!videojuego.portada) return '';
+    const fuentes = ['avif', 'webp']
+        .filter(formato => videojuego.portada_srcset && videojuego.portada_srcset[formato])
+        .map(formato => `<source type="image/${formato}" srcset="${videojuego.portada_srcset[formato]}" sizes="40px">`)
+        .join('');
+    return `<picture>${fuentes}<img class="portada-miniatura" src="${videojuego.portada}" alt="" loading="lazy" decoding="async" width="40" height="40"></picture>`;
+}
+
 // Mostrar videojuegos en la tabla
 function mostrarVideojuegos(videojuegos) {
     videojuegosTbody.innerHTML = '';
@@ -161,7 +325,7 @@ function mostrarVideojuegos(videojuegos) {
         
         tr.innerHTML = `
             <td>${videojuego.id}</td>
-            <td><strong>${videojuego.titulo}</strong></td>
+            <td>${htmlPortada(videojuego)}<strong>${videojuego.titulo}</strong></td>
             <td>${PLATAFORMAS_NOMBRES[videojuego.plataforma] || videojuego.plataforma}</td>
             <td>${GENEROS_NOMBRES[videojuego.genero] || videojuego.genero}</td>
             <td>${videojuego.desarrollador || 'N/A'}</td>
@@ -287,7 +451,11 @@ videojuegoForm.addEventListener('submit', async (e) => {
         }
         
         if (editingVideojuegoId) {
-            // Actualizar videojuego existente
+            // Actualizar videojuego existente; If-Match evita pisar cambios
+            // hechos por otra persona desde que se abrió el formulario
+            if (editingVideojuegoEtag) {
+                headers['If-Match'] = editingVideojuegoEtag;
+            }
             response = await fetch(`${API_BASE_URL}/videojuegos/${editingVideojuegoId}/actualizar/`, {
                 method: 'PUT',
                 headers: headers,
@@ -304,6 +472,7 @@ videojuegoForm.addEventListener('submit', async (e) => {
         
         if (!response.ok) {
             let errorMessage = 'Error al guardar el videojuego';
+
             try {
                 const errorData = await response.json();
                 errorMessage = errorData.error || errorMessage;
@@ -319,8 +488,8 @@ videojuegoForm.addEventListener('submit', async (e) => {
         // Cerrar modal y resetear
         cerrarModal();
         
-        // Recargar videojuegos para actualizar la tabla
-        await cargarVideojuegos();
+        // Traer solo los cambios para actualizar la tabla
+        await sincronizarCambios();
         
         console.log('Videojuego guardado exitosamente. Tabla actualizada.');
         
@@ -340,6 +509,7 @@ async function editarVideojuego(id) {
         }
         
         const videojuego = await response.json();
+        editingVideojuegoEtag = response.headers.get('ETag');
         
         // Llenar el formulario
         document.getElementById('titulo').value = videojuego.titulo;
@@ -390,6 +560,7 @@ async function editarVideojuego(id) {
 // Cancelar edición
 function cancelarEdicion() {
     editingVideojuegoId = null;
+    editingVideojuegoEtag = null;
     if (modalTitleText) {
         modalTitleText.textContent = 'Agregar Nuevo Videojuego';
     }
@@ -427,7 +598,7 @@ async function eliminarVideojuego(id) {
         }
         
         showToast('✅ Videojuego eliminado correctamente', 'success');
-        await cargarVideojuegos();
+        await sincronizarCambios();
         
     } catch (error) {
         console.error('Error:', error);
@@ -437,7 +608,7 @@ async function eliminarVideojuego(id) {
 
 // Event listeners
 if (refreshBtn) {
-    refreshBtn.addEventListener('click', cargarVideojuegos);
+    refreshBtn.addEventListener('click', () => cargarVideojuegos());
 }
 if (cancelBtn) {
     cancelBtn.addEventListener('click', cerrarModal);
@@ -448,6 +619,17 @@ if (closeModalBtn) {
 if (addBtn) {
     addBtn.addEventListener('click', abrirModal);
 }
+if (searchInput) {
+    // Búsqueda mientras se escribe, con una pequeña espera entre teclas
+    let searchTimeout = null;
+    searchInput.addEventListener('input', () => {
+        clearTimeout(searchTimeout);
+        searchTimeout = setTimeout(() => buscarVideojuegos(searchInput.value.trim()), 150);
+    });
+}
+if (searchBtn) {
+    searchBtn.addEventListener('click', () => buscarVideojuegos(searchInput.value.trim()));
+}
 
 // Cerrar modal al hacer click fuera
 if (gameModal) {
@@ -465,7 +647,8 @@ document.addEventListener('keydown', (e) => {
     }
 });
 
-// Cargar videojuegos al iniciar
+// Cargar videojuegos al iniciar: se parte de la página que vino en el HTML
 document.addEventListener('DOMContentLoaded', () => {
-    cargarVideojuegos();
+    cargarVideojuegos(leerCatalogoInicial());
+    escucharEventos();
 });